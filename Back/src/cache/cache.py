@@ -62,6 +62,39 @@ class Cache:
             logger.exception(f"Error while adding data to cache with key {key}")
             raise
 
+    # Добавление данных в кэш, только если ключа ещё нет; возвращает True, если значение записано
+    async def set_if_absent(self, key: str, value: dict, expire: int = 3600) -> bool:
+        if not self.pool:
+            logger.error("Redis connection is not established")
+            return False
+
+        return bool(await self.pool.set(key, json.dumps(value), ex=expire, nx=True))
+
+    # Получение значения поля хеша: несколько связанных значений живут под одним ключом
+    # и сбрасываются вместе одним delete
+    async def get_field(self, key: str, field: str) -> Optional[dict]:
+        if not self.pool:
+            logger.error("Redis connection is not established")
+            return None
+
+        value = await self.pool.hget(key, field)
+        if value is None:
+            logger.info(f"Field {field} not found in cache for key {key}")
+            return None
+        return json.loads(value)
+
+    # Запись поля хеша; срок жизни задаётся всему ключу
+    async def set_field(self, key: str, field: str, value: dict, expire: int = 3600) -> None:
+        if not self.pool:
+            logger.error("Redis connection is not established")
+            return
+
+        async with self.pool.pipeline(transaction=True) as pipe:
+            pipe.hset(key, field, json.dumps(value))
+            pipe.expire(key, expire)
+            await pipe.execute()
+        logger.info(f"Field {field} added to cache with key {key}")
+
     # Удаление данных из кэша по ключу
     async def delete(self, key: str) -> None:
         if not self.pool:
@@ -71,6 +104,43 @@ class Cache:
         await self.pool.delete(key)
         logger.info(f"Cache deleted for key {key}")
 
+    # Удаление нескольких ключей одной командой
+    async def delete_many(self, keys: list[str]) -> None:
+        if not self.pool:
+            logger.error("Redis connection is not established")
+            return
+        if not keys:
+            return
+
+        await self.pool.delete(*keys)
+        logger.info(f"Cache deleted for {len(keys)} keys")
+
+    # Оставшееся время жизни ключа в секундах; None, если ключа нет или срок не задан
+    async def ttl(self, key: str) -> Optional[int]:
+        if not self.pool:
+            logger.error("Redis connection is not established")
+            return None
+
+        seconds = await self.pool.ttl(key)
+        return seconds if seconds >= 0 else None
+
+    # Получение всех ключей, подходящих под шаблон
+    async def scan_keys(self, pattern: str) -> list[str]:
+        if not self.pool:
+            logger.error("Redis connection is not established")
+            return []
+
+        return [key async for key in self.pool.scan_iter(match=pattern, count=1000)]
+
+    # Публикация сообщения в канал Redis
+    async def publish(self, channel: str, message: str) -> None:
+        if not self.pool:
+            logger.error("Redis connection is not established")
+            return
+
+        await self.pool.publish(channel, message)
+        logger.info(f"Message published to Redis channel {channel}")
+
     # Очистка всех данных в Redis
     async def flushdb(self) -> None:
         if not self.pool:
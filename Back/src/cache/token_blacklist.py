@@ -0,0 +1,133 @@
+import asyncio
+import hashlib
+import math
+from datetime import datetime
+from typing import Optional
+from src.cache.cache import cache
+from src.core.config import TOKEN_BLACKLIST_CAPACITY, TOKEN_BLACKLIST_ERROR_RATE, TOKEN_BLACKLIST_SNAPSHOT_SECONDS
+from src.logging_config import logger
+
+BLACKLIST_CHANNEL = "token_blacklist"
+BLACKLIST_KEY_PREFIX = "blacklist:"
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(64, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    # Позиции битов для элемента (двойное хэширование)
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+class TokenBlacklist:
+    def __init__(self, capacity: int = TOKEN_BLACKLIST_CAPACITY, error_rate: float = TOKEN_BLACKLIST_ERROR_RATE,
+                 snapshot_interval: int = TOKEN_BLACKLIST_SNAPSHOT_SECONDS):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.snapshot_interval = snapshot_interval
+        self.filter = BloomFilter(capacity, error_rate)
+        self.ready = False
+        self.subscribed = False
+        self._next_filter: Optional[BloomFilter] = None
+        self._tasks: list[asyncio.Task] = []
+
+    # Подписка на отзывы токенов из других процессов; снимок загружается после подтверждения подписки
+    async def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._listen()),
+            asyncio.create_task(self._snapshot_loop()),
+        ]
+        logger.info("Token blacklist filter started")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.subscribed = False
+        self.ready = False
+        logger.info("Token blacklist filter stopped")
+
+    # Добавляет jti в текущий фильтр и в перестраиваемый, если снимок загружается прямо сейчас
+    def _remember(self, jti: str) -> None:
+        self.filter.add(jti)
+        if self._next_filter is not None:
+            self._next_filter.add(jti)
+
+    # Перестраивает фильтр по ключам Redis; истёкшие токены при этом выпадают из фильтра.
+    # Фильтру можно доверять, только пока активна подписка, иначе отзывы из других процессов теряются
+    async def snapshot(self) -> None:
+        self._next_filter = BloomFilter(self.capacity, self.error_rate)
+        try:
+            keys = await cache.scan_keys(f"{BLACKLIST_KEY_PREFIX}*")
+            for key in keys:
+                self._next_filter.add(key[len(BLACKLIST_KEY_PREFIX):])
+            self.filter = self._next_filter
+            self.ready = self.subscribed
+            logger.info(f"Token blacklist snapshot loaded: {len(keys)} revoked tokens")
+        except Exception as e:
+            logger.error(f"Error loading token blacklist snapshot: {e}")
+        finally:
+            self._next_filter = None
+
+    async def _snapshot_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            await self.snapshot()
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                pubsub = cache.pool.pubsub()
+                await pubsub.subscribe(BLACKLIST_CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] == "subscribe":
+                        # Снимок берётся после подтверждения подписки: отзывы, опубликованные во время
+                        # его загрузки, уже стоят в очереди подписки и будут добавлены следом
+                        self.subscribed = True
+                        await self.snapshot()
+                    elif message["type"] == "message":
+                        self._remember(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Пока подписка не восстановлена, сообщения могли потеряться - проверяем Redis напрямую
+                self.subscribed = False
+                self.ready = False
+                logger.error(f"Token blacklist subscription failed: {e}")
+                await asyncio.sleep(5)
+
+    # Отзыв токена с TTL, равным времени его истечения
+    async def revoke(self, jti: str, expires_at: datetime) -> None:
+        ttl = (expires_at - datetime.utcnow()).total_seconds()
+        if ttl <= 0:
+            return
+
+        await cache.set(f"{BLACKLIST_KEY_PREFIX}{jti}", "revoked", expire=int(ttl))
+        self._remember(jti)
+        await cache.publish(BLACKLIST_CHANNEL, jti)
+        logger.info(f"Token {jti} added to blacklist with TTL {ttl} seconds")
+
+    # Redis запрашивается, только если фильтр говорит "возможно отозван" или фильтр ещё не синхронизирован
+    async def is_revoked(self, jti: str) -> bool:
+        if self.ready and jti not in self.filter:
+            return False
+
+        result = await cache.get(f"{BLACKLIST_KEY_PREFIX}{jti}")
+        if result:
+            logger.warning(f"Token {jti} is blacklisted")
+        return result is not None
+
+
+token_blacklist = TokenBlacklist()
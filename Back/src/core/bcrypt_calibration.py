@@ -0,0 +1,44 @@
+import argparse
+import statistics
+import time
+import bcrypt
+
+MIN_ROUNDS = 10
+MAX_ROUNDS = 16
+
+# Измеряет медианное время хэширования (в мс) для заданной стоимости bcrypt
+def measure_bcrypt_rounds(rounds: int, samples: int = 5) -> float:
+    password = b"calibration-password"
+    timings = []
+    for _ in range(samples):
+        salt = bcrypt.gensalt(rounds=rounds)
+        started = time.perf_counter()
+        bcrypt.hashpw(password, salt)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+# Подбирает максимальную стоимость bcrypt, укладывающуюся в целевую задержку на текущем железе
+def calibrate_bcrypt_rounds(target_ms: float, min_rounds: int = MIN_ROUNDS, max_rounds: int = MAX_ROUNDS,
+                            samples: int = 5) -> tuple[int, dict]:
+    timings = {}
+    best_rounds = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        timings[rounds] = measure_bcrypt_rounds(rounds, samples)
+        if timings[rounds] > target_ms:
+            break
+        best_rounds = rounds
+    return best_rounds, timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calibrate bcrypt cost for a target hashing latency")
+    parser.add_argument("--target-ms", type=float, default=250, help="target latency of one hash in milliseconds")
+    parser.add_argument("--min-rounds", type=int, default=MIN_ROUNDS)
+    parser.add_argument("--max-rounds", type=int, default=MAX_ROUNDS)
+    parser.add_argument("--samples", type=int, default=5, help="hashes measured per cost value")
+    args = parser.parse_args()
+
+    rounds, measured = calibrate_bcrypt_rounds(args.target_ms, args.min_rounds, args.max_rounds, args.samples)
+    for cost, elapsed in measured.items():
+        print(f"rounds={cost}: {elapsed:.1f} ms")
+    print(f"BCRYPT_ROUNDS={rounds}")
@@ -10,6 +10,8 @@ DB_PORT = os.environ.get("DB_PORT")
 DB_NAME = os.environ.get("DB_NAME")
 DB_USER = os.environ.get("DB_USER")
 DB_PASS = os.environ.get("DB_PASS")
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 5))
 
 DB_NAME_TEST = os.environ.get("DB_NAME_TEST")
 DB_HOST_TEST = os.environ.get("DB_HOST_TEST")
@@ -22,18 +24,64 @@ SECRET_AUTH = os.environ.get("SECRET_AUTH")
 ALGORITHM = os.environ.get("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get("ACCESS_TOKEN_EXPIRE_MINUTES"))
 
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", 12))
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 4))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.environ.get("PASSWORD_HASH_QUEUE_LIMIT", 32))
+
 RABBITMQ_DEFAULT_USER = os.environ.get("RABBITMQ_DEFAULT_USER")
 RABBITMQ_DEFAULT_PASS = os.environ.get("RABBITMQ_DEFAULT_PASS")
 RABBITMQ_DEFAULT_HOST = os.environ.get("RABBITMQ_DEFAULT_HOST")
 RABBITMQ_DEFAULT_VHOST = os.environ.get("RABBITMQ_DEFAULT_VHOST")
 RABBITMQ_DEFAULT_PORT = int(os.environ.get("RABBITMQ_DEFAULT_PORT"))
+RABBITMQ_CONSUMER_COUNT = int(os.environ.get("RABBITMQ_CONSUMER_COUNT", 1))
+RABBITMQ_PREFETCH_COUNT = int(os.environ.get("RABBITMQ_PREFETCH_COUNT", 20))
+RABBITMQ_CONSUMER_CONCURRENCY = int(os.environ.get("RABBITMQ_CONSUMER_CONCURRENCY", 10))
+RABBITMQ_MAX_ATTEMPTS = int(os.environ.get("RABBITMQ_MAX_ATTEMPTS", 5))
+RABBITMQ_RETRY_BASE_DELAY_SECONDS = float(os.environ.get("RABBITMQ_RETRY_BASE_DELAY_SECONDS", 5))
+RABBITMQ_DEAD_LETTER_EXCHANGE = os.environ.get("RABBITMQ_DEAD_LETTER_EXCHANGE", "dead_letter")
+MESSAGE_IDEMPOTENCY_TTL_SECONDS = int(os.environ.get("MESSAGE_IDEMPOTENCY_TTL_SECONDS", 7 * 24 * 3600))
+MESSAGE_PROCESSING_LOCK_SECONDS = int(os.environ.get("MESSAGE_PROCESSING_LOCK_SECONDS", 300))
+RABBITMQ_CHANNEL_POOL_SIZE = int(os.environ.get("RABBITMQ_CHANNEL_POOL_SIZE", 4))
+RABBITMQ_PUBLISH_MAX_IN_FLIGHT = int(os.environ.get("RABBITMQ_PUBLISH_MAX_IN_FLIGHT", 256))
+OUTBOX_BATCH_SIZE = int(os.environ.get("OUTBOX_BATCH_SIZE", 100))
+OUTBOX_POLL_SECONDS = float(os.environ.get("OUTBOX_POLL_SECONDS", 1))
 
 SMTP_USER = os.environ.get("SMTP_USER")
 SMTP_PASSWORD = os.environ.get("SMTP_PASSWORD")
 SMTP_PORT = os.environ.get("SMTP_PORT")
 SMTP_HOST = os.environ.get("SMTP_HOST")
+SMTP_USE_TLS = os.environ.get("SMTP_USE_TLS", "true").lower() == "true"
+SMTP_TIMEOUT = float(os.environ.get("SMTP_TIMEOUT", 30))
+SMTP_POOL_SIZE = int(os.environ.get("SMTP_POOL_SIZE", 2))
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.environ.get("SMTP_MAX_MESSAGES_PER_CONNECTION", 100))
+SMTP_KEEPALIVE_SECONDS = float(os.environ.get("SMTP_KEEPALIVE_SECONDS", 30))
+
+WORKER_CONCURRENCY = int(os.environ.get("WORKER_CONCURRENCY", 2))
+WORKER_TIMEZONE = os.environ.get("WORKER_TIMEZONE", "Europe/Moscow")
+PARTITION_MONTHS_AHEAD = int(os.environ.get("PARTITION_MONTHS_AHEAD", 3))
+MEAL_PRODUCTS_RETENTION_DAYS = int(os.environ.get("MEAL_PRODUCTS_RETENTION_DAYS", 7))
+USER_WEIGHT_RETENTION_DAYS = int(os.environ.get("USER_WEIGHT_RETENTION_DAYS", 30))
+MAINTENANCE_BATCH_SIZE = int(os.environ.get("MAINTENANCE_BATCH_SIZE", 5000))
+
+MEAL_RANGE_MAX_DAYS = int(os.environ.get("MEAL_RANGE_MAX_DAYS", 366))
+MEAL_BULK_MAX_ITEMS = int(os.environ.get("MEAL_BULK_MAX_ITEMS", 500))
+MEAL_TEMPLATES_MAX_COUNT = int(os.environ.get("MEAL_TEMPLATES_MAX_COUNT", 100))
+# Шаблоны приёмов пищи держатся в памяти процесса; другие процессы увидят изменения не позже этого срока
+MEAL_TEMPLATES_LOCAL_TTL_SECONDS = int(os.environ.get("MEAL_TEMPLATES_LOCAL_TTL_SECONDS", 30))
+MEAL_TEMPLATES_LOCAL_MAX_USERS = int(os.environ.get("MEAL_TEMPLATES_LOCAL_MAX_USERS", 10000))
+ANALYTICS_MAX_DAYS = int(os.environ.get("ANALYTICS_MAX_DAYS", 3660))
+# Допустимое отклонение суточных калорий от рекомендованных, при котором день считается выполненным
+ANALYTICS_ADHERENCE_TOLERANCE = float(os.environ.get("ANALYTICS_ADHERENCE_TOLERANCE", 0.1))
+
+DIGEST_QUEUE = os.environ.get("DIGEST_QUEUE", "digest_queue")
+DIGEST_BATCH_SIZE = int(os.environ.get("DIGEST_BATCH_SIZE", 1000))
+DIGEST_EMAILS_PER_MESSAGE = int(os.environ.get("DIGEST_EMAILS_PER_MESSAGE", 50))
 
 TEMPLATES_PATH = os.environ.get("TEMPLATES_PATH")
+TEMPLATES_CACHE_PATH = os.environ.get("TEMPLATES_CACHE_PATH")
+APP_ENV = os.environ.get("APP_ENV", "production")
+# В production шаблоны не перечитываются с диска при каждом обращении
+TEMPLATES_AUTO_RELOAD = os.environ.get("TEMPLATES_AUTO_RELOAD", str(APP_ENV != "production")).lower() == "true"
 LOGGER_FILE_PATH = os.environ.get("LOGGER_FILE_PATH")
 FILE_PATH = os.environ.get("FILE_PATH")
 
@@ -46,3 +94,10 @@ GOOGLE_TOKEN_URL = os.environ.get("GOOGLE_TOKEN_URL")
 GOOGLE_USERINFO_URL = os.environ.get("GOOGLE_USERINFO_URL")
 
 REDIS_URL = os.environ.get("REDIS_URL")
+
+TOKEN_BLACKLIST_CAPACITY = int(os.environ.get("TOKEN_BLACKLIST_CAPACITY", 100000))
+TOKEN_BLACKLIST_ERROR_RATE = float(os.environ.get("TOKEN_BLACKLIST_ERROR_RATE", 0.001))
+TOKEN_BLACKLIST_SNAPSHOT_SECONDS = int(os.environ.get("TOKEN_BLACKLIST_SNAPSHOT_SECONDS", 300))
+
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_TRUST_PROXY = os.environ.get("RATE_LIMIT_TRUST_PROXY", "false").lower() == "true"
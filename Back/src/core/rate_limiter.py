@@ -0,0 +1,200 @@
+import json
+import math
+import time
+from urllib.parse import parse_qs
+from typing import Optional
+import jwt as pyjwt
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from src.cache.cache import cache
+from src.core.config import SECRET_AUTH, ALGORITHM, RATE_LIMIT_ENABLED, RATE_LIMIT_TRUST_PROXY
+from src.logging_config import logger
+
+# Лимиты по классам маршрутов: (ёмкость корзины, пополнение в секунду) для IP и для пользователя;
+# для входа и регистрации пользователем считается переданный логин, а не токен
+RATE_LIMITS = {
+    "login": {"ip": (5, 5 / 60), "user": (10, 1 / 60)},
+    "search": {"ip": (60, 1), "user": (30, 0.5)},
+    "picture": {"ip": (30, 0.5), "user": (10, 0.2)},
+    "list": {"ip": (120, 2), "user": (60, 1)},
+    "default": {"ip": (300, 5), "user": (150, 2.5)},
+}
+
+LOCAL_BUCKETS_LIMIT = 10000
+LOGIN_KEY_MAX_LENGTH = 256
+
+LOGIN_PATHS = {"/auth/login", "/auth/registration"}
+LIST_PATHS = {"/meal/all_meals", "/meal/history", "/product/products", "/product/my-products",
+              "/user_weight/history/me"}
+
+# Атомарная проверка нескольких корзин: токены списываются, только если разрешают все корзины
+TOKEN_BUCKET_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+local states = {}
+local retry_after = 0
+
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2 - 1])
+    local rate = tonumber(ARGV[i * 2])
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + (now - ts) / 1000 * rate)
+    if tokens < 1 then
+        retry_after = math.max(retry_after, math.ceil((1 - tokens) / rate))
+    end
+    states[i] = {tokens, capacity, rate}
+end
+
+local allowed = 0
+if retry_after == 0 then
+    allowed = 1
+end
+
+for i, key in ipairs(KEYS) do
+    local tokens = states[i][1]
+    if allowed == 1 then
+        tokens = tokens - 1
+    end
+    redis.call('HSET', key, 'tokens', tokens, 'ts', now)
+    redis.call('PEXPIRE', key, math.ceil(states[i][2] / states[i][3] * 1000))
+end
+
+return {allowed, retry_after}
+"""
+
+# Определение класса маршрута по методу и пути запроса
+def classify_route(method: str, path: str) -> str:
+    if path in LOGIN_PATHS:
+        return "login"
+    if path == "/product/search":
+        return "search"
+    if "picture" in path:
+        return "picture"
+    if method == "GET" and path in LIST_PATHS:
+        return "list"
+    return "default"
+
+class RateLimiter:
+    def __init__(self):
+        self.script = None
+        # Локальные корзины на случай недоступности Redis: key -> (tokens, timestamp)
+        self.local_buckets: dict[str, tuple[float, float]] = {}
+
+    # Проверка запроса по всем корзинам; возвращает (разрешено, через сколько секунд повторить)
+    async def hit(self, limits: dict[str, tuple[float, float]]) -> tuple[bool, int]:
+        try:
+            if not cache.pool:
+                raise ConnectionError("Redis connection is not established")
+            if self.script is None:
+                self.script = cache.pool.register_script(TOKEN_BUCKET_SCRIPT)
+
+            args = []
+            for capacity, rate in limits.values():
+                args.extend([capacity, rate])
+            allowed, retry_after = await self.script(keys=list(limits.keys()), args=args)
+            return bool(allowed), int(retry_after)
+        except Exception as e:
+            logger.warning(f"Rate limiter falls back to local buckets: {e}")
+            return self.hit_local(limits)
+
+    # Та же логика корзин в памяти процесса
+    def hit_local(self, limits: dict[str, tuple[float, float]]) -> tuple[bool, int]:
+        now = time.monotonic()
+        states = {}
+        retry_after = 0
+        for key, (capacity, rate) in limits.items():
+            tokens, ts = self.local_buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - ts) * rate)
+            if tokens < 1:
+                retry_after = max(retry_after, math.ceil((1 - tokens) / rate))
+            states[key] = tokens
+
+        allowed = retry_after == 0
+        for key, tokens in states.items():
+            self.local_buckets[key] = (tokens - 1 if allowed else tokens, now)
+
+        if len(self.local_buckets) > LOCAL_BUCKETS_LIMIT:
+            self._prune_local(now)
+        return allowed, retry_after
+
+    # Удаляет корзины, которые уже успели бы полностью восстановиться при минимальном темпе пополнения
+    def _prune_local(self, now: float) -> None:
+        max_refill_seconds = max(
+            capacity / rate
+            for limits in RATE_LIMITS.values()
+            for capacity, rate in filter(None, limits.values())
+        )
+        self.local_buckets = {
+            key: (tokens, ts) for key, (tokens, ts) in self.local_buckets.items()
+            if now - ts < max_refill_seconds
+        }
+
+rate_limiter = RateLimiter()
+
+# Получение IP клиента (X-Forwarded-For учитывается только за доверенным прокси)
+def get_client_ip(request: Request) -> str:
+    if RATE_LIMIT_TRUST_PROXY:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+# Получение id пользователя из токена запроса без обращения к БД
+def get_request_user_id(request: Request) -> Optional[int]:
+    authorization = request.headers.get("authorization", "")
+    if not authorization.lower().startswith("bearer "):
+        return None
+    try:
+        payload = pyjwt.decode(authorization[7:], SECRET_AUTH, algorithms=[ALGORITHM])
+        return payload.get("uid") or payload.get("sub")
+    except pyjwt.PyJWTError:
+        return None
+
+# Получение логина из тела запроса входа (форма OAuth2) или регистрации (JSON)
+async def get_submitted_login(request: Request) -> Optional[str]:
+    try:
+        body = await request.body()
+        if request.url.path == "/auth/login":
+            login = parse_qs(body.decode()).get("username", [None])[0]
+        else:
+            login = json.loads(body).get("login")
+    except (ValueError, AttributeError):
+        return None
+    if not isinstance(login, str) or not login.strip():
+        return None
+    return login.strip().lower()[:LOGIN_KEY_MAX_LENGTH]
+
+class RateLimitMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app, limiter: RateLimiter = rate_limiter, enabled: bool = RATE_LIMIT_ENABLED):
+        super().__init__(app)
+        self.limiter = limiter
+        self.enabled = enabled
+
+    async def dispatch(self, request: Request, call_next):
+        if not self.enabled or request.method == "OPTIONS":
+            return await call_next(request)
+
+        route_class = classify_route(request.method, request.url.path)
+        route_limits = RATE_LIMITS[route_class]
+        limits = {f"rate_limit:{route_class}:ip:{get_client_ip(request)}": route_limits["ip"]}
+
+        if route_class == "login":
+            user_key = await get_submitted_login(request)
+        else:
+            user_key = get_request_user_id(request)
+        if user_key is not None and route_limits["user"]:
+            limits[f"rate_limit:{route_class}:user:{user_key}"] = route_limits["user"]
+
+        allowed, retry_after = await self.limiter.hit(limits)
+        if not allowed:
+            logger.warning(f"Rate limit exceeded for {route_class} on {request.url.path}, retry after {retry_after}s")
+            return JSONResponse(
+                status_code=429,
+                content={"detail": "Too many requests"},
+                headers={"Retry-After": str(retry_after)},
+            )
+
+        return await call_next(request)
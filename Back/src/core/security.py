@@ -1,20 +1,80 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta, datetime
+from functools import partial
+from uuid import uuid4
 import jwt as pyjwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from passlib.context import CryptContext
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.cache.cache import cache
-from src.core.config import ACCESS_TOKEN_EXPIRE_MINUTES, SECRET_AUTH, ALGORITHM
+from src.cache.token_blacklist import token_blacklist
+from src.core.config import ACCESS_TOKEN_EXPIRE_MINUTES, SECRET_AUTH, ALGORITHM, BCRYPT_ROUNDS, \
+    PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_LIMIT
 from src.database.database import get_async_session
 from src.logging_config import logger
-from src.services.user_service import find_user_by_login_and_email
+from src.schemas.user import CurrentPrincipal
+from src.services.user_service import find_user_by_login_and_email, get_user_profile_version
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-# Получение текущего пользователя из токена
-async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_session)):
+class PasswordHasher:
+    def __init__(self, context: CryptContext, max_workers: int, queue_limit: int):
+        self.context = context
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password_hash")
+        self.capacity = max_workers + queue_limit
+        self.pending = 0
+
+    # Выполняет операцию bcrypt в пуле потоков, отказывая сразу, если очередь переполнена
+    async def _run(self, func, *args):
+        if self.pending >= self.capacity:
+            logger.warning(f"Password hashing pool is saturated ({self.pending} pending operations)")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please try again later",
+                headers={"Retry-After": "1"},
+            )
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, partial(func, *args))
+        finally:
+            self.pending -= 1
+
+    # Проверка пароля
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(self.context.verify, plain_password, hashed_password)
+
+    # Проверка пароля с получением нового хэша, если текущий создан с устаревшей стоимостью
+    async def verify_and_update(self, plain_password: str, hashed_password: str):
+        return await self._run(self.context.verify_and_update, plain_password, hashed_password)
+
+    # Хэширование пароля
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    # Остановка пула потоков
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        logger.info("Password hashing pool stopped")
+
+password_hasher = PasswordHasher(pwd_context, PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_LIMIT)
+
+# Декодирование токена и проверка, что он не отозван
+async def decode_access_token(token: str) -> dict:
+    payload = pyjwt.decode(token, SECRET_AUTH, algorithms=[ALGORITHM])
+
+    # Проверяем, есть ли токен в черном списке
+    if await is_token_blacklisted(payload.get("jti") or token):
+        logger.warning("Attempt to use blacklisted token")
+        raise ValueError("Token is blacklisted")
+
+    return payload
+
+# Получение принципала (id и логин) из токена без загрузки профиля пользователя
+async def get_current_principal(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_session)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -22,51 +82,75 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
     )
 
     try:
-        # Проверяем, есть ли токен в черном списке
-        if await is_token_blacklisted(token):
-            logger.warning("Attempt to use blacklisted token")
-            raise credentials_exception
-
-        payload = pyjwt.decode(token, SECRET_AUTH, algorithms=[ALGORITHM])
+        payload = await decode_access_token(token)
         login: str = payload.get("sub")
         if login is None:
             raise credentials_exception
     except Exception:
         raise credentials_exception
 
+    user_id = payload.get("uid")
+    version = payload.get("ver")
+    if user_id is not None and version is not None:
+        current_version = await get_user_profile_version(db, user_id)
+        if current_version is None:
+            logger.warning(f"Token of deleted user {user_id} rejected")
+            raise credentials_exception
+        if current_version == version:
+            return CurrentPrincipal(id=user_id, login=login)
+        logger.info(f"Stale principal for user {user_id} (version {version} != {current_version}), reloading user")
+
+    # Токены без id/версии или с устаревшей версией проверяются по профилю пользователя;
+    # токен не может указывать на другой аккаунт, чем тот, для которого он выдан
     user = await find_user_by_login_and_email(db, login)
-    if user is None:
+    if user is None or (user_id is not None and user.id != user_id):
         raise credentials_exception
 
+    return CurrentPrincipal(id=user.id, login=user.login)
+
+# Получение текущего пользователя (полный профиль) из токена
+async def get_current_user(principal: CurrentPrincipal = Depends(get_current_principal),
+                           db: AsyncSession = Depends(get_async_session)):
+    user = await find_user_by_login_and_email(db, principal.login)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
     return user
 
 # Проверка пароля
-def verify_password(plain_password, hashed_password):
-    if pwd_context.verify(plain_password, hashed_password):
+async def verify_password(plain_password, hashed_password):
+    if await password_hasher.verify(plain_password, hashed_password):
         return True
     return False
 
+# Проверка пароля; возвращает (результат, новый хэш или None), если стоимость bcrypt изменилась
+async def verify_and_update_password(plain_password, hashed_password):
+    return await password_hasher.verify_and_update(plain_password, hashed_password)
+
 # Хэширование пароля
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def get_password_hash(password):
+    return await password_hasher.hash(password)
 
-# Создание токена доступа с временем жизни
+# Создание токена доступа с временем жизни и уникальным идентификатором (jti)
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=int(ACCESS_TOKEN_EXPIRE_MINUTES)))
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid4().hex})
     return pyjwt.encode(to_encode, SECRET_AUTH, algorithm=ALGORITHM)
 
-# Добавление токена в черный список с TTL, равным времени истечения токена
-async def add_token_to_blacklist(token: str, expires_at: datetime):
-    ttl = (expires_at - datetime.utcnow()).total_seconds()
-    if ttl > 0:
-        await cache.set(f"blacklist:{token}", "blacklisted", expire=int(ttl))
-        logger.info(f"Token added to blacklist: {token} with TTL {ttl} seconds")
-
-# Проверка, находится ли токен в черном списке
-async def is_token_blacklisted(token: str) -> bool:
-    result = await cache.get(f"blacklist:{token}")
-    if result:
-        logger.warning(f"Token {token} is blacklisted")
-    return result is not None
+# Создание токена доступа с данными принципала: логин, id пользователя и версия профиля
+async def create_user_access_token(db: AsyncSession, user) -> str:
+    version = await get_user_profile_version(db, user.id)
+    return create_access_token(data={"sub": user.login, "uid": user.id, "ver": version})
+
+# Добавление токена (по jti) в черный список с TTL, равным времени истечения токена
+async def add_token_to_blacklist(jti: str, expires_at: datetime):
+    await token_blacklist.revoke(jti, expires_at)
+
+# Проверка, находится ли токен (по jti) в черном списке
+async def is_token_blacklisted(jti: str) -> bool:
+    return await token_blacklist.is_revoked(jti)
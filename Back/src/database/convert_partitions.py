@@ -0,0 +1,23 @@
+import asyncio
+from src.database.database import Base, async_session_maker
+from src.database.partitions import convert_to_partitioned, create_partitions
+from src.logging_config import logger
+# Все модели должны быть зарегистрированы в Base.metadata
+from src.models import daily_nutrition, meal, meal_products, meal_template, outbox, product, user, \
+    user_weight  # noqa: F401
+from src.services.daily_nutrition_service import rebuild_daily_nutrition
+
+# Одноразовый перевод базы прежней схемы: секционирует meal, meal_products и user_weight,
+# создаёт недостающие таблицы, заранее создаёт секции и пересобирает суточную сводку
+async def main():
+    async with async_session_maker() as db:
+        converted = await convert_to_partitioned(db, Base.metadata)
+        await db.run_sync(lambda session: Base.metadata.create_all(session.connection()))
+        await db.commit()
+        await create_partitions(db)
+        rows = await rebuild_daily_nutrition(db)
+    logger.info(f"Schema conversion finished: {len(converted)} tables converted, daily nutrition rebuilt ({rows} rows)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -2,7 +2,7 @@ from typing import AsyncGenerator
 from sqlalchemy import NullPool
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from src.core.config import DB_USER, DB_PASS, DB_HOST, DB_PORT, DB_NAME, DB_PORT_DOCKER
+from src.core.config import DB_USER, DB_PASS, DB_HOST, DB_PORT, DB_NAME, DB_PORT_DOCKER, DB_POOL_SIZE, DB_MAX_OVERFLOW
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from src.logging_config import logger
 
@@ -12,6 +12,10 @@ engine = create_async_engine(DATABASE_URL, echo=True, poolclass=NullPool)
 async_session_maker = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
 Base = declarative_base()
 
+# Движок с пулом соединений для долгоживущих процессов с одним event loop (воркер фоновых задач)
+def create_pooled_engine(pool_size: int = DB_POOL_SIZE, max_overflow: int = DB_MAX_OVERFLOW):
+    return create_async_engine(DATABASE_URL, pool_size=pool_size, max_overflow=max_overflow, pool_pre_ping=True)
+
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session_maker() as session:
         logger.info(f"Connected to database:{DATABASE_URL}")
@@ -0,0 +1,197 @@
+import re
+from datetime import date, timedelta
+from typing import Optional
+from sqlalchemy import event, DDL, MetaData, Table, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.core.config import PARTITION_MONTHS_AHEAD, MEAL_PRODUCTS_RETENTION_DAYS, USER_WEIGHT_RETENTION_DAYS
+from src.logging_config import logger
+
+# Таблицы, секционированные по месяцам по recorded_at; meal_products ссылается на meal, поэтому создаётся после неё
+PARTITIONED_TABLES = ("meal", "meal_products", "user_weight")
+
+# Аргументы таблицы, секционированной по recorded_at
+PARTITION_BY_MONTH = {"postgresql_partition_by": "RANGE (recorded_at)"}
+
+# Создаёт для секционированной таблицы секцию по умолчанию
+# (в неё попадают строки за месяцы, для которых секция ещё не создана)
+def create_default_partition(table: Table):
+    event.listen(table, "after_create", DDL(
+        f"CREATE TABLE IF NOT EXISTS {table.name}_default PARTITION OF {table.name} DEFAULT"
+    ))
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+def add_months(day: date, months: int) -> date:
+    month_index = day.year * 12 + day.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+def partition_name(table_name: str, month: date) -> str:
+    return f"{table_name}_{month:%Y_%m}"
+
+# Список месячных секций таблицы: (имя секции, первый день месяца)
+async def list_partitions(db: AsyncSession, table_name: str) -> list[tuple[str, date]]:
+    result = await db.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.relname = :table_name"
+    ), {"table_name": table_name})
+    pattern = re.compile(rf"^{table_name}_(\d{{4}})_(\d{{2}})$")
+    partitions = []
+    for name in result.scalars().all():
+        match = pattern.match(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+# Заранее создаёт секции на текущий и months_ahead следующих месяцев; возвращает имена созданных секций
+async def create_partitions(db: AsyncSession, today: Optional[date] = None,
+                            months_ahead: int = PARTITION_MONTHS_AHEAD) -> list[str]:
+    first_month = month_start(today or date.today())
+    created = []
+    for table_name in PARTITIONED_TABLES:
+        existing = {name for name, _ in await list_partitions(db, table_name)}
+        for offset in range(months_ahead + 1):
+            start = add_months(first_month, offset)
+            end = add_months(start, 1)
+            name = partition_name(table_name, start)
+            if name in existing:
+                continue
+
+            # Секцию нельзя создать, пока строки этого месяца лежат в секции по умолчанию
+            in_default = await db.execute(text(
+                f"SELECT EXISTS (SELECT 1 FROM {table_name}_default "
+                f"WHERE recorded_at >= :start AND recorded_at < :end)"
+            ), {"start": start, "end": end})
+            if in_default.scalar():
+                logger.warning(f"Rows for {start:%Y-%m} are in {table_name}_default, partition {name} not created")
+                continue
+
+            await create_month_partition(db, table_name, start)
+            await db.commit()
+            created.append(name)
+    return created
+
+# Создаёт секцию таблицы за месяц, начинающийся с month (без фиксации транзакции)
+async def create_month_partition(db: AsyncSession, table_name: str, month: date) -> str:
+    name = partition_name(table_name, month)
+    await db.execute(text(
+        f"CREATE TABLE {name} PARTITION OF {table_name} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    ))
+    logger.info(f"Partition {name} created")
+    return name
+
+# Отсоединяет и удаляет секции, все строки которых старше retention_days
+async def drop_expired_partitions(db: AsyncSession, table_name: str, retention_days: int,
+                                  today: Optional[date] = None) -> list[str]:
+    cutoff = (today or date.today()) - timedelta(days=retention_days)
+    dropped = []
+    for name, month in await list_partitions(db, table_name):
+        if add_months(month, 1) > cutoff:
+            break
+        await db.execute(text(f"ALTER TABLE {table_name} DETACH PARTITION {name}"))
+        await db.execute(text(f"DROP TABLE {name}"))
+        await db.commit()
+        dropped.append(name)
+        logger.info(f"Partition {name} detached and dropped")
+    return dropped
+
+# Обслуживание секций: создаёт будущие и удаляет устаревшие; секции meal не удаляются - приёмы пищи хранятся бессрочно
+async def maintain_partitions(db: AsyncSession, today: Optional[date] = None) -> dict:
+    created = await create_partitions(db, today)
+    dropped = await drop_expired_partitions(db, "meal_products", MEAL_PRODUCTS_RETENTION_DAYS, today)
+    dropped += await drop_expired_partitions(db, "user_weight", USER_WEIGHT_RETENTION_DAYS, today)
+    logger.info(f"Partitions maintained: {len(created)} created, {len(dropped)} dropped")
+    return {"created": created, "dropped": dropped}
+
+# Столбцы, переносимые из несекционированных таблиц прежней схемы
+LEGACY_COLUMNS = {
+    "meal": "id, name, weight, calories, proteins, fats, carbohydrates, user_id, recorded_at",
+    "user_weight": "id, user_id, weight, recorded_at",
+}
+
+async def is_partitioned(db: AsyncSession, table_name: str) -> Optional[bool]:
+    result = await db.execute(text(
+        "SELECT relkind::text FROM pg_class WHERE relname = :table_name AND relkind IN ('r', 'p')"
+    ), {"table_name": table_name})
+    relkind = result.scalar()
+    return None if relkind is None else relkind == "p"
+
+# Переименовывает таблицу прежней схемы вместе с её индексами и последовательностями,
+# чтобы освободить имена для секционированной таблицы
+async def rename_legacy_table(db: AsyncSession, table_name: str) -> str:
+    legacy_name = f"{table_name}_unpartitioned"
+    sequences = await db.execute(text(
+        "SELECT seq.relname FROM pg_depend "
+        "JOIN pg_class seq ON seq.oid = pg_depend.objid AND seq.relkind = 'S' "
+        "WHERE pg_depend.refobjid = CAST(:table_name AS regclass) AND pg_depend.deptype IN ('a', 'i')"
+    ), {"table_name": table_name})
+    indexes = await db.execute(text("SELECT indexname FROM pg_indexes WHERE tablename = :table_name"),
+                               {"table_name": table_name})
+    for sequence in sequences.scalars().all():
+        await db.execute(text(f"ALTER SEQUENCE {sequence} RENAME TO {sequence}_unpartitioned"))
+    for index in indexes.scalars().all():
+        await db.execute(text(f"ALTER INDEX {index} RENAME TO {index}_unpartitioned"))
+    await db.execute(text(f"ALTER TABLE {table_name} RENAME TO {legacy_name}"))
+    return legacy_name
+
+# Создаёт месячные секции для всех месяцев, за которые есть строки в select_months
+async def create_partitions_for_rows(db: AsyncSession, table_name: str, select_months: str):
+    result = await db.execute(text(select_months))
+    for month in sorted(result.scalars().all()):
+        await create_month_partition(db, table_name, month)
+
+# Переводит таблицы meal, meal_products и user_weight прежней (несекционированной) схемы на секционированные
+# в одной транзакции: старые таблицы переименовываются, создаются новые с секциями за все месяцы, где есть данные,
+# строки копируются (meal_products.recorded_at заполняется из meal), последовательности id продолжаются
+# с прежних значений, старые таблицы удаляются. Уже секционированные таблицы пропускаются.
+# Таблицы блокируются на время копирования, поэтому запускать следует в окно обслуживания
+async def convert_to_partitioned(db: AsyncSession, metadata: MetaData) -> list[str]:
+    legacy_tables = [table_name for table_name in PARTITIONED_TABLES
+                     if await is_partitioned(db, table_name) is False]
+    if not legacy_tables:
+        logger.info("Partitioned tables are up to date, nothing to convert")
+        return []
+    if "meal" in legacy_tables and "meal_products" not in legacy_tables:
+        raise RuntimeError("meal is not partitioned but meal_products is, convert the tables manually")
+
+    legacy = {table_name: await rename_legacy_table(db, table_name) for table_name in legacy_tables}
+
+    await db.run_sync(lambda session: metadata.create_all(
+        session.connection(), tables=[metadata.tables[table_name] for table_name in legacy_tables]
+    ))
+
+    for table_name in ("meal", "user_weight"):
+        if table_name not in legacy:
+            continue
+        await create_partitions_for_rows(
+            db, table_name, f"SELECT DISTINCT date_trunc('month', recorded_at)::date FROM {legacy[table_name]}"
+        )
+        columns = LEGACY_COLUMNS[table_name]
+        await db.execute(text(f"INSERT INTO {table_name} ({columns}) SELECT {columns} FROM {legacy[table_name]}"))
+        await db.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table_name}', 'id'), COALESCE(MAX(id), 0) + 1, false) "
+            f"FROM {table_name}"
+        ))
+
+    if "meal_products" in legacy:
+        # Дата позиции - копия даты приёма пищи, к которому она относится
+        meal_source = legacy.get("meal", "meal")
+        await create_partitions_for_rows(
+            db, "meal_products",
+            f"SELECT DISTINCT date_trunc('month', meal.recorded_at)::date FROM {legacy['meal_products']} products "
+            f"JOIN {meal_source} meal ON meal.id = products.meal_id"
+        )
+        await db.execute(text(
+            f"INSERT INTO meal_products (meal_id, product_id, product_weight, recorded_at) "
+            f"SELECT products.meal_id, products.product_id, products.product_weight, meal.recorded_at "
+            f"FROM {legacy['meal_products']} products JOIN meal ON meal.id = products.meal_id"
+        ))
+
+    for table_name in reversed(legacy_tables):
+        await db.execute(text(f"DROP TABLE {legacy[table_name]}"))
+    await db.commit()
+    logger.info(f"Tables converted to partitioned: {', '.join(legacy_tables)}")
+    return legacy_tables
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+# Допустимые значения полей: минута, час, день месяца, месяц, день недели (0 и 7 - воскресенье)
+FIELD_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+# Ограничение поиска следующего запуска (на случай расписаний вроде 31 февраля)
+MAX_SEARCH_DAYS = 366 * 5
+
+# Разбирает одно поле cron-выражения: *, списки, диапазоны и шаги (*/15, 1-5, 0,30)
+def parse_field(field: str, low: int, high: int) -> set[int]:
+    values = set()
+    for part in field.split(","):
+        value_range, _, step = part.partition("/")
+        step = int(step) if step else 1
+        if value_range == "*":
+            start, end = low, high
+        elif "-" in value_range:
+            start, end = (int(value) for value in value_range.split("-"))
+        else:
+            start = end = int(value_range)
+            if step > 1:
+                end = high
+        if start < low or end > high or start > end or step < 1:
+            raise ValueError(f"Invalid cron field: {field}")
+        values.update(range(start, end + 1, step))
+    return values
+
+class CronSchedule:
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression must have 5 fields: {expression}")
+
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            parse_field(field, low, high) for field, (low, high) in zip(fields, FIELD_RANGES)
+        )
+        self.weekdays = {day % 7 for day in weekdays}
+        # Как в cron: если ограничены и день месяца, и день недели, достаточно совпадения любого из них
+        self.days_restricted = fields[2] != "*"
+        self.weekdays_restricted = fields[4] != "*"
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_match = moment.day in self.days
+        weekday_match = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.days_restricted and self.weekdays_restricted:
+            return day_match or weekday_match
+        return day_match and weekday_match
+
+    # Ближайший момент запуска строго после указанного
+    def next_after(self, moment: datetime) -> datetime:
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=MAX_SEARCH_DAYS)
+        while candidate <= limit:
+            if candidate.month not in self.months or not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression never matches: {self.expression}")
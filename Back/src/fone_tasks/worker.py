@@ -0,0 +1,184 @@
+import argparse
+import asyncio
+import signal
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+from zoneinfo import ZoneInfo
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+from src.cache.cache import cache
+from src.core.config import WORKER_CONCURRENCY, WORKER_TIMEZONE
+from src.database.database import create_pooled_engine
+from src.database.partitions import maintain_partitions
+from src.fone_tasks.cron import CronSchedule
+from src.logging_config import logger
+from src.rabbitmq.client import rabbitmq_client
+from src.services import maintenance_service
+from src.services.digest_service import publish_digests
+
+# Сколько ждать завершения запущенных задач при остановке воркера
+SHUTDOWN_TIMEOUT_SECONDS = 60
+# Максимальный интервал сна планировщика (чтобы не зависеть от переводов часов)
+MAX_SLEEP_SECONDS = 60
+
+class Job:
+    def __init__(self, name: str, func: Callable[[], Awaitable], schedule: str, timeout: float = 3600,
+                 retries: int = 3, retry_delay: float = 60, run_on_start: bool = False):
+        self.name = name
+        self.func = func
+        self.schedule = CronSchedule(schedule)
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.run_on_start = run_on_start
+
+class Worker:
+    def __init__(self, jobs: list[Job], concurrency: int = WORKER_CONCURRENCY, timezone: str = WORKER_TIMEZONE):
+        self.jobs = jobs
+        self.timezone = ZoneInfo(timezone)
+        # Не больше concurrency задач выполняются одновременно
+        self.slots = asyncio.Semaphore(concurrency)
+        self.active: dict[str, asyncio.Task] = {}
+        self.metrics: dict[str, dict] = {}
+        self.next_runs: dict[str, datetime] = {}
+
+    def now(self) -> datetime:
+        return datetime.now(self.timezone)
+
+    # Сохраняет метрики выполнения задачи и публикует их в Redis
+    async def _record(self, job: Job, status: str, duration: float):
+        metrics = self.metrics.setdefault(job.name, {"runs": 0, "failures": 0, "total_seconds": 0.0})
+        metrics["runs"] += 1
+        metrics["failures"] += status != "success"
+        metrics["total_seconds"] = round(metrics["total_seconds"] + duration, 3)
+        metrics["last_status"] = status
+        metrics["last_seconds"] = round(duration, 3)
+        metrics["last_finished_at"] = self.now().isoformat()
+        logger.info(f"Job {job.name} {status} in {duration:.2f} s "
+                    f"(runs {metrics['runs']}, failures {metrics['failures']})")
+        try:
+            await cache.set(f"worker_metrics:{job.name}", metrics, expire=7 * 24 * 3600)
+        except Exception as e:
+            logger.warning(f"Failed to store metrics for job {job.name}: {e}")
+
+    # Выполняет задачу с ограничением времени и повторами с экспоненциальной задержкой
+    async def run_job(self, job: Job):
+        async with self.slots:
+            for attempt in range(1, job.retries + 2):
+                started = time.perf_counter()
+                try:
+                    result = await asyncio.wait_for(job.func(), timeout=job.timeout)
+                    await self._record(job, "success", time.perf_counter() - started)
+                    return result
+                except asyncio.TimeoutError:
+                    await self._record(job, "timeout", time.perf_counter() - started)
+                    error = f"timed out after {job.timeout} s"
+                except Exception as e:
+                    await self._record(job, "failed", time.perf_counter() - started)
+                    error = str(e)
+
+                if attempt > job.retries:
+                    logger.error(f"Job {job.name} failed after {attempt} attempts: {error}")
+                    return None
+                delay = job.retry_delay * 2 ** (attempt - 1)
+                logger.warning(f"Job {job.name} attempt {attempt} failed: {error}. Retrying in {delay} seconds")
+                await asyncio.sleep(delay)
+
+    # Запускает задачу в фоне; предыдущий незавершённый запуск той же задачи не дублируется
+    def start_job(self, job: Job) -> Optional[asyncio.Task]:
+        if job.name in self.active:
+            logger.warning(f"Job {job.name} is still running, skipping this run")
+            return None
+        task = asyncio.create_task(self.run_job(job))
+        self.active[job.name] = task
+        task.add_done_callback(lambda _: self.active.pop(job.name, None))
+        return task
+
+    # Запускает задачи, время которых наступило; возвращает запущенные задачи
+    def dispatch_due(self, now: datetime) -> list[asyncio.Task]:
+        started = []
+        for job in self.jobs:
+            next_run = self.next_runs.setdefault(job.name, job.schedule.next_after(now))
+            if next_run <= now:
+                self.next_runs[job.name] = job.schedule.next_after(now)
+                task = self.start_job(job)
+                if task:
+                    started.append(task)
+        return started
+
+    # Цикл планировщика: работает до сигнала остановки, затем дожидается запущенных задач
+    async def run(self, stop_event: asyncio.Event):
+        logger.info(f"Worker started with jobs: {', '.join(job.name for job in self.jobs)}")
+        for job in self.jobs:
+            if job.run_on_start:
+                self.start_job(job)
+        while not stop_event.is_set():
+            now = self.now()
+            self.dispatch_due(now)
+            sleep_seconds = min((min(self.next_runs.values()) - now).total_seconds(), MAX_SLEEP_SECONDS)
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=max(sleep_seconds, 0))
+            except asyncio.TimeoutError:
+                pass
+
+        if self.active:
+            logger.info(f"Waiting for {len(self.active)} running jobs to finish")
+            done, pending = await asyncio.wait(list(self.active.values()), timeout=SHUTDOWN_TIMEOUT_SECONDS)
+            for task in pending:
+                task.cancel()
+        logger.info("Worker stopped")
+
+# Задачи по расписанию; все используют общий пул соединений с БД воркера
+def build_jobs(session_maker) -> list[Job]:
+    def with_session(job, **kwargs):
+        async def run():
+            async with session_maker() as db:
+                return await job(db, **kwargs)
+        return run
+
+    return [
+        # Создание будущих секций и удаление устаревших; при старте - чтобы секция текущего месяца точно была
+        Job("maintain_partitions", with_session(maintain_partitions), "0 0 * * *", retry_delay=300,
+            run_on_start=True),
+        Job("add_daily_weight_records", with_session(maintenance_service.add_daily_weight_records),
+            "0 3 * * *", retry_delay=600),
+        Job("daily_nutrition_digest", lambda: publish_digests("daily", session_maker=session_maker),
+            "0 7 * * *", retry_delay=300),
+        Job("weekly_nutrition_digest", lambda: publish_digests("weekly", session_maker=session_maker),
+            "30 7 * * 1", retry_delay=300),
+    ]
+
+async def main(run_once: Optional[str] = None):
+    engine = create_pooled_engine()
+    session_maker = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    worker = Worker(build_jobs(session_maker))
+
+    await cache.connect()
+    await rabbitmq_client.connect()
+    try:
+        if run_once:
+            job = next((job for job in worker.jobs if job.name == run_once), None)
+            if job is None:
+                raise SystemExit(f"Unknown job: {run_once}")
+            await worker.run_job(job)
+            return
+
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop_event.set)
+        await worker.run(stop_event)
+    finally:
+        await rabbitmq_client.close()
+        await cache.disconnect()
+        await engine.dispose()
+        logger.info("Worker shut down gracefully")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run scheduled background jobs")
+    parser.add_argument("--run-once", metavar="JOB", help="run a single job immediately and exit")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.run_once))
@@ -2,14 +2,19 @@ from fastapi import FastAPI, HTTPException
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from src.cache.cache import cache
+from src.cache.token_blacklist import token_blacklist
+from src.core.rate_limiter import RateLimitMiddleware
+from src.core.security import password_hasher
 from src.exceptions import http_exception_handler, general_exception_handler, not_found_handler, \
     method_not_allowed_handler, bad_request_handler, \
     unauthorized_handler, forbidden_handler, internal_server_error_handler, bad_gateway_handler, \
     temporary_redirect_handler, unprocessable_entity_handler
 from src.rabbitmq.client import rabbitmq_client
+from src.routers.analytics_router import analytics_router
 from src.routers.database_router import database_router
 from src.routers.meal_products_router import meal_products_router
 from src.routers.meal_router import meal_router
+from src.routers.meal_template_router import meal_template_router
 from src.routers.product_router import product_router
 from src.routers.auth_router import auth_router
 from src.routers.user_router import user_router
@@ -34,6 +39,8 @@ app.add_exception_handler(500, internal_server_error_handler)
 app.add_exception_handler(502, bad_gateway_handler)
 app.add_exception_handler(Exception, general_exception_handler)
 
+app.add_middleware(RateLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000", "http://frontend"],
@@ -46,11 +53,14 @@ app.add_middleware(
 async def startup():
     await rabbitmq_client.connect()
     await cache.connect()
+    await token_blacklist.start()
 
 @app.on_event("shutdown")
 async def shutdown():
     await rabbitmq_client.close()
+    await token_blacklist.stop()
     await cache.disconnect()
+    password_hasher.shutdown()
 
 app.include_router(meal_products_router, prefix="/meal_products")
 app.include_router(user_weight_router, prefix="/user_weight")
@@ -59,3 +69,5 @@ app.include_router(auth_router, prefix="/auth")
 app.include_router(user_router, prefix="/user")
 app.include_router(product_router, prefix="/product")
 app.include_router(meal_router, prefix="/meal")
+app.include_router(analytics_router, prefix="/analytics")
+app.include_router(meal_template_router, prefix="/meal_template")
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, Double, ForeignKey, Date
+from src.database.database import Base
+
+# Суточные итоги питания пользователя; поддерживаются инкрементально при изменении приёмов пищи
+class DailyNutrition(Base):
+    __tablename__ = "daily_nutrition"
+
+    # Сводка удаляется вместе с пользователем на стороне БД
+    user_id = Column(Integer, ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    recorded_at = Column(Date, primary_key=True)
+    calories = Column(Double, nullable=False, default=0)
+    proteins = Column(Double, nullable=False, default=0)
+    fats = Column(Double, nullable=False, default=0)
+    carbohydrates = Column(Double, nullable=False, default=0)
+    meal_count = Column(Integer, nullable=False, default=0)
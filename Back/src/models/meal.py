@@ -2,11 +2,14 @@ from datetime import date
 from sqlalchemy import Column, Integer, String, ForeignKey, Date, Double, DateTime
 from sqlalchemy.orm import relationship
 from src.database.database import Base
+from src.database.partitions import PARTITION_BY_MONTH, create_default_partition
 
 class Meal(Base):
     __tablename__ = "meal"
+    __table_args__ = PARTITION_BY_MONTH
 
-    id = Column(Integer, primary_key=True, index=True)
+    # Ключ секционирования должен входить в первичный ключ
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     name = Column(String, index=True, nullable=False)
     weight = Column(Double, nullable=False)
     calories = Column(Double, nullable=False)
@@ -14,7 +17,9 @@ class Meal(Base):
     fats = Column(Double, nullable=False)
     carbohydrates = Column(Double, nullable=False)
     user_id = Column(Integer, ForeignKey("user.id"))
-    recorded_at = Column(Date, default=date.today(), nullable=False)
+    recorded_at = Column(Date, primary_key=True, default=date.today, nullable=False)
 
     user = relationship("User", back_populates="meals")
     meal_products = relationship("MealProducts", back_populates="meal")
+
+create_default_partition(Meal.__table__)
@@ -1,13 +1,22 @@
-from sqlalchemy import Column, Integer, ForeignKey, Double
+from sqlalchemy import Column, Integer, ForeignKey, ForeignKeyConstraint, Double, Date
 from sqlalchemy.orm import relationship
 from src.database.database import Base
+from src.database.partitions import PARTITION_BY_MONTH, create_default_partition
 
 class MealProducts(Base):
     __tablename__ = "meal_products"
+    __table_args__ = (
+        ForeignKeyConstraint(["meal_id", "recorded_at"], ["meal.id", "meal.recorded_at"]),
+        PARTITION_BY_MONTH,
+    )
 
     product_weight = Column(Double, nullable=False)
-    meal_id = Column(Integer, ForeignKey("meal.id"), primary_key=True)
+    meal_id = Column(Integer, primary_key=True)
     product_id = Column(Integer, ForeignKey("product.id"), primary_key=True)
+    # Дата приёма пищи: копия meal.recorded_at, по ней таблица секционирована вместе с meal
+    recorded_at = Column(Date, primary_key=True)
 
     meal = relationship("Meal", back_populates="meal_products")
     product = relationship("Product", back_populates="meal_products")
+
+create_default_partition(MealProducts.__table__)
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, Double, ForeignKey
+from src.database.database import Base
+
+# Сохранённый шаблон (избранный приём пищи) пользователя; итоги рассчитываются один раз при сохранении
+class MealTemplate(Base):
+    __tablename__ = "meal_template"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("user.id", ondelete="CASCADE"), index=True, nullable=False)
+    name = Column(String, nullable=False)
+    weight = Column(Double, nullable=False)
+    calories = Column(Double, nullable=False)
+    proteins = Column(Double, nullable=False)
+    fats = Column(Double, nullable=False)
+    carbohydrates = Column(Double, nullable=False)
+
+# Позиция шаблона со снимком названия продукта и нутриентов на момент сохранения
+class MealTemplateProduct(Base):
+    __tablename__ = "meal_template_products"
+
+    template_id = Column(Integer, ForeignKey("meal_template.id", ondelete="CASCADE"), primary_key=True)
+    product_id = Column(Integer, ForeignKey("product.id"), primary_key=True)
+    product_name = Column(String, nullable=False)
+    product_weight = Column(Double, nullable=False)
+    calories = Column(Double, nullable=False)
+    proteins = Column(Double, nullable=False)
+    fats = Column(Double, nullable=False)
+    carbohydrates = Column(Double, nullable=False)
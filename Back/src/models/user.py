@@ -22,6 +22,7 @@ class User(Base):
     recommended_calories = Column(Double, nullable=True)
     profile_picture = Column(LargeBinary, nullable=True)
     registered_at = Column(Date, nullable=False, default=date.today())
+    profile_version = Column(Integer, nullable=False, default=1)
 
     @hybrid_property
     def has_profile_picture(self):
@@ -2,13 +2,17 @@ from datetime import date
 from sqlalchemy import Column, Integer, Double, ForeignKey, Date
 from sqlalchemy.orm import relationship
 from src.database.database import Base
+from src.database.partitions import PARTITION_BY_MONTH, create_default_partition
 
 class UserWeight(Base):
     __tablename__ = 'user_weight'
+    __table_args__ = PARTITION_BY_MONTH
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     user_id = Column(Integer, ForeignKey('user.id'))
     weight = Column(Double, nullable=False)
-    recorded_at = Column(Date, nullable=False, default=date.today())
+    recorded_at = Column(Date, primary_key=True, nullable=False, default=date.today)
 
     user = relationship("User", back_populates="recorded_weight")
+
+create_default_partition(UserWeight.__table__)
@@ -1,14 +1,36 @@
+import asyncio
+import json
+from typing import Iterable, Optional
 import aio_pika
+from aio_pika import Message, DeliveryMode
+from aio_pika.pool import Pool
 from src.core.config import RABBITMQ_DEFAULT_VHOST, RABBITMQ_DEFAULT_PORT, RABBITMQ_DEFAULT_PASS, RABBITMQ_DEFAULT_USER, \
-    RABBITMQ_DEFAULT_HOST
+    RABBITMQ_DEFAULT_HOST, RABBITMQ_CHANNEL_POOL_SIZE, RABBITMQ_PUBLISH_MAX_IN_FLIGHT
 from src.logging_config import logger
 
+# Создаёт постоянное (persistent) JSON-сообщение
+def build_message(data: dict, message_type: Optional[str] = None, message_id: Optional[str] = None,
+                  headers: Optional[dict] = None) -> Message:
+    return Message(
+        body=json.dumps(data).encode(),
+        content_type="application/json",
+        delivery_mode=DeliveryMode.PERSISTENT,
+        type=message_type,
+        message_id=message_id,
+        headers=headers,
+    )
+
 class RabbitMQClient:
-    def __init__(self):
+    def __init__(self, channel_pool_size: int = RABBITMQ_CHANNEL_POOL_SIZE,
+                 max_in_flight: int = RABBITMQ_PUBLISH_MAX_IN_FLIGHT):
         self.connection = None
         self.channel = None
+        self.channel_pool: Optional[Pool] = None
+        self.channel_pool_size = channel_pool_size
+        # Окно неподтверждённых брокером публикаций
+        self.publish_window = asyncio.Semaphore(max_in_flight)
 
-    # Устанавливает соединение с RabbitMQ и открывает канал
+    # Устанавливает соединение с RabbitMQ, открывает канал и пул каналов для публикации
     async def connect(self):
         self.connection = await aio_pika.connect_robust(
             login=RABBITMQ_DEFAULT_USER,
@@ -18,13 +40,26 @@ class RabbitMQClient:
             port=RABBITMQ_DEFAULT_PORT,
         )
         self.channel = await self.connection.channel()
+        self.channel_pool = Pool(self._create_publish_channel, max_size=self.channel_pool_size)
         logger.info("RabbitMQClient connected")
 
+    # Канал в режиме подтверждений публикации (publisher confirms)
+    async def _create_publish_channel(self):
+        return await self.connection.channel(publisher_confirms=True)
+
+    # Открывает дополнительный канал на текущем соединении (например, для отдельного потребителя)
+    async def open_channel(self):
+        if not self.connection:
+            raise RuntimeError("RabbitMQ connection is not established")
+        return await self.connection.channel()
+
     # Закрывает соединение и канал RabbitMQ
     async def close(self):
         if self.connection:
-            await self.connection.close()
+            if self.channel_pool:
+                await self.channel_pool.close()
             await self.channel.close()
+            await self.connection.close()
             logger.info("RabbitMQClient disconnected")
 
     # Объявляет очередь в RabbitMQ
@@ -34,5 +69,26 @@ class RabbitMQClient:
         logger.info(f"RabbitMQClient declare_queue with name: {queue_name}")
         return await self.channel.declare_queue(queue_name, durable=durable)
 
+    async def _publish_confirmed(self, channel, routing_key: str, message: Message, exchange_name: str = ""):
+        async with self.publish_window:
+            exchange = channel.default_exchange if not exchange_name else await channel.get_exchange(exchange_name)
+            await exchange.publish(message, routing_key=routing_key)
+
+    # Публикует сообщение и дожидается подтверждения брокера
+    async def publish(self, routing_key: str, message: Message, exchange_name: str = ""):
+        await self.publish_many([(routing_key, message)], exchange_name)
+
+    # Публикует пачку сообщений по одному каналу без ожидания каждого подтверждения по очереди;
+    # число неподтверждённых сообщений ограничено окном publish_window
+    async def publish_many(self, messages: Iterable[tuple[str, Message]], exchange_name: str = ""):
+        if not self.channel_pool:
+            raise RuntimeError("RabbitMQ client is not connected")
+
+        async with self.channel_pool.acquire() as channel:
+            await asyncio.gather(*(
+                self._publish_confirmed(channel, routing_key, message, exchange_name)
+                for routing_key, message in messages
+            ))
+
 # Создание экземпляра клиента RabbitMQ
 rabbitmq_client = RabbitMQClient()
@@ -1,43 +1,89 @@
+import asyncio
 import json
+import time
 from aio_pika import IncomingMessage
 from .client import rabbitmq_client
-from src.services.email_service import send_email
+from src.core.config import RABBITMQ_PREFETCH_COUNT, RABBITMQ_CONSUMER_CONCURRENCY
 from src.logging_config import logger
+from src.rabbitmq import handlers  # noqa: F401 - регистрирует обработчики сообщений
+from src.rabbitmq.idempotency import claim_message, complete_message, release_message, lock_remaining_seconds, \
+    CLAIMED, DONE, IN_PROGRESS
+from src.rabbitmq.registry import MESSAGE_HANDLERS, DEFAULT_MESSAGE_TYPES, InvalidMessageError, PartialFailureError
+from src.rabbitmq.retry import declare_retry_topology, schedule_retry, schedule_wait, dead_letter
 
-# Обрабатывает полученное сообщение из очереди RabbitMQ
-async def process_message(message: IncomingMessage):
+# Ограничение числа одновременно обрабатываемых сообщений в процессе
+consumer_slots = asyncio.Semaphore(RABBITMQ_CONSUMER_CONCURRENCY)
+
+# Сообщение с тем же message_id сейчас обрабатывает другой потребитель
+class MessageInProgressError(Exception):
+    pass
+
+# Переносит сообщение в очередь задержки или «отравленных» сообщений и подтверждает исходное;
+# если брокер не принял копию, возвращает сообщение в очередь
+async def settle_failed(message: IncomingMessage, reroute):
     try:
-        data = json.loads(message.body.decode())
-        logger.info(f'Processing message: {data}')
+        await reroute
+        await message.ack()
+    except Exception as e:
+        logger.error(f"Failed to reroute message {message.message_id}: {e}")
+        await message.reject(requeue=True)
 
-        if not data.get("email"):
-            logger.error("No email in message")
-            await message.reject(requeue=False)
-            return
+# Обрабатывает полученное сообщение из очереди RabbitMQ, выбирая обработчик по типу сообщения
+async def process_message(message: IncomingMessage):
+    message_type = message.type or DEFAULT_MESSAGE_TYPES.get(message.routing_key)
+    queue_name = message.routing_key
+    async with consumer_slots:
+        started = time.perf_counter()
+        claim = None
+        try:
+            handler = MESSAGE_HANDLERS.get(message_type)
+            if handler is None:
+                raise InvalidMessageError(f"No handler for message type {message_type}")
 
-        await send_email(
-            to_email=data["email"],
-            subject="Welcome to Food Diary!",
-            template_name="registration_email_notification.html",
-            context={"user_name": data.get("login", "")}
-        )
+            data = json.loads(message.body.decode())
 
-        await message.ack()
-        logger.info("Email sent successfully")
+            claim = await claim_message(message.message_id)
+            if claim == DONE:
+                logger.info(f"Message {message_type} ({message.message_id}) already processed, skipping")
+                await message.ack()
+                return
+            if claim == IN_PROGRESS:
+                raise MessageInProgressError(f"Message {message.message_id} is being processed")
 
-    except json.JSONDecodeError:
-        logger.error("Invalid JSON format")
-        await message.reject(requeue=False)
-    except Exception as e:
-        logger.error(f"Error processing message: {e}")
-        await message.reject(requeue=True)  # Попробовать снова
+            await handler(data)
+            if claim == CLAIMED:
+                await complete_message(message.message_id)
+            await message.ack()
+            logger.info(f"Message {message_type} ({message.message_id}) processed")
+        except (json.JSONDecodeError, InvalidMessageError) as e:
+            logger.error(f"Invalid message {message_type} ({message.message_id}): {e}")
+            await settle_failed(message, dead_letter(message, queue_name, e))
+        except MessageInProgressError:
+            # Потребитель, захвативший сообщение, мог упасть: ждём истечения захвата, не расходуя попытки
+            await settle_failed(message, schedule_wait(message, queue_name,
+                                                       await lock_remaining_seconds(message.message_id)))
+        except Exception as e:
+            logger.error(f"Error processing message {message_type} ({message.message_id}): {e}")
+            if claim == CLAIMED:
+                await release_message(message.message_id)
+            # При частичной обработке повторяется только необработанная часть
+            body = json.dumps(e.remaining).encode() if isinstance(e, PartialFailureError) else None
+            await settle_failed(message, schedule_retry(message, queue_name, e, body=body))
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            logger.info(f"Message {message_type} handled in {elapsed_ms:.1f} ms")
 
-# Начинает потребление сообщений из указанной очереди RabbitMQ
-async def consume_messages(queue_name: str = "registration_queue"):
+# Начинает потребление сообщений из указанной очереди RabbitMQ; возвращает очередь и тег потребителя
+async def consume_messages(queue_name: str = "registration_queue", channel=None,
+                           prefetch_count: int = RABBITMQ_PREFETCH_COUNT):
     if not rabbitmq_client.channel:
         raise RuntimeError("RabbitMQ client is not connected")
 
-    queue = await rabbitmq_client.declare_queue(queue_name, durable=True)
-    print(f"Started consuming messages from {queue_name}")
-    logger.info(f"Started consuming messages from {queue_name}")
-    await queue.consume(process_message)
+    channel = channel or rabbitmq_client.channel
+    # Брокер не отдаёт потребителю больше prefetch_count неподтверждённых сообщений
+    await channel.set_qos(prefetch_count=prefetch_count)
+    queue = await channel.declare_queue(queue_name, durable=True)
+    await declare_retry_topology(channel, queue_name)
+    consumer_tag = await queue.consume(process_message)
+    logger.info(f"Started consuming messages from {queue_name} (consumer {consumer_tag}, prefetch {prefetch_count})")
+    return queue, consumer_tag
@@ -0,0 +1,37 @@
+from src.rabbitmq.registry import message_handler, InvalidMessageError, PartialFailureError
+from src.services.email_service import send_email, send_many, build_email
+from src.services.template_service import render_many
+
+# Отправка приветственного письма после регистрации
+@message_handler("user_registered")
+async def send_registration_email(data: dict):
+    if not data.get("email"):
+        raise InvalidMessageError("No email in message")
+
+    await send_email(
+        to_email=data["email"],
+        subject="Welcome to Food Diary!",
+        template_name="registration_email_notification.html",
+        context={"user_name": data.get("login", "")}
+    )
+
+# Массовая отправка дайджестов питания: шаблон отрисовывается пачкой и уходит по одной SMTP-сессии
+@message_handler("nutrition_digest")
+async def send_nutrition_digest(data: dict):
+    recipients = data.get("recipients")
+    if not recipients or not data.get("title"):
+        raise InvalidMessageError("No recipients in digest message")
+
+    contents = await render_many("nutrition_digest.html", recipients, data["title"])
+    emails = [build_email(recipient["email"], data["title"], content)
+              for recipient, content in zip(recipients, contents)]
+    failed = await send_many(emails)
+    if not failed:
+        return
+    # Если не ушло ни одно письмо, проблема скорее на стороне SMTP-сервера - сообщение будет повторено целиком;
+    # иначе повторяется только часть с неотправленными письмами
+    if len(failed) == len(emails):
+        raise failed[0][1]
+    failed_emails = {id(email) for email, _ in failed}
+    remaining = [recipient for recipient, email in zip(recipients, emails) if id(email) in failed_emails]
+    raise PartialFailureError({**data, "recipients": remaining}, failed[0][1])
@@ -0,0 +1,49 @@
+from typing import Optional
+from src.cache.cache import cache
+from src.core.config import MESSAGE_IDEMPOTENCY_TTL_SECONDS, MESSAGE_PROCESSING_LOCK_SECONDS
+from src.logging_config import logger
+
+CLAIMED = "claimed"
+DONE = "done"
+IN_PROGRESS = "in_progress"
+# Redis недоступен или у сообщения нет message_id - обрабатываем без защиты от повторов
+UNTRACKED = "untracked"
+
+def _key(message_id: str) -> str:
+    return f"message_processed:{message_id}"
+
+# Захватывает сообщение для обработки; повторная доставка уже обработанного сообщения вернёт DONE
+async def claim_message(message_id: Optional[str]) -> str:
+    if not message_id or not cache.pool:
+        return UNTRACKED
+    try:
+        if await cache.set_if_absent(_key(message_id), {"status": IN_PROGRESS}, MESSAGE_PROCESSING_LOCK_SECONDS):
+            return CLAIMED
+        state = await cache.get(_key(message_id))
+        return DONE if state and state.get("status") == DONE else IN_PROGRESS
+    except Exception as e:
+        logger.warning(f"Idempotency check failed for message {message_id}: {e}")
+        return UNTRACKED
+
+# Отмечает сообщение как обработанное
+async def complete_message(message_id: Optional[str]):
+    try:
+        await cache.set(_key(message_id), {"status": DONE}, expire=MESSAGE_IDEMPOTENCY_TTL_SECONDS)
+    except Exception as e:
+        logger.warning(f"Failed to mark message {message_id} as processed: {e}")
+
+# Снимает захват, чтобы повторная попытка могла обработать сообщение
+async def release_message(message_id: Optional[str]):
+    try:
+        await cache.delete(_key(message_id))
+    except Exception as e:
+        logger.warning(f"Failed to release message {message_id}: {e}")
+
+# Сколько ещё секунд действует захват сообщения другим потребителем
+async def lock_remaining_seconds(message_id: Optional[str]) -> int:
+    try:
+        remaining = await cache.ttl(_key(message_id))
+    except Exception as e:
+        logger.warning(f"Failed to get processing lock TTL for message {message_id}: {e}")
+        remaining = None
+    return max(1, remaining if remaining is not None else MESSAGE_PROCESSING_LOCK_SECONDS)
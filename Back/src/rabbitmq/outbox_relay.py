@@ -0,0 +1,64 @@
+import asyncio
+import signal
+from src.core.config import OUTBOX_BATCH_SIZE, OUTBOX_POLL_SECONDS
+from src.database.database import async_session_maker
+from src.logging_config import logger
+from src.rabbitmq.client import rabbitmq_client, build_message
+from src.services.outbox_service import lock_outbox_batch, delete_outbox_events
+
+MAX_RETRY_DELAY_SECONDS = 60
+
+# Отправляет одну пачку событий из outbox; возвращает количество отправленных событий
+async def relay_batch(batch_size: int = OUTBOX_BATCH_SIZE) -> int:
+    async with async_session_maker() as db:
+        events = await lock_outbox_batch(db, batch_size)
+        if not events:
+            await db.rollback()
+            return 0
+
+        # publish_many завершается, когда брокер подтвердил все сообщения пачки
+        await rabbitmq_client.publish_many(
+            (event.queue_name, build_message(event.payload, event.event_type, str(event.id)))
+            for event in events
+        )
+
+        await delete_outbox_events(db, [event.id for event in events])
+        await db.commit()
+        logger.info(f"Relayed {len(events)} outbox events")
+        return len(events)
+
+# Разгружает outbox, пока есть события, затем ждёт новых; при сбоях повторяет с задержкой
+async def run_relay(stop_event: asyncio.Event, batch_size: int = OUTBOX_BATCH_SIZE,
+                    poll_seconds: float = OUTBOX_POLL_SECONDS):
+    delay = poll_seconds
+    while not stop_event.is_set():
+        try:
+            relayed = await relay_batch(batch_size)
+            delay = poll_seconds
+            if relayed == batch_size:
+                continue
+        except Exception as e:
+            logger.error(f"Outbox relay failed: {e}. Retrying in {delay} seconds")
+            delay = min(delay * 2, MAX_RETRY_DELAY_SECONDS)
+
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+
+async def main():
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    await rabbitmq_client.connect()
+    try:
+        await run_relay(stop_event)
+    finally:
+        await rabbitmq_client.close()
+        logger.info("Outbox relay shut down gracefully")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
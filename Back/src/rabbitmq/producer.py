@@ -1,19 +1,18 @@
-from aio_pika import Message
-from .client import rabbitmq_client
-import json
+from typing import Optional
+from .client import rabbitmq_client, build_message
 from src.logging_config import logger
 
-# Публикует сообщение в указанную очередь RabbitMQ
-async def publish_message(message_data: dict, queue_name: str):
-    if not rabbitmq_client.channel:
-        raise RuntimeError("RabbitMQ client is not connected")
+# Публикует сообщение в указанную очередь RabbitMQ с подтверждением брокера
+async def publish_message(message_data: dict, queue_name: str, message_type: Optional[str] = None):
+    await rabbitmq_client.publish(queue_name, build_message(message_data, message_type))
+    logger.info(f"Message published to queue {queue_name}")
 
-    message_body = json.dumps(message_data).encode()
-
-    # Публикуем сообщение в очередь
-    await rabbitmq_client.channel.default_exchange.publish(
-        Message(body=message_body),
-        routing_key=queue_name
+# Публикует пачку сообщений в указанную очередь RabbitMQ
+async def publish_messages(messages_data: list[dict], queue_name: str, message_type: Optional[str] = None,
+                           message_ids: Optional[list[str]] = None):
+    message_ids = message_ids or [None] * len(messages_data)
+    await rabbitmq_client.publish_many(
+        (queue_name, build_message(message_data, message_type, message_id))
+        for message_data, message_id in zip(messages_data, message_ids)
     )
-    print(f"Message published to queue {queue_name} : {message_data}")
-    logger.info(f'Message published to queue {queue_name} : {message_data}')
+    logger.info(f"{len(messages_data)} messages published to queue {queue_name}")
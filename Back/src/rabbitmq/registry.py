@@ -0,0 +1,27 @@
+from typing import Awaitable, Callable
+
+# Обработчики сообщений по типу сообщения
+MESSAGE_HANDLERS: dict[str, Callable[[dict], Awaitable[None]]] = {}
+
+# Тип по умолчанию для сообщений без поля type (опубликованных до появления реестра)
+DEFAULT_MESSAGE_TYPES = {
+    "registration_queue": "user_registered",
+    "digest_queue": "nutrition_digest",
+}
+
+# Некорректное сообщение: повторная доставка не поможет
+class InvalidMessageError(ValueError):
+    pass
+
+# Сообщение обработано частично: повторить нужно только оставшуюся часть remaining
+class PartialFailureError(Exception):
+    def __init__(self, remaining: dict, error: Exception):
+        super().__init__(str(error))
+        self.remaining = remaining
+
+# Регистрирует обработчик для указанного типа сообщения
+def message_handler(message_type: str):
+    def decorator(func: Callable[[dict], Awaitable[None]]):
+        MESSAGE_HANDLERS[message_type] = func
+        return func
+    return decorator
@@ -0,0 +1,97 @@
+from typing import Optional
+from aio_pika import IncomingMessage, Message, DeliveryMode, ExchangeType
+from src.core.config import RABBITMQ_MAX_ATTEMPTS, RABBITMQ_RETRY_BASE_DELAY_SECONDS, RABBITMQ_DEAD_LETTER_EXCHANGE
+from src.logging_config import logger
+from src.rabbitmq.client import rabbitmq_client
+
+ATTEMPTS_HEADER = "x-attempts"
+ERROR_HEADER = "x-last-error"
+
+# Имя очереди задержки для указанной попытки
+def retry_queue_name(queue_name: str, attempt: int) -> str:
+    return f"{queue_name}.retry.{attempt}"
+
+# Имя очереди ожидания: сообщение, которое обрабатывает другой потребитель, ждёт в ней снятия захвата
+def wait_queue_name(queue_name: str) -> str:
+    return f"{queue_name}.wait"
+
+# Имя очереди для сообщений, которые не удалось обработать
+def dead_letter_queue_name(queue_name: str) -> str:
+    return f"{queue_name}.dead"
+
+# Задержка перед попыткой: растёт экспоненциально
+def retry_delay_seconds(attempt: int, base_delay: float = RABBITMQ_RETRY_BASE_DELAY_SECONDS) -> float:
+    return base_delay * 2 ** (attempt - 1)
+
+# Объявляет очереди задержки (по истечении TTL сообщение возвращается в основную очередь)
+# и exchange/очередь для «отравленных» сообщений
+async def declare_retry_topology(channel, queue_name: str, max_attempts: int = RABBITMQ_MAX_ATTEMPTS):
+    for attempt in range(1, max_attempts):
+        await channel.declare_queue(retry_queue_name(queue_name, attempt), durable=True, arguments={
+            "x-message-ttl": int(retry_delay_seconds(attempt) * 1000),
+            "x-dead-letter-exchange": "",
+            "x-dead-letter-routing-key": queue_name,
+        })
+
+    exchange = await channel.declare_exchange(RABBITMQ_DEAD_LETTER_EXCHANGE, ExchangeType.DIRECT, durable=True)
+    dead_queue = await channel.declare_queue(dead_letter_queue_name(queue_name), durable=True)
+    await dead_queue.bind(exchange, routing_key=queue_name)
+
+    # Без общего TTL очереди: срок ожидания задаётся для каждого сообщения
+    await channel.declare_queue(wait_queue_name(queue_name), durable=True, arguments={
+        "x-dead-letter-exchange": "",
+        "x-dead-letter-routing-key": queue_name,
+    })
+
+# Количество уже неудавшихся попыток обработки сообщения
+def get_attempts(message: IncomingMessage) -> int:
+    return int((message.headers or {}).get(ATTEMPTS_HEADER, 0))
+
+# Копия сообщения с обновлёнными заголовками для повторной публикации
+def clone_message(message: IncomingMessage, attempts: int, error: Optional[Exception] = None,
+                  expiration: Optional[float] = None, body: Optional[bytes] = None) -> Message:
+    headers = dict(message.headers or {})
+    headers[ATTEMPTS_HEADER] = attempts
+    if error is not None:
+        headers[ERROR_HEADER] = str(error)[:255]
+    return Message(
+        body=message.body if body is None else body,
+        content_type=message.content_type,
+        delivery_mode=DeliveryMode.PERSISTENT,
+        type=message.type,
+        message_id=message.message_id,
+        headers=headers,
+        expiration=expiration,
+    )
+
+# Отправляет сообщение в очередь «отравленных» сообщений
+async def dead_letter(message: IncomingMessage, queue_name: str, error: Exception, attempts: Optional[int] = None,
+                      body: Optional[bytes] = None):
+    attempts = get_attempts(message) if attempts is None else attempts
+    await rabbitmq_client.publish(queue_name, clone_message(message, attempts, error, body=body),
+                                  exchange_name=RABBITMQ_DEAD_LETTER_EXCHANGE)
+    logger.error(f"Message {message.message_id} from {queue_name} moved to dead letter queue "
+                 f"after {attempts} failed attempts: {error}")
+
+# Откладывает сообщение в очередь задержки; после последней попытки - в очередь «отравленных» сообщений.
+# body заменяет тело сообщения, если повторить нужно только его часть
+async def schedule_retry(message: IncomingMessage, queue_name: str, error: Exception,
+                         max_attempts: int = RABBITMQ_MAX_ATTEMPTS, body: Optional[bytes] = None):
+    attempts = get_attempts(message) + 1
+    if attempts >= max_attempts:
+        await dead_letter(message, queue_name, error, attempts, body)
+        return
+
+    await rabbitmq_client.publish(retry_queue_name(queue_name, attempts),
+                                  clone_message(message, attempts, error, body=body))
+    logger.warning(f"Message {message.message_id} from {queue_name} failed (attempt {attempts}), "
+                   f"retrying in {retry_delay_seconds(attempts)} seconds: {error}")
+
+# Откладывает сообщение, которое сейчас обрабатывает другой потребитель, до снятия захвата;
+# попытка не засчитывается, поэтому сообщение не уйдёт в «отравленные», пока захват не истечёт
+async def schedule_wait(message: IncomingMessage, queue_name: str, delay_seconds: float):
+    attempts = get_attempts(message)
+    await rabbitmq_client.publish(wait_queue_name(queue_name),
+                                  clone_message(message, attempts, expiration=delay_seconds))
+    logger.warning(f"Message {message.message_id} from {queue_name} is being processed by another consumer, "
+                   f"checking again in {delay_seconds} seconds")
@@ -1,22 +1,78 @@
+import argparse
 import asyncio
+import signal
+from src.cache.cache import cache
+from src.core.config import RABBITMQ_CONSUMER_COUNT
 from src.rabbitmq.consumer import consume_messages
 from src.rabbitmq.client import rabbitmq_client
 from src.logging_config import logger
+from src.services.email_service import smtp_pool
+from src.services.template_service import preload_templates
 
+RESTART_DELAY_SECONDS = 1
+MAX_RESTART_DELAY_SECONDS = 60
 
-async def main():
+# Запускает потребителей (каждый на своём канале) и держит их до сигнала остановки или обрыва соединения
+async def run_consumers(queue_name: str, consumer_count: int, stop_event: asyncio.Event):
+    await rabbitmq_client.connect()
+    consumers = []
     try:
-        await rabbitmq_client.connect()
-        await consume_messages()
-
-        # Бесконечный цикл для поддержания работы
-        while True:
-            await asyncio.sleep(1)
-    except Exception as e:
-        logger.error(f"Consumer failed: {e}")
+        for _ in range(consumer_count):
+            channel = await rabbitmq_client.open_channel()
+            queue, consumer_tag = await consume_messages(queue_name, channel)
+            consumers.append((channel, queue, consumer_tag))
+        logger.info(f"{consumer_count} consumers started for {queue_name}")
+
+        closed = asyncio.shield(rabbitmq_client.connection.closed())
+        stopped = asyncio.ensure_future(stop_event.wait())
+        await asyncio.wait([closed, stopped], return_when=asyncio.FIRST_COMPLETED)
+        closed.cancel()
+        stopped.cancel()
+        if not stop_event.is_set():
+            raise ConnectionError("RabbitMQ connection closed")
     finally:
+        # Перестаём получать новые сообщения; неподтверждённые сообщения брокер вернёт в очередь
+        for channel, queue, consumer_tag in consumers:
+            try:
+                await queue.cancel(consumer_tag)
+                await channel.close()
+            except Exception as e:
+                logger.warning(f"Error stopping consumer {consumer_tag}: {e}")
         await rabbitmq_client.close()
+        logger.info(f"Consumers for {queue_name} stopped")
+
+# Перезапускает потребителей при сбоях с экспоненциальной задержкой
+async def main(queue_name: str = "registration_queue", consumer_count: int = RABBITMQ_CONSUMER_COUNT):
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    preload_templates()
+    # Redis хранит ключи идемпотентности обработанных сообщений
+    await cache.connect()
+    delay = RESTART_DELAY_SECONDS
+    while not stop_event.is_set():
+        try:
+            await run_consumers(queue_name, consumer_count, stop_event)
+            delay = RESTART_DELAY_SECONDS
+        except Exception as e:
+            logger.error(f"Consumer failed: {e}. Restarting in {delay} seconds")
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, MAX_RESTART_DELAY_SECONDS)
+
+    await smtp_pool.close()
+    await cache.disconnect()
+    logger.info("Consumer service shut down gracefully")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run RabbitMQ consumers")
+    parser.add_argument("--queue", default="registration_queue", help="queue to consume from")
+    parser.add_argument("--consumers", type=int, default=RABBITMQ_CONSUMER_COUNT, help="number of consumers")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.queue, args.consumers))
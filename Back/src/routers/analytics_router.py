@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.core.security import get_current_principal
+from src.database.database import get_async_session
+from src.schemas.user import CurrentPrincipal
+from src.services.analytics_service import get_analytics_summary
+
+analytics_router = APIRouter()
+
+# Эндпоинт для получения сводной аналитики питания за последние N дней
+@analytics_router.get("/summary")
+async def get_summary(days: int = 30, db: AsyncSession = Depends(get_async_session),
+                      current_user: CurrentPrincipal = Depends(get_current_principal)):
+    return await get_analytics_summary(db, current_user.id, days)
@@ -6,12 +6,11 @@ import httpx
 from starlette.responses import RedirectResponse
 from src.core.config import CLIENT_ID, CLIENT_SECRET, REDIRECT_URI, GOOGLE_AUTH_URL, GOOGLE_TOKEN_URL, \
     GOOGLE_USERINFO_URL
-from src.core.security import create_access_token, get_current_user, oauth2_scheme
+from src.core.security import create_user_access_token, get_current_principal, oauth2_scheme
 from src.database.database import get_async_session
 from src.logging_config import logger
 from src.models.user import User
-from src.rabbitmq.consumer import consume_messages
-from src.schemas.user import UserCreate
+from src.schemas.user import UserCreate, CurrentPrincipal
 from src.services.auth_service import create_user, authenticate_user, validate_token_logic, logout_user
 import urllib.parse
 
@@ -75,7 +74,7 @@ async def google_callback(request: Request, db: AsyncSession = Depends(get_async
         user = new_user
         logger.info(f"Created new user: {user.email}")
 
-    access_token = create_access_token({"sub": user.login})
+    access_token = await create_user_access_token(db, user)
     logger.info(f"JWT token created for user: {user.email}")
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -108,10 +107,9 @@ async def get_google_user_info(access_token: str):
 @auth_router.post("/registration")
 async def registration(user: UserCreate, db: AsyncSession = Depends(get_async_session)):
     new_user = await create_user(db, user)
-    access_token = create_access_token(data={"sub": new_user.login})
     await db.commit()
     await db.refresh(new_user)
-    await consume_messages("registration_queue")
+    access_token = await create_user_access_token(db, new_user)
     logger.info(f"User {user.email} successfully registered")
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -130,13 +128,13 @@ async def login(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    access_token = create_access_token(data={"sub": form_data.username})
+    access_token = await create_user_access_token(db, user)
     logger.info(f"User {form_data.username} successfully logged in")
     return {"access_token": access_token, "token_type": "bearer"}
 
 # Эндпоинт для валидации токена
 @auth_router.post("/validate-token")
-async def validate_token(current_user: User = Depends(get_current_user)):
+async def validate_token(current_user: CurrentPrincipal = Depends(get_current_principal)):
     try:
         return validate_token_logic(current_user)
     except HTTPException as e:
@@ -144,5 +142,5 @@ async def validate_token(current_user: User = Depends(get_current_user)):
 
 # Эндпоинт для выхода пользователя (аннулирования токена)
 @auth_router.post("/logout")
-async def logout(token: str = Depends(oauth2_scheme), user: User = Depends(get_current_user)):
+async def logout(token: str = Depends(oauth2_scheme), user: CurrentPrincipal = Depends(get_current_principal)):
     return await logout_user(token)
@@ -5,6 +5,7 @@ from src.core.config import FILE_PATH
 from src.database.database import get_async_session
 from src.database.fill_database import fill_database
 from src.logging_config import logger
+from src.services.daily_nutrition_service import rebuild_daily_nutrition
 
 database_router = APIRouter()
 
@@ -21,3 +22,10 @@ async def fill_db(db: AsyncSession = Depends(get_async_session)):
         status_code=status.HTTP_200_OK,
         detail='Database filled successfully'
     )
+
+# Эндпоинт для пересборки суточной сводки питания из приемов пищи
+@database_router.post('/rebuild_daily_nutrition')
+async def rebuild_daily_totals(db: AsyncSession = Depends(get_async_session)):
+    rows = await rebuild_daily_nutrition(db)
+    logger.info(f"Daily nutrition rebuilt: {rows} rows")
+    return {"message": f"Daily nutrition rebuilt: {rows} rows"}
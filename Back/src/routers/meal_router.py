@@ -1,25 +1,61 @@
-from fastapi import APIRouter, Depends
+from datetime import date
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.core.security import get_current_user
+from src.core.security import get_current_principal
 from src.database.database import get_async_session
-from src.models.user import User
-from src.schemas.meal import MealUpdate, MealCreate
+from src.schemas.user import CurrentPrincipal
+from src.schemas.meal import MealUpdate, MealCreate, MealBulkCreate, MealBulkDelete, MealBulkRelog
+from src.services.daily_nutrition_service import get_daily_nutrition
 from src.services.meal_products_service import get_meal_products
 from src.services.meal_service import get_user_meals, get_meal_by_id, get_meals_by_date, \
-    get_meals_last_7_days, update_meal, delete_meal, add_meal, get_user_meals_with_products_by_date
+    get_meals_last_7_days, update_meal, delete_meal, add_meal, get_user_meals_with_products_by_date, get_meals_range, \
+    add_meals_bulk, delete_meals_bulk, relog_meals, copy_meal, copy_day
 
 meal_router = APIRouter()
 
 # Эндпоинт для добавления нового приема пищи
 @meal_router.post("/add")
-async def add(meal: MealCreate, current_user: User = Depends(get_current_user),
+async def add(meal: MealCreate, current_user: CurrentPrincipal = Depends(get_current_principal),
               db: AsyncSession = Depends(get_async_session)):
     return await add_meal(db, meal, current_user.id)
 
+# Эндпоинт для добавления нескольких приемов пищи одним запросом
+@meal_router.post("/bulk")
+async def add_bulk(payload: MealBulkCreate, current_user: CurrentPrincipal = Depends(get_current_principal),
+                   db: AsyncSession = Depends(get_async_session)):
+    return await add_meals_bulk(db, payload.meals, current_user.id)
+
+# Эндпоинт для удаления нескольких приемов пищи одним запросом
+@meal_router.post("/bulk/delete")
+async def delete_bulk(payload: MealBulkDelete, current_user: CurrentPrincipal = Depends(get_current_principal),
+                      db: AsyncSession = Depends(get_async_session)):
+    return await delete_meals_bulk(db, payload.meal_ids, current_user.id)
+
+# Эндпоинт для повторной записи приемов пищи на указанную дату (по умолчанию - сегодня)
+@meal_router.post("/bulk/relog")
+async def relog_bulk(payload: MealBulkRelog, current_user: CurrentPrincipal = Depends(get_current_principal),
+                     db: AsyncSession = Depends(get_async_session)):
+    return await relog_meals(db, payload.meal_ids, current_user.id, payload.recorded_at)
+
+# Эндпоинт для копирования приема пищи на указанную дату (по умолчанию - сегодня)
+@meal_router.post("/{meal_id}/copy")
+async def copy_one(meal_id: int, target_date: Optional[date] = Query(None, alias="to"),
+                   current_user: CurrentPrincipal = Depends(get_current_principal),
+                   db: AsyncSession = Depends(get_async_session)):
+    return await copy_meal(db, meal_id, current_user.id, target_date)
+
+# Эндпоинт для копирования всех приемов пищи за день на указанную дату (по умолчанию - сегодня)
+@meal_router.post("/day/{source_date}/copy")
+async def copy_whole_day(source_date: date, target_date: Optional[date] = Query(None, alias="to"),
+                         current_user: CurrentPrincipal = Depends(get_current_principal),
+                         db: AsyncSession = Depends(get_async_session)):
+    return await copy_day(db, source_date, current_user.id, target_date)
+
 # Эндпоинт для получения всех приемов пищи пользователя
 @meal_router.get("/all_meals")
 async def get_meals(db: AsyncSession = Depends(get_async_session),
-                          current_user: User = Depends(get_current_user)):
+                          current_user: CurrentPrincipal = Depends(get_current_principal)):
     return await get_user_meals(db, current_user.id)
 
 # Эндпоинт для получения продуктов в конкретном приеме пищи
@@ -30,35 +66,49 @@ async def get_products(meal_id: int, db: AsyncSession = Depends(get_async_sessio
 # Эндпоинт для получения приема пищи с продуктами по указанной дате
 @meal_router.get("/user_meals_with_products/info/{target_date}")
 async def get_users_meals_with_products(target_date: str, db: AsyncSession = Depends(get_async_session),
-                                        current_user: User = Depends(get_current_user)):
+                                        current_user: CurrentPrincipal = Depends(get_current_principal)):
     return await get_user_meals_with_products_by_date(db, current_user.id, target_date)
 
+# Эндпоинт для получения суточных итогов питания за период
+@meal_router.get("/daily_nutrition")
+async def get_daily_totals(start_date: date, end_date: date, db: AsyncSession = Depends(get_async_session),
+                           current_user: CurrentPrincipal = Depends(get_current_principal)):
+    return await get_daily_nutrition(db, current_user.id, start_date, end_date)
+
+# Эндпоинт для получения итогов питания за диапазон дат по дням или неделям (и, по запросу, приемов пищи)
+@meal_router.get("/range")
+async def get_range(start_date: date = Query(alias="from"), end_date: date = Query(alias="to"),
+                    granularity: Literal["day", "week"] = "day", include_meals: bool = False,
+                    db: AsyncSession = Depends(get_async_session),
+                    current_user: CurrentPrincipal = Depends(get_current_principal)):
+    return await get_meals_range(db, current_user.id, start_date, end_date, granularity, include_meals)
+
 # Эндпоинт для получения приема пищи по его ID
 @meal_router.get("/id/{meal_id}")
-async def find_by_id(meal_id: int, current_user: User = Depends(get_current_user),
+async def find_by_id(meal_id: int, current_user: CurrentPrincipal = Depends(get_current_principal),
                           db: AsyncSession = Depends(get_async_session)):
     return await get_meal_by_id(db, meal_id, current_user.id)
 
 # Эндпоинт для получения приемов пищи по указанной дате
 @meal_router.get("/date/{target_date}")
-async def find_by_date(target_date: str, current_user: User = Depends(get_current_user),
+async def find_by_date(target_date: str, current_user: CurrentPrincipal = Depends(get_current_principal),
                              db: AsyncSession = Depends(get_async_session)):
     return await get_meals_by_date(db, current_user.id, target_date)
 
 # Эндпоинт для получения истории приемов пищи за последние 7 дней
 @meal_router.get("/history")
-async def find_meal_history(current_user: User = Depends(get_current_user),
+async def find_meal_history(current_user: CurrentPrincipal = Depends(get_current_principal),
                             db: AsyncSession = Depends(get_async_session)):
     return await get_meals_last_7_days(db, current_user.id)
 
 # Эндпоинт для обновления данных о приеме пищи
 @meal_router.put("/{meal_id}")
-async def update(meal_update: MealUpdate, meal_id: int, current_user: User = Depends(get_current_user),
+async def update(meal_update: MealUpdate, meal_id: int, current_user: CurrentPrincipal = Depends(get_current_principal),
                  db: AsyncSession = Depends(get_async_session)):
     return await update_meal(db, meal_update, meal_id, current_user.id)
 
 # Эндпоинт для удаления приема пищи
 @meal_router.delete("/{meal_id}")
-async def delete(meal_id: int, current_user: User = Depends(get_current_user),
+async def delete(meal_id: int, current_user: CurrentPrincipal = Depends(get_current_principal),
                  db: AsyncSession = Depends(get_async_session)):
     return await delete_meal(db, meal_id, current_user.id)
@@ -0,0 +1,37 @@
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.core.security import get_current_principal
+from src.database.database import get_async_session
+from src.schemas.meal_template import MealTemplateCreate
+from src.schemas.user import CurrentPrincipal
+from src.services.meal_template_service import get_meal_templates, create_meal_template, delete_meal_template, \
+    log_meal_template
+
+meal_template_router = APIRouter()
+
+# Эндпоинт для получения сохранённых шаблонов приемов пищи пользователя
+@meal_template_router.get("/all")
+async def get_templates(db: AsyncSession = Depends(get_async_session),
+                        current_user: CurrentPrincipal = Depends(get_current_principal)):
+    return await get_meal_templates(db, current_user.id)
+
+# Эндпоинт для сохранения нового шаблона приема пищи
+@meal_template_router.post("/add")
+async def add(template: MealTemplateCreate, current_user: CurrentPrincipal = Depends(get_current_principal),
+              db: AsyncSession = Depends(get_async_session)):
+    return await create_meal_template(db, template, current_user.id)
+
+# Эндпоинт для записи приема пищи из шаблона на указанную дату (по умолчанию - сегодня)
+@meal_template_router.post("/{template_id}/log")
+async def log(template_id: int, recorded_at: Optional[date] = None,
+              current_user: CurrentPrincipal = Depends(get_current_principal),
+              db: AsyncSession = Depends(get_async_session)):
+    return await log_meal_template(db, template_id, current_user.id, recorded_at)
+
+# Эндпоинт для удаления шаблона приема пищи
+@meal_template_router.delete("/{template_id}")
+async def delete(template_id: int, current_user: CurrentPrincipal = Depends(get_current_principal),
+                 db: AsyncSession = Depends(get_async_session)):
+    return await delete_meal_template(db, template_id, current_user.id)
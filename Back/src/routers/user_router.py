@@ -1,9 +1,9 @@
 from fastapi import APIRouter, Depends, status, HTTPException, UploadFile, File, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.core.security import get_current_user
+from src.core.security import get_current_user, get_current_principal
 from src.database.database import get_async_session
 from src.models.user import User
-from src.schemas.user import UserUpdate, UserCalculateNutrients, UserRead
+from src.schemas.user import UserUpdate, UserCalculateNutrients, UserRead, CurrentPrincipal
 from src.services.user_service import delete_user, calculate_recommended_nutrients, get_profile_picture, \
     upload_profile_picture
 from src.services.user_service import update_user, find_user_by_login_and_email
@@ -51,7 +51,7 @@ async def calculate_nutrients_for_all_users(user: UserCalculateNutrients):
 @user_router.post("/upload-profile-picture")
 async def upload_photo(
     file: UploadFile = File(...),  # Получаем файл из запроса
-    current_user: User = Depends(get_current_user),  # Получаем текущего пользователя
+    current_user: CurrentPrincipal = Depends(get_current_principal),  # Получаем текущего пользователя
     db: AsyncSession = Depends(get_async_session),  # Получаем сессию базы данных
 ):
     # Загружаем фото профиля пользователя
@@ -61,7 +61,7 @@ async def upload_photo(
 # Эндпоинт для получения фото профиля
 @user_router.get("/profile-picture")
 async def get_photo(
-    current_user: User = Depends(get_current_user),  # Получаем текущего пользователя
+    current_user: CurrentPrincipal = Depends(get_current_principal),  # Получаем текущего пользователя
     db: AsyncSession = Depends(get_async_session),  # Получаем сессию базы данных
 ):
     # Получаем фото профиля пользователя
@@ -0,0 +1,26 @@
+from datetime import date
+from typing import Dict, List, Optional
+from pydantic import BaseModel
+
+class MacroSplit(BaseModel):
+    proteins: float
+    fats: float
+    carbohydrates: float
+
+class AnalyticsSummary(BaseModel):
+    start_date: date
+    end_date: date
+    days: int
+    days_logged: int
+    average_calories: float
+    calories_rolling_7d: List[Optional[float]] = []
+    recommended_calories: Optional[float] = None
+    adherence_rate: Optional[float] = None
+    average_target_ratio: Optional[float] = None
+    macro_split: Optional[MacroSplit] = None
+    target_macro_split: Optional[MacroSplit] = None
+    weekday_average_calories: Dict[str, Optional[float]] = {}
+    current_streak: int = 0
+    longest_streak: int = 0
+    weight_change: Optional[float] = None
+    weight_trend_per_week: Optional[float] = None
@@ -0,0 +1,32 @@
+from datetime import date
+from typing import List, Literal, Optional
+from pydantic import BaseModel
+from src.schemas.meal import MealRead
+
+class DailyNutritionRead(BaseModel):
+    recorded_at: date
+    calories: float
+    proteins: float
+    fats: float
+    carbohydrates: float
+    meal_count: int
+
+    class Config:
+        from_attributes = True
+
+class NutritionPeriod(BaseModel):
+    start_date: date
+    end_date: date
+    calories: float = 0
+    proteins: float = 0
+    fats: float = 0
+    carbohydrates: float = 0
+    meal_count: int = 0
+    days_logged: int = 0
+    meals: Optional[List[MealRead]] = None
+
+class NutritionRange(BaseModel):
+    start_date: date
+    end_date: date
+    granularity: Literal["day", "week"]
+    periods: List[NutritionPeriod] = []
@@ -50,3 +50,16 @@ class MealCreate(BaseModel):
     fats: float
     carbohydrates: float
     products: Optional[List[MealProductsCreate]] = []
+
+class MealBulkItem(MealCreate):
+    recorded_at: Optional[date] = None
+
+class MealBulkCreate(BaseModel):
+    meals: List[MealBulkItem]
+
+class MealBulkDelete(BaseModel):
+    meal_ids: List[int]
+
+class MealBulkRelog(BaseModel):
+    meal_ids: List[int]
+    recorded_at: Optional[date] = None
@@ -0,0 +1,21 @@
+from typing import List
+from pydantic import BaseModel
+from src.schemas.meal_products import MealProductsCreate
+from src.schemas.product import ProductRead
+
+class MealTemplateRead(BaseModel):
+    id: int
+    name: str
+    weight: float
+    calories: float
+    proteins: float
+    fats: float
+    carbohydrates: float
+    products: List[ProductRead] = []
+
+    class Config:
+        from_attributes = True
+
+class MealTemplateCreate(BaseModel):
+    name: str
+    products: List[MealProductsCreate]
@@ -23,6 +23,10 @@ class UserRead(BaseModel):
     class Config:
         from_attributes = True
 
+class CurrentPrincipal(BaseModel):
+    id: int
+    login: str
+
 class UserCalculateNutrients(BaseModel):
     id: Optional[int] = None
     login: Optional[str] = None
@@ -0,0 +1,166 @@
+from datetime import date, timedelta
+from typing import Optional
+import numpy as np
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
+from src.cache.cache import cache
+from src.core.config import ANALYTICS_MAX_DAYS, ANALYTICS_ADHERENCE_TOLERANCE
+from src.logging_config import logger
+from src.models.daily_nutrition import DailyNutrition
+from src.models.user import User
+from src.models.user_weight import UserWeight
+from src.schemas.analytics import AnalyticsSummary, MacroSplit
+from src.schemas.user import UserCalculateNutrients
+from src.services.nutrient_engine import NUTRIENTS
+from src.services.user_service import calculate_recommended_nutrients
+
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+ROLLING_WINDOW_DAYS = 7
+# Калорийность 1 г белков, жиров и углеводов
+ENERGY_PER_GRAM = np.array([4, 9, 4], dtype=np.float64)
+
+# Загружает суточные итоги пользователя в плотные массивы по дням периода:
+# матрица нутриентов (дни без записей - нули) и маска дней с приёмами пищи
+async def load_daily_series(db: AsyncSession, user_id: int, start_date: date, days: int):
+    result = await db.execute(
+        select(DailyNutrition.recorded_at, *(getattr(DailyNutrition, name) for name in NUTRIENTS),
+               DailyNutrition.meal_count)
+        .where(DailyNutrition.user_id == user_id)
+        .where(DailyNutrition.recorded_at >= start_date, DailyNutrition.recorded_at < start_date + timedelta(days=days))
+    )
+    rows = result.all()
+    nutrients = np.zeros((days, len(NUTRIENTS)), dtype=np.float64)
+    meal_counts = np.zeros(days, dtype=np.int64)
+    if rows:
+        offsets = np.array([(row[0] - start_date).days for row in rows])
+        nutrients[offsets] = [row[1:1 + len(NUTRIENTS)] for row in rows]
+        meal_counts[offsets] = [row[-1] for row in rows]
+    return nutrients, meal_counts > 0
+
+# Загружает записи веса за период: смещения в днях от начала периода и значения
+async def load_weight_series(db: AsyncSession, user_id: int, start_date: date, end_date: date):
+    result = await db.execute(
+        select(UserWeight.recorded_at, UserWeight.weight)
+        .where(UserWeight.user_id == user_id)
+        .where(UserWeight.recorded_at >= start_date, UserWeight.recorded_at <= end_date)
+        .order_by(UserWeight.recorded_at)
+    )
+    rows = result.all()
+    offsets = np.array([(recorded_at - start_date).days for recorded_at, _ in rows], dtype=np.float64)
+    weights = np.array([weight for _, weight in rows], dtype=np.float64)
+    return offsets, weights
+
+# Скользящее среднее по дням с записями в окне; NaN, если в окне записей нет
+def rolling_average(values: np.ndarray, logged: np.ndarray, window: int) -> np.ndarray:
+    sums = np.cumsum(np.where(logged, values, 0))
+    counts = np.cumsum(logged)
+    sums[window:] = sums[window:] - sums[:-window]
+    counts[window:] = counts[window:] - counts[:-window]
+    return np.divide(sums, counts, out=np.full(len(values), np.nan), where=counts > 0)
+
+# Серии подряд идущих дней с записями: (текущая, самая длинная); текущая серия
+# не прерывается, если за сегодня записей ещё нет
+def logging_streaks(logged: np.ndarray) -> tuple[int, int]:
+    edges = np.diff(np.concatenate(([0], logged.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    if not len(starts):
+        return 0, 0
+    lengths = ends - starts
+    current = int(lengths[-1]) if ends[-1] >= len(logged) - 1 else 0
+    return current, int(lengths.max())
+
+# Доли белков, жиров и углеводов в энергии по граммам [белки, жиры, углеводы]
+def macro_split(grams: np.ndarray) -> Optional[MacroSplit]:
+    energy = np.asarray(grams, dtype=np.float64) * ENERGY_PER_GRAM
+    total = energy.sum()
+    if total <= 0:
+        return None
+    proteins, fats, carbohydrates = np.round(energy / total, 4).tolist()
+    return MacroSplit(proteins=proteins, fats=fats, carbohydrates=carbohydrates)
+
+# Рекомендации по питанию пользователя; None, если профиль заполнен не полностью
+async def get_recommended_nutrients(user: User) -> Optional[dict]:
+    try:
+        recommended = await calculate_recommended_nutrients(UserCalculateNutrients.model_validate(user))
+    except ValueError:
+        return None
+    if user.recommended_calories:
+        recommended["calories"] = user.recommended_calories
+    return recommended
+
+def to_optional(value: float, digits: int = 2) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), digits)
+
+# Сводная аналитика питания за последние days дней: скользящие средние, выполнение нормы калорий,
+# распределение макронутриентов, средние по дням недели, серии и тренд веса; все расчёты
+# выполняются над массивами NumPy, результат кешируется до следующей записи в дневник или веса
+async def get_analytics_summary(db: AsyncSession, user_id: int, days: int = 30,
+                                today: Optional[date] = None) -> AnalyticsSummary:
+    if not 1 <= days <= ANALYTICS_MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Days must be between 1 and {ANALYTICS_MAX_DAYS}"
+        )
+
+    result = await db.execute(select(User).options(defer(User.profile_picture)).where(User.id == user_id))
+    user = result.scalar_one_or_none()
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
+    # Сводка сбрасывается при записи приёмов пищи и при изменении профиля (и рекомендаций)
+    today = today or date.today()
+    cache_key = f"analytics_summary:{user_id}"
+    cache_field = f"{today}:{days}"
+    cached_data = await cache.get_field(cache_key, cache_field)
+    if cached_data:
+        logger.info(f"Cache hit for analytics summary {cache_field} of user {user_id}.")
+        return AnalyticsSummary.model_validate(cached_data)
+
+    logger.info(f"Cache miss for analytics summary {cache_field} of user {user_id}. Calculating.")
+    start_date = today - timedelta(days=days - 1)
+    nutrients, logged = await load_daily_series(db, user_id, start_date, days)
+    calories = nutrients[:, 0]
+    logged_calories = calories[logged]
+
+    weekdays = (start_date.weekday() + np.arange(days)) % 7
+    weekday_counts = np.bincount(weekdays[logged], minlength=7)
+    weekday_sums = np.bincount(weekdays[logged], weights=logged_calories, minlength=7)
+    weekday_averages = np.divide(weekday_sums, weekday_counts, out=np.full(7, np.nan), where=weekday_counts > 0)
+
+    current_streak, longest_streak = logging_streaks(logged)
+    summary = AnalyticsSummary(
+        start_date=start_date,
+        end_date=today,
+        days=days,
+        days_logged=int(logged.sum()),
+        average_calories=round(float(logged_calories.mean()), 2) if len(logged_calories) else 0,
+        calories_rolling_7d=[to_optional(value) for value in rolling_average(calories, logged, ROLLING_WINDOW_DAYS)],
+        macro_split=macro_split(nutrients[logged, 1:].sum(axis=0)),
+        weekday_average_calories={name: to_optional(value) for name, value in zip(WEEKDAYS, weekday_averages)},
+        current_streak=current_streak,
+        longest_streak=longest_streak
+    )
+
+    recommended = await get_recommended_nutrients(user)
+    if recommended:
+        summary.recommended_calories = recommended["calories"]
+        summary.target_macro_split = macro_split(
+            [recommended["protein"], recommended["fat"], recommended["carbohydrates"]]
+        )
+        if len(logged_calories):
+            ratios = logged_calories / recommended["calories"]
+            summary.adherence_rate = round(float(np.mean(np.abs(ratios - 1) <= ANALYTICS_ADHERENCE_TOLERANCE)), 4)
+            summary.average_target_ratio = round(float(ratios.mean()), 4)
+
+    offsets, weights = await load_weight_series(db, user_id, start_date, today)
+    if len(weights) >= 2:
+        summary.weight_change = round(float(weights[-1] - weights[0]), 2)
+        if offsets[-1] > offsets[0]:
+            summary.weight_trend_per_week = round(float(np.polyfit(offsets, weights, 1)[0] * 7), 3)
+
+    await cache.set_field(cache_key, cache_field, summary.model_dump(mode="json"), expire=3600)
+    logger.info(f"Analytics summary {cache_field} for user {user_id} cached successfully.")
+    return summary
@@ -6,11 +6,11 @@ from sqlalchemy import or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.cache.cache import cache
 from src.core.config import SECRET_AUTH, ALGORITHM
-from src.core.security import verify_password, get_password_hash, add_token_to_blacklist
+from src.core.security import verify_and_update_password, get_password_hash, add_token_to_blacklist
 from src.logging_config import logger
 from src.models.user import User
-from src.rabbitmq.producer import publish_message
 from src.schemas.user import *
+from src.services.outbox_service import add_outbox_event
 from src.services.user_service import find_user_by_login_and_email
 
 # Регулярное выражение для проверки только английских символов
@@ -34,7 +34,18 @@ async def authenticate_user(db: AsyncSession, email_login: str, password: str):
         user = result.scalar_one_or_none()
 
         # Проверяем пароль
-        if user and verify_password(password, user.hashed_password):
+        if user:
+            verified, new_hash = await verify_and_update_password(password, user.hashed_password)
+        else:
+            verified, new_hash = False, None
+
+        if verified:
+            # Перехэшируем пароль, если изменилась стоимость bcrypt
+            if new_hash:
+                user.hashed_password = new_hash
+                await db.commit()
+                logger.info(f"Password rehashed with current bcrypt cost for user: {email_login}")
+
             user_pydantic = UserRead.model_validate(user)
             await cache.set(cache_key, user_pydantic.model_dump(mode="json"))
             return user_pydantic
@@ -43,6 +54,11 @@ async def authenticate_user(db: AsyncSession, email_login: str, password: str):
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid login credentials"
         )
+    except HTTPException as http_exc:
+        # Пул хэширования перегружен - отдаём 503 вместо неудачной авторизации
+        if http_exc.status_code == status.HTTP_503_SERVICE_UNAVAILABLE:
+            raise
+        logger.error(f"Error authenticating user {email_login}: {str(http_exc)}")
     except Exception as e:
         logger.error(f"Error authenticating user {email_login}: {str(e)}")
 
@@ -79,22 +95,23 @@ async def create_user(db: AsyncSession, user: UserCreate):
             )
 
         # Хэшируем пароль и создаем пользователя
-        hashed_password = get_password_hash(user.password)
+        hashed_password = await get_password_hash(user.password)
         new_user = User(
             login=user.login,
             email=user.email,
             hashed_password=hashed_password,
         )
         db.add(new_user)
-        await db.commit()
-        await db.refresh(new_user)
 
-        # Публикация сообщения в очередь RabbitMQ
+        # Событие для RabbitMQ сохраняется в outbox в той же транзакции, отправляет его релей
         message_data = {
             "email": new_user.email,
             "login": new_user.login,
         }
-        await publish_message(message_data, "registration_queue")
+        add_outbox_event(db, "user_registered", "registration_queue", message_data)
+
+        await db.commit()
+        await db.refresh(new_user)
 
         logger.info(f"User created successfully: {new_user.login}")
         return new_user
@@ -118,8 +135,8 @@ async def logout_user(token: str):
         payload = jwt.decode(token, SECRET_AUTH, algorithms=[ALGORITHM])
         exp = datetime.utcfromtimestamp(payload.get("exp"))
 
-        # Добавляем токен в черный список
-        await add_token_to_blacklist(token, exp)
+        # Добавляем токен в черный список; токены, выпущенные до появления jti, отзываются целиком
+        await add_token_to_blacklist(payload.get("jti") or token, exp)
         logger.info("User successfully logged out")
         return {"message": "Successfully logged out"}
     except jwt.PyJWTError:
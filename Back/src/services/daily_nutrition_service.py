@@ -0,0 +1,103 @@
+import time
+from datetime import date
+from typing import Optional
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.core.config import MAINTENANCE_BATCH_SIZE
+from src.logging_config import logger
+from src.models.daily_nutrition import DailyNutrition
+from src.models.meal import Meal
+from src.models.user import User
+from src.schemas.daily_nutrition import DailyNutritionRead
+from src.services.maintenance_service import log_progress
+from src.services.nutrient_engine import NUTRIENTS
+
+# Итоги нутриентов приёма пищи в виде словаря
+def meal_totals(meal) -> dict:
+    return {name: getattr(meal, name) or 0 for name in NUTRIENTS}
+
+# Разница между новыми и старыми итогами приёма пищи
+def totals_delta(new: dict, old: dict) -> dict:
+    return {name: new.get(name, 0) - old.get(name, 0) for name in NUTRIENTS}
+
+# Прибавляет изменения к суточным итогам одним многострочным upsert: {дата: (изменение нутриентов,
+# изменение числа приёмов пищи)}; коммит остаётся за вызывающим кодом,
+# чтобы итоги менялись в одной транзакции с приёмами пищи
+async def apply_daily_deltas(db: AsyncSession, user_id: int, deltas: dict[date, tuple[dict, int]]):
+    rows = []
+    for recorded_at, (delta, meal_count) in deltas.items():
+        values = {name: delta.get(name, 0) for name in NUTRIENTS}
+        if meal_count or any(values.values()):
+            rows.append({"user_id": user_id, "recorded_at": recorded_at, "meal_count": meal_count, **values})
+    if not rows:
+        return
+
+    stmt = insert(DailyNutrition).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DailyNutrition.user_id, DailyNutrition.recorded_at],
+        set_={name: getattr(DailyNutrition, name) + stmt.excluded[name] for name in (*NUTRIENTS, "meal_count")}
+    )
+    await db.execute(stmt)
+
+    # День без приёмов пищи в сводке не храним
+    emptied = [recorded_at for recorded_at, (_, meal_count) in deltas.items() if meal_count < 0]
+    if emptied:
+        await db.execute(delete(DailyNutrition).where(
+            DailyNutrition.user_id == user_id,
+            DailyNutrition.recorded_at.in_(emptied),
+            DailyNutrition.meal_count <= 0
+        ))
+    logger.info(f"Daily nutrition of user {user_id} changed for {len(rows)} days")
+
+# Прибавляет изменение к суточным итогам одного дня
+async def apply_daily_delta(db: AsyncSession, user_id: int, recorded_at: date, delta: dict, meal_count: int = 0):
+    await apply_daily_deltas(db, user_id, {recorded_at: (delta, meal_count)})
+
+# Суточные итоги пользователя за период
+async def get_daily_nutrition(db: AsyncSession, user_id: int, start_date: date, end_date: date):
+    result = await db.execute(
+        select(DailyNutrition)
+        .where(DailyNutrition.user_id == user_id)
+        .where(DailyNutrition.recorded_at >= start_date, DailyNutrition.recorded_at <= end_date)
+        .order_by(DailyNutrition.recorded_at)
+    )
+    return [DailyNutritionRead.model_validate(row) for row in result.scalars().all()]
+
+# Пересобирает сводку из приёмов пищи: диапазон id пользователей - одна транзакция
+# с DELETE и INSERT ... SELECT ... GROUP BY; user_id ограничивает пересборку одним пользователем
+async def rebuild_daily_nutrition(db: AsyncSession, user_id: Optional[int] = None,
+                                  batch_size: int = MAINTENANCE_BATCH_SIZE) -> int:
+    started = time.perf_counter()
+    if user_id is not None:
+        ranges = [(user_id - 1, user_id)]
+    else:
+        max_user_id = (await db.execute(select(func.max(User.id)))).scalar() or 0
+        ranges = [(lower, lower + batch_size) for lower in range(0, max_user_id, batch_size)]
+
+    total = 0
+    for lower, upper in ranges:
+        await db.execute(delete(DailyNutrition).where(
+            DailyNutrition.user_id > lower, DailyNutrition.user_id <= upper
+        ))
+        daily_totals = (
+            select(
+                Meal.user_id,
+                Meal.recorded_at,
+                *(func.sum(getattr(Meal, name)) for name in NUTRIENTS),
+                func.count(Meal.id)
+            )
+            .where(Meal.user_id > lower, Meal.user_id <= upper)
+            .group_by(Meal.user_id, Meal.recorded_at)
+        )
+        result = await db.execute(
+            insert(DailyNutrition).from_select(
+                ["user_id", "recorded_at", *NUTRIENTS, "meal_count"], daily_totals
+            )
+        )
+        await db.commit()
+        total += result.rowcount
+        log_progress("rebuild_daily_nutrition", total, started)
+
+    log_progress("rebuild_daily_nutrition", total, started, finished=True)
+    return total
@@ -0,0 +1,135 @@
+from datetime import date, timedelta
+from typing import Optional
+from sqlalchemy import select, func, distinct
+from sqlalchemy.dialects.postgresql import array_agg, aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.core.config import DIGEST_QUEUE, DIGEST_BATCH_SIZE, DIGEST_EMAILS_PER_MESSAGE
+from src.database.database import async_session_maker
+from src.logging_config import logger
+from src.models.meal import Meal
+from src.models.user import User
+from src.models.user_weight import UserWeight
+from src.rabbitmq.producer import publish_messages
+
+# Длина периода дайджеста в днях
+DIGEST_PERIODS = {"daily": 1, "weekly": 7}
+DIGEST_TITLES = {"daily": "Your daily Food Diary summary", "weekly": "Your weekly Food Diary summary"}
+
+# Границы периода дайджеста: период заканчивается вчерашним днём
+def get_digest_period(period: str, today: Optional[date] = None) -> tuple[date, date]:
+    today = today or date.today()
+    end = today - timedelta(days=1)
+    return end - timedelta(days=DIGEST_PERIODS[period] - 1), end
+
+# Агрегаты за период для пачки пользователей с id > after_user_id - один запрос на пачку
+async def fetch_digest_batch(db: AsyncSession, start: date, end: date, after_user_id: int = 0,
+                             batch_size: int = DIGEST_BATCH_SIZE) -> list:
+    users = (
+        select(User.id, User.login, User.firstname, User.email, User.recommended_calories)
+        .where(User.id > after_user_id)
+        .order_by(User.id)
+        .limit(batch_size)
+        .cte("digest_users")
+    )
+    meals = (
+        select(
+            Meal.user_id,
+            func.sum(Meal.calories).label("calories"),
+            func.sum(Meal.proteins).label("proteins"),
+            func.sum(Meal.fats).label("fats"),
+            func.sum(Meal.carbohydrates).label("carbohydrates"),
+            func.count(distinct(Meal.recorded_at)).label("days_logged"),
+        )
+        .join(users, users.c.id == Meal.user_id)
+        .where(Meal.recorded_at.between(start, end))
+        .group_by(Meal.user_id)
+        .subquery("digest_meals")
+    )
+    # Первый вес берётся не раньше чем за период до начала, чтобы тренд был виден и в дневном дайджесте
+    weights = (
+        select(
+            UserWeight.user_id,
+            array_agg(aggregate_order_by(UserWeight.weight, UserWeight.recorded_at.asc()))[1].label("first_weight"),
+            array_agg(aggregate_order_by(UserWeight.weight, UserWeight.recorded_at.desc()))[1].label("last_weight"),
+        )
+        .join(users, users.c.id == UserWeight.user_id)
+        .where(UserWeight.recorded_at.between(start - (end - start) - timedelta(days=1), end))
+        .group_by(UserWeight.user_id)
+        .subquery("digest_weights")
+    )
+    query = (
+        select(
+            users.c.id, users.c.login, users.c.firstname, users.c.email, users.c.recommended_calories,
+            meals.c.calories, meals.c.proteins, meals.c.fats, meals.c.carbohydrates, meals.c.days_logged,
+            weights.c.first_weight, weights.c.last_weight,
+        )
+        .outerjoin(meals, meals.c.user_id == users.c.id)
+        .outerjoin(weights, weights.c.user_id == users.c.id)
+        .order_by(users.c.id)
+    )
+    result = await db.execute(query)
+    return result.all()
+
+# Контекст письма для одного пользователя; None, если за период нет записей
+def build_digest_context(row, period: str, start: date, end: date) -> Optional[dict]:
+    if not row.days_logged:
+        return None
+
+    # Средние считаются по дням с записями: пропущенные дни не занижают итог
+    days = row.days_logged
+    avg_calories = row.calories / days
+    context = {
+        "user_id": row.id,
+        "email": row.email,
+        "user_name": row.firstname or row.login,
+        "period": period,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "days_logged": row.days_logged,
+        "avg_calories": round(avg_calories),
+        "avg_proteins": round(row.proteins / days, 1),
+        "avg_fats": round(row.fats / days, 1),
+        "avg_carbohydrates": round(row.carbohydrates / days, 1),
+        "recommended_calories": round(row.recommended_calories) if row.recommended_calories else None,
+        "calories_diff_percent": None,
+        "weight": row.last_weight,
+        "weight_change": None,
+    }
+    if row.recommended_calories:
+        context["calories_diff_percent"] = round((avg_calories - row.recommended_calories)
+                                                 / row.recommended_calories * 100)
+    if row.first_weight is not None and row.last_weight is not None:
+        context["weight_change"] = round(row.last_weight - row.first_weight, 1)
+    return context
+
+# Собирает дайджесты всех пользователей пачками и публикует их в очередь писем;
+# каждое сообщение содержит до emails_per_message писем. Возвращает количество писем
+async def publish_digests(period: str, today: Optional[date] = None, batch_size: int = DIGEST_BATCH_SIZE,
+                          emails_per_message: int = DIGEST_EMAILS_PER_MESSAGE, session_maker=async_session_maker) -> int:
+    start, end = get_digest_period(period, today)
+    title = DIGEST_TITLES[period]
+    after_user_id = 0
+    total = 0
+
+    while True:
+        async with session_maker() as db:
+            rows = await fetch_digest_batch(db, start, end, after_user_id, batch_size)
+        if not rows:
+            break
+        after_user_id = rows[-1].id
+
+        contexts = [context for row in rows if (context := build_digest_context(row, period, start, end))]
+        chunks = [contexts[i:i + emails_per_message] for i in range(0, len(contexts), emails_per_message)]
+        if chunks:
+            # Повторный запуск за тот же период даст те же message_id, и письма не уйдут дважды
+            await publish_messages(
+                [{"period": period, "title": title, "recipients": chunk} for chunk in chunks],
+                DIGEST_QUEUE,
+                "nutrition_digest",
+                [f"digest:{period}:{end.isoformat()}:{chunk[0]['user_id']}" for chunk in chunks],
+            )
+        total += len(contexts)
+        logger.info(f"Published {period} digests for users up to {after_user_id} ({total} emails so far)")
+
+    logger.info(f"{period.capitalize()} digest for {start} - {end} published: {total} emails")
+    return total
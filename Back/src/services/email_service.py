@@ -1,29 +1,159 @@
-from aiosmtplib import SMTP
+import asyncio
+import time
+from typing import Iterable, Optional
+from aiosmtplib import SMTP, SMTPException, SMTPResponseException, SMTPRecipientsRefused
 from email.message import EmailMessage
 from fastapi import HTTPException
-from src.core.config import SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD, TEMPLATES_PATH
-from jinja2 import Environment, FileSystemLoader
+from src.core.config import SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD, SMTP_USE_TLS, \
+    SMTP_TIMEOUT, SMTP_POOL_SIZE, SMTP_MAX_MESSAGES_PER_CONNECTION, SMTP_KEEPALIVE_SECONDS
 from src.logging_config import logger
+from src.services.template_service import render_email
 
-# Инициализация шаблонизатора Jinja2
-env = Environment(loader=FileSystemLoader(TEMPLATES_PATH))
+# Код ответа сервера о закрытии сессии: письмо можно повторить на новом соединении
+SMTP_SERVICE_CLOSING = 421
+
+class PooledSMTPConnection:
+    def __init__(self, smtp: SMTP):
+        self.smtp = smtp
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+class SMTPPool:
+    def __init__(self, hostname: Optional[str] = SMTP_HOST, port=SMTP_PORT, use_tls: bool = SMTP_USE_TLS,
+                 username: Optional[str] = SMTP_USER, password: Optional[str] = SMTP_PASSWORD,
+                 size: int = SMTP_POOL_SIZE, max_messages: int = SMTP_MAX_MESSAGES_PER_CONNECTION,
+                 keepalive_seconds: float = SMTP_KEEPALIVE_SECONDS, timeout: float = SMTP_TIMEOUT):
+        self.hostname = hostname
+        self.port = int(port) if port else None
+        self.use_tls = use_tls
+        self.username = username
+        self.password = password
+        self.max_messages = max_messages
+        self.keepalive_seconds = keepalive_seconds
+        self.timeout = timeout
+        # Не больше size одновременно открытых сессий
+        self.slots = asyncio.Semaphore(size)
+        self.idle: list[PooledSMTPConnection] = []
+
+    # Открывает новое соединение с SMTP-сервером и выполняет вход
+    async def _connect(self) -> PooledSMTPConnection:
+        smtp = SMTP(hostname=self.hostname, port=self.port, use_tls=self.use_tls, timeout=self.timeout,
+                    username=self.username or None, password=self.password or None)
+        await smtp.connect()
+        logger.info(f"SMTP connection to {self.hostname}:{self.port} opened")
+        return PooledSMTPConnection(smtp)
+
+    # Проверяет простаивавшее соединение командой NOOP
+    async def _is_alive(self, connection: PooledSMTPConnection) -> bool:
+        if not connection.smtp.is_connected:
+            return False
+        if time.monotonic() - connection.last_used < self.keepalive_seconds:
+            return True
+        try:
+            await connection.smtp.noop()
+            return True
+        except (SMTPException, OSError):
+            return False
+
+    # Берёт живое соединение из простаивающих или открывает новое
+    async def _acquire(self) -> PooledSMTPConnection:
+        while self.idle:
+            connection = self.idle.pop()
+            if await self._is_alive(connection):
+                return connection
+            await self._discard(connection)
+        return await self._connect()
+
+    # Возвращает соединение в пул; исчерпавшее лимит писем соединение закрывается
+    async def _release(self, connection: PooledSMTPConnection):
+        if connection.sent >= self.max_messages:
+            await self._discard(connection)
+            return
+        connection.last_used = time.monotonic()
+        self.idle.append(connection)
+
+    async def _discard(self, connection: PooledSMTPConnection):
+        try:
+            if connection.smtp.is_connected:
+                await connection.smtp.quit()
+        except (SMTPException, OSError):
+            connection.smtp.close()
+
+    # Отправляет письма в одной SMTP-сессии; при обрыве переподключается и повторяет письмо один раз.
+    # Возвращает письма, которые сервер отклонил
+    async def send_many(self, messages: Iterable[EmailMessage]) -> list[tuple[EmailMessage, Exception]]:
+        failed = []
+        async with self.slots:
+            connection = None
+            try:
+                for message in messages:
+                    for attempt in range(2):
+                        if connection is None:
+                            connection = await self._acquire()
+                        try:
+                            await connection.smtp.send_message(message)
+                            connection.sent += 1
+                            break
+                        except (SMTPRecipientsRefused, SMTPResponseException) as e:
+                            if getattr(e, "code", None) != SMTP_SERVICE_CLOSING:
+                                failed.append((message, e))
+                                break
+                            error = e
+                        except (SMTPException, OSError) as e:
+                            error = e
+
+                        await self._discard(connection)
+                        connection = None
+                        if attempt:
+                            failed.append((message, error))
+
+                    if connection and connection.sent >= self.max_messages:
+                        await self._discard(connection)
+                        connection = None
+            finally:
+                if connection:
+                    await self._release(connection)
+        return failed
+
+    # Отправляет одно письмо через пул
+    async def send(self, message: EmailMessage):
+        failed = await self.send_many([message])
+        if failed:
+            raise failed[0][1]
+
+    # Закрывает простаивающие соединения
+    async def close(self):
+        while self.idle:
+            await self._discard(self.idle.pop())
+        logger.info("SMTP pool closed")
+
+# Пул SMTP-соединений, общий для процесса
+smtp_pool = SMTPPool()
+
+# Собирает HTML-письмо
+def build_email(to_email: str, subject: str, html_content: str, from_email: Optional[str] = None) -> EmailMessage:
+    message = EmailMessage()
+    message['From'] = from_email or SMTP_USER
+    message['To'] = to_email
+    message['Subject'] = subject
+    message.set_content(html_content, subtype='html')
+    return message
 
 # Отправка email-сообщения
 async def send_email(to_email: str, subject: str, template_name: str, context: dict):
     try:
-        template = env.get_template(template_name)
-        html_content = template.render(context)
-
-        message = EmailMessage()
-        message['From'] = SMTP_USER
-        message['To'] = to_email
-        message['Subject'] = subject
-        message.set_content(html_content, subtype='html')
-
-        async with SMTP(hostname=SMTP_HOST, port=SMTP_PORT, use_tls=True) as smtp:
-            await smtp.login(SMTP_USER, SMTP_PASSWORD)
-            await smtp.send_message(message)
-            logger.info(f"Email sent to {to_email}")
+        html_content = await render_email(template_name, context, subject)
+
+        await smtp_pool.send(build_email(to_email, subject, html_content))
+        logger.info(f"Email sent to {to_email}")
     except Exception as e:
         logger.error(f"Error sending email to {to_email}: {e}")
-        raise HTTPException(status_code=500, detail="Failed to send email")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Failed to send email")
+
+# Отправка пачки готовых писем по одной SMTP-сессии; возвращает письма, которые не удалось отправить
+async def send_many(messages: list[EmailMessage]) -> list[tuple[EmailMessage, Exception]]:
+    failed = await smtp_pool.send_many(messages)
+    for message, error in failed:
+        logger.error(f"Error sending email to {message['To']}: {error}")
+    logger.info(f"Sent {len(messages) - len(failed)} of {len(messages)} emails")
+    return failed
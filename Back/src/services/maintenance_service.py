@@ -0,0 +1,50 @@
+import time
+from datetime import date
+from typing import Optional
+from sqlalchemy import select, insert, func, literal, exists
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.core.config import MAINTENANCE_BATCH_SIZE
+from src.logging_config import logger
+from src.models.user import User
+from src.models.user_weight import UserWeight
+
+# Логирует прогресс задачи обслуживания и скорость обработки строк
+def log_progress(job_name: str, rows: int, started: float, finished: bool = False):
+    elapsed = time.perf_counter() - started
+    rate = rows / elapsed if elapsed > 0 else 0
+    state = "finished" if finished else "in progress"
+    logger.info(f"{job_name} {state}: {rows} rows in {elapsed:.1f} s ({rate:.0f} rows/s)")
+
+# Переносит последний известный вес на сегодня для всех пользователей без сегодняшней записи;
+# пользователи обрабатываются диапазонами id, каждый диапазон - один INSERT ... SELECT DISTINCT ON
+async def add_daily_weight_records(db: AsyncSession, today: Optional[date] = None,
+                                   batch_size: int = MAINTENANCE_BATCH_SIZE) -> int:
+    today = today or date.today()
+    started = time.perf_counter()
+    max_user_id = (await db.execute(select(func.max(User.id)))).scalar() or 0
+    today_weight = UserWeight.__table__.alias("today_weight")
+    has_today_record = (
+        exists()
+        .where(today_weight.c.user_id == UserWeight.user_id)
+        .where(today_weight.c.recorded_at >= today)
+    )
+
+    total = 0
+    for lower in range(0, max_user_id, batch_size):
+        last_weights = (
+            select(UserWeight.user_id, UserWeight.weight, literal(today).label("recorded_at"))
+            .distinct(UserWeight.user_id)
+            .where(UserWeight.user_id > lower, UserWeight.user_id <= lower + batch_size)
+            .where(UserWeight.recorded_at < today)
+            .where(~has_today_record)
+            .order_by(UserWeight.user_id, UserWeight.recorded_at.desc())
+        )
+        result = await db.execute(
+            insert(UserWeight).from_select(["user_id", "weight", "recorded_at"], last_weights)
+        )
+        await db.commit()
+        total += result.rowcount
+        log_progress("add_daily_weight_records", total, started)
+
+    log_progress("add_daily_weight_records", total, started, finished=True)
+    return total
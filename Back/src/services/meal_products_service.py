@@ -1,12 +1,101 @@
+from datetime import date
+from typing import Optional
 from fastapi import HTTPException
-from sqlalchemy import and_
+from sqlalchemy import and_, update, func, values, column, Double, Integer
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import NoResultFound
 from src.cache.cache import cache
 from src.logging_config import logger
+from src.models.meal import Meal
 from src.models.meal_products import MealProducts
+from src.models.product import Product
 from src.schemas.meal_products import MealProductsCreate, MealProductsUpdate, MealProductsRead
+from src.services.daily_nutrition_service import apply_daily_delta
+from src.services.nutrient_engine import NUTRIENTS
+
+# Сбрасывает кеши, зависящие от приёмов пищи пользователя [(meal_id, дата), ...], одной командой
+async def invalidate_meals_caches(user_id: int, meals: list[tuple[int, date]]):
+    keys = {
+        f"user_meals:{user_id}",
+        f"personal_products:{user_id}",
+        f"user_meals_history:{user_id}",
+        f"user_meals_range:{user_id}",
+        f"analytics_summary:{user_id}",
+    }
+    for meal_id, recorded_at in meals:
+        keys.update((
+            f"user_meals_products:{user_id}:{recorded_at}",
+            f"user_meal:{user_id}:{meal_id}",
+            f"user_meals:{user_id}:{recorded_at}",
+            f"meal_products:{meal_id}",
+        ))
+    await cache.delete_many(sorted(keys))
+
+# Сбрасывает кеши, зависящие от приёма пищи пользователя
+async def invalidate_meal_caches(user_id: int, meal_id: int, recorded_at: date):
+    await invalidate_meals_caches(user_id, [(meal_id, recorded_at)])
+
+# Нутриент позиции, округлённый до сотых так же, как в nutrient_engine (np.round): те же операции над
+# double и round(double) = rint, то есть половины округляются к чётному, а не от нуля, как round(numeric)
+def line_item_value(nutrient, weight):
+    return func.round(nutrient * (weight / 100) * 100, type_=Double) / 100
+
+# Изменение нутриента позиции при смене веса продукта; позиции округляются так же, как при пересчёте
+# приёма пищи, поэтому итоги расходятся с пересчётом с нуля только на погрешность сложения double
+def line_item_delta(nutrient, old_weight: float, new_weight: float):
+    return line_item_value(nutrient, new_weight) - line_item_value(nutrient, old_weight)
+
+# Применяет изменения весов продуктов [(product_id, old_weight, new_weight), ...] к итогам приёма пищи
+# одним UPDATE: разницы по позициям суммируются подзапросами по VALUES-списку изменений, соединённому
+# с продуктами; затем та же разница уходит в суточную сводку. Дата приёма пищи ограничивает UPDATE одной
+# секцией meal. Коммит остаётся за вызывающим кодом. Возвращает (user_id, дата) приёма пищи
+async def apply_line_items_delta(db: AsyncSession, meal_id: int, recorded_at: date,
+                                 changes: list[tuple[int, float, float]]) -> Optional[tuple[int, date]]:
+    if not changes:
+        return None
+
+    meal = Meal.__table__
+    changed = values(
+        column("product_id", Integer), column("old_weight", Double), column("new_weight", Double), name="changes"
+    ).data(changes)
+    deltas = {
+        name: func.coalesce(
+            select(func.sum(line_item_delta(getattr(Product, name), changed.c.old_weight, changed.c.new_weight)))
+            .select_from(changed.join(Product, Product.id == changed.c.product_id))
+            .scalar_subquery(),
+            0
+        )
+        for name in NUTRIENTS
+    }
+    weight_delta = sum(new_weight - old_weight for _, old_weight, new_weight in changes)
+    result = await db.execute(
+        update(meal)
+        .where(meal.c.id == meal_id, meal.c.recorded_at == recorded_at)
+        .values(weight=meal.c.weight + weight_delta,
+                **{name: meal.c[name] + delta for name, delta in deltas.items()})
+        .returning(meal.c.user_id, meal.c.recorded_at, *(delta.label(f"{name}_delta") for name, delta in deltas.items()))
+    )
+    row = result.one_or_none()
+    if row is None:
+        return None
+
+    await apply_daily_delta(db, row.user_id, row.recorded_at, {name: getattr(row, f"{name}_delta") for name in NUTRIENTS})
+    logger.info(f"Meal {meal_id} totals adjusted for {len(changes)} changed products")
+    return row.user_id, row.recorded_at
+
+# Применяет изменение веса одного продукта (old_weight -> new_weight) к итогам приёма пищи
+async def apply_line_item_delta(db: AsyncSession, meal_id: int, recorded_at: date, product_id: int,
+                                old_weight: float, new_weight: float) -> Optional[tuple[int, date]]:
+    return await apply_line_items_delta(db, meal_id, recorded_at, [(product_id, old_weight, new_weight)])
+
+# Сбрасывает кеши приёма пищи; если владелец неизвестен - только кеш его позиций
+async def invalidate_meal_owner_caches(meal_owner: Optional[tuple[int, date]], meal_id: int):
+    if meal_owner is None:
+        await cache.delete(f"meal_products:{meal_id}")
+        return
+    user_id, recorded_at = meal_owner
+    await invalidate_meal_caches(user_id, meal_id, recorded_at)
 
 # Получение продуктов для блюда
 async def get_meal_products(db: AsyncSession, meal_id: int):
@@ -53,21 +142,30 @@ async def add_meal_product(db: AsyncSession, meal_id: int, data: MealProductsCre
                 detail=f"Product {data.product_id} is already in the meal {meal_id}"
             )
 
+        # Связь хранит дату приёма пищи - ключ секционирования meal_products
+        result = await db.execute(select(Meal.recorded_at).where(Meal.id == meal_id))
+        recorded_at = result.scalar_one_or_none()
+        if recorded_at is None:
+            raise HTTPException(status_code=404, detail=f"Meal {meal_id} not found")
+
         meal_product = MealProducts(
             meal_id=meal_id,
             product_id=data.product_id,
-            product_weight=data.product_weight
+            product_weight=data.product_weight,
+            recorded_at=recorded_at
         )
         db.add(meal_product)
+        meal_owner = await apply_line_item_delta(db, meal_id, recorded_at, data.product_id, 0, data.product_weight)
         await db.commit()
         await db.refresh(meal_product)
 
-        cache_key = f"meal_products:{meal_id}"
-        await cache.delete(cache_key)
+        await invalidate_meal_owner_caches(meal_owner, meal_id)
         logger.info(f"Cache invalidated for meal_products: {meal_id}")
 
         return MealProductsRead.model_validate(meal_product)
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error adding product to meal {meal_id}: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -82,12 +180,14 @@ async def update_meal_product(db: AsyncSession, meal_id: int, data: MealProducts
         result = await db.execute(query)
         meal_product = result.scalars().one()
 
+        old_weight = meal_product.product_weight
         meal_product.product_weight = data.product_weight
+        meal_owner = await apply_line_item_delta(db, meal_id, meal_product.recorded_at, data.product_id, old_weight,
+                                                 data.product_weight)
         await db.commit()
         await db.refresh(meal_product)
 
-        cache_key = f"meal_products:{meal_id}"
-        await cache.delete(cache_key)
+        await invalidate_meal_owner_caches(meal_owner, meal_id)
         logger.info(f"Meal product {data.product_id} updated in meal {meal_id}")
 
         return MealProductsRead.model_validate(meal_product)
@@ -112,10 +212,11 @@ async def delete_meal_product(db: AsyncSession, meal_id: int, product_id: int):
         meal_product = result.scalars().one()
 
         await db.delete(meal_product)
+        meal_owner = await apply_line_item_delta(db, meal_id, meal_product.recorded_at, product_id,
+                                                 meal_product.product_weight, 0)
         await db.commit()
 
-        cache_key = f"meal_products:{meal_id}"
-        await cache.delete(cache_key)
+        await invalidate_meal_owner_caches(meal_owner, meal_id)
         logger.info(f"Product {product_id} removed from meal {meal_id}")
 
         return {"message": f"Product with ID {product_id} removed from meal {meal_id}"}
@@ -1,60 +1,84 @@
 from datetime import date, timedelta, datetime
-import asyncio
 from fastapi import HTTPException, status
-from sqlalchemy import select, and_, delete
+from typing import Optional
+from sqlalchemy import select, and_, delete, update, insert, values, column, func, cast, any_, bindparam, Integer, \
+    Double, Date, DateTime
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import defer
 from src.cache.cache import cache
+from src.core.config import MEAL_RANGE_MAX_DAYS, MEAL_BULK_MAX_ITEMS
 from src.logging_config import logger
+from src.models.daily_nutrition import DailyNutrition
 from src.models.meal import Meal
 from src.models.meal_products import MealProducts
 from src.models.product import Product
-from src.schemas.meal import MealCreate, MealUpdate, MealRead
-from src.services.meal_products_service import update_meal_product, delete_meal_product
-from src.services.product_service import recalculate_product_nutrients
-
-# Пересчитывает нутриенты для блюда на основе продуктов
-async def recalculate_meal_nutrients(db: AsyncSession, meal: Meal):
-    logger.info(f"Recalculating nutrients for meal {meal.id} ({meal.name})")
-    total_weight = 0
-    total_calories = 0
-    total_proteins = 0
-    total_fats = 0
-    total_carbohydrates = 0
-    products = []
-
-    await db.refresh(meal, attribute_names=["meal_products"])
-
-    for meal_product in meal.meal_products:
-        db_product = await db.get(Product, meal_product.product_id)
-        logger.info(f"PRODUCT - {db_product}")
-        if not db_product:
-            logger.warning(f"Product with id {meal_product.product_id} not found in the database.")
-            continue
-
-        logger.info(f"Processing product: {db_product.name}, weight: {meal_product.product_weight}")
-
-        product_data = await recalculate_product_nutrients(db_product, meal_product.product_weight)
-
-        total_weight += product_data.weight
-        total_calories += product_data.calories
-        total_proteins += product_data.proteins
-        total_fats += product_data.fats
-        total_carbohydrates += product_data.carbohydrates
-
-        products.append(product_data)
+from src.schemas.daily_nutrition import NutritionPeriod, NutritionRange
+from src.schemas.meal import MealCreate, MealUpdate, MealRead, MealBulkItem
+from src.schemas.meal_products import MealProductsCreate
+from src.schemas.product import ProductRead
+from src.services.daily_nutrition_service import apply_daily_delta, apply_daily_deltas, meal_totals, totals_delta
+from src.services.meal_products_service import apply_line_items_delta, invalidate_meal_caches, invalidate_meals_caches
+from src.services.nutrient_engine import NutrientMatrix, NUTRIENTS, compute_batch
+
+EMPTY_TOTALS = {"weight": 0, **{name: 0 for name in NUTRIENTS}}
+
+# Условие на позиции указанных приёмов пищи; по датам Postgres отсекает лишние секции meal_products
+def meals_products_filter(meal_ids: list[int], recorded_dates: set[date]):
+    return and_(
+        MealProducts.meal_id == any_(bindparam("meal_ids", sorted(set(meal_ids)), type_=ARRAY(Integer), unique=True)),
+        MealProducts.recorded_at == any_(bindparam("recorded_dates", sorted(recorded_dates), type_=ARRAY(Date),
+                                                   unique=True))
+    )
 
-    logger.info(
-        f"Total - Weight: {total_weight}, Calories: {total_calories}, Proteins: {total_proteins}, Fats: {total_fats}, Carbohydrates: {total_carbohydrates}")
+# Загружает позиции всех переданных блюд одним запросом: [(meal_id, вес, продукт), ...];
+# бинарная картинка продукта не загружается, признак has_picture вычисляется в SQL
+async def load_meals_products(db: AsyncSession, meals: list[Meal]) -> list[tuple[int, float, Product]]:
+    if not meals:
+        return []
+
+    result = await db.execute(
+        select(MealProducts.meal_id, MealProducts.product_weight, Product)
+        .join(Product, Product.id == MealProducts.product_id)
+        .options(defer(Product.picture))
+        .where(meals_products_filter([meal.id for meal in meals], {meal.recorded_at for meal in meals}))
+        .order_by(MealProducts.meal_id, MealProducts.product_id)
+    )
+    return [tuple(row) for row in result.all()]
+
+# Загружает позиции блюд и считает их нутриенты одним пакетом nutrient_engine:
+# возвращает ({meal_id: [ProductRead, ...]}, {meal_id: итоги})
+async def load_meals_line_items(db: AsyncSession, meals: list[Meal]) -> tuple[dict, dict]:
+    rows = await load_meals_products(db, meals)
+    logger.info(f"Calculating line items for {len(meals)} meals ({len(rows)} products)")
+
+    matrix = NutrientMatrix(product for _, _, product in rows)
+    items, totals = compute_batch(
+        matrix,
+        [product.id for _, _, product in rows],
+        [weight for _, weight, _ in rows],
+        [meal_id for meal_id, _, _ in rows]
+    )
 
-    meal.weight = total_weight
-    meal.calories = total_calories
-    meal.proteins = total_proteins
-    meal.fats = total_fats
-    meal.carbohydrates = total_carbohydrates
+    meal_products = {meal.id: [] for meal in meals}
+    for (meal_id, weight, product), item in zip(rows, items.tolist()):
+        meal_products[meal_id].append(build_product_read(product, weight, item))
+    return meal_products, totals
+
+# Собирает ProductRead позиции из продукта, её веса и рассчитанных нутриентов
+def build_product_read(product: Product, weight: float, nutrients: list[float]) -> ProductRead:
+    return ProductRead(
+        id=product.id,
+        name=product.name,
+        weight=weight,
+        description=product.description,
+        has_picture=product.has_picture,
+        **dict(zip(NUTRIENTS, nutrients))
+    )
 
-    logger.info(f"Meal {meal.id} nutrient recalculation completed.")
+# Собирает MealRead из сохранённых итогов приёма пищи и его позиций
+def build_meal_read(meal: Meal, products: list[ProductRead]) -> MealRead:
     return MealRead(
         id=meal.id,
         name=meal.name,
@@ -68,6 +92,26 @@ async def recalculate_meal_nutrients(db: AsyncSession, meal: Meal):
         products=products
     )
 
+# Пересчитывает нутриенты набора блюд с нуля по их позициям
+async def recalculate_meals_nutrients(db: AsyncSession, meals: list[Meal]) -> list[MealRead]:
+    meal_products, totals = await load_meals_line_items(db, meals)
+
+    for meal in meals:
+        meal_sums = totals.get(meal.id, EMPTY_TOTALS)
+        meal.weight = meal_sums["weight"]
+        meal.calories = meal_sums["calories"]
+        meal.proteins = meal_sums["proteins"]
+        meal.fats = meal_sums["fats"]
+        meal.carbohydrates = meal_sums["carbohydrates"]
+
+    logger.info(f"Nutrient recalculation completed for {len(meals)} meals.")
+    return [build_meal_read(meal, meal_products[meal.id]) for meal in meals]
+
+# Пересчитывает нутриенты для блюда на основе продуктов
+async def recalculate_meal_nutrients(db: AsyncSession, meal: Meal):
+    meals_read = await recalculate_meals_nutrients(db, [meal])
+    return meals_read[0]
+
 # Добавляет новое блюдо и связанные с ним продукты
 async def add_meal(db: AsyncSession, meal: MealCreate, user_id: int):
     logger.info(f"Adding new meal for user {user_id}: {meal.name}")
@@ -82,34 +126,33 @@ async def add_meal(db: AsyncSession, meal: MealCreate, user_id: int):
             user_id=user_id
         )
         db.add(db_meal)
+        # id и дата приёма пищи нужны для связей с продуктами
+        await db.flush()
         logger.info(f"Meal {meal.name} added to the database. Adding associated products.")
 
+        product_ids = {product.product_id for product in meal.products}
+        result = await db.execute(select(Product.id).where(Product.id.in_(product_ids)))
+        missing_ids = product_ids - set(result.scalars().all())
+        if missing_ids:
+            logger.error(f"Products with ids {sorted(missing_ids)} not found.")
+            raise ValueError(f"Product with id {min(missing_ids)} not found.")
+
         for product in meal.products:
-            db_product = await db.get(Product, product.product_id)
-            if not db_product:
-                logger.error(f"Product with id {product.product_id} not found.")
-                raise ValueError(f"Product with id {product.product_id} not found.")
             meal_product = MealProducts(
                 meal_id=db_meal.id,
                 product_id=product.product_id,
-                product_weight=product.product_weight
+                product_weight=product.product_weight,
+                recorded_at=db_meal.recorded_at
             )
             db.add(meal_product)
 
+        # Итоги пересчитываются до коммита, чтобы приём пищи и суточная сводка сохранились вместе
+        meal_pydantic = await recalculate_meal_nutrients(db, db_meal)
+        await apply_daily_delta(db, user_id, db_meal.recorded_at, meal_totals(db_meal), meal_count=1)
         await db.commit()
-        await db.refresh(db_meal)
-        await asyncio.gather(
-            cache.delete(f"user_meals:{user_id}"),
-            cache.delete(f"user_meals_products:{user_id}:{db_meal.recorded_at}"),
-            cache.delete(f"user_meal:{user_id}:{db_meal.id}"),
-            cache.delete(f"user_meals:{user_id}:{db_meal.recorded_at}"),
-            cache.delete(f"personal_products:{user_id}"),
-            cache.delete(f"user_meals_history:{user_id}")
-        )
+        await invalidate_meal_caches(user_id, db_meal.id, db_meal.recorded_at)
 
         logger.info(f"Meal {meal.name} with products successfully saved to the database.")
-
-        meal_pydantic = await recalculate_meal_nutrients(db, db_meal)
         return meal_pydantic
 
     except IntegrityError:
@@ -150,14 +193,17 @@ async def get_user_meals_with_products_by_date(db: AsyncSession, user_id: int, t
     current_date_obj = datetime.strptime(target_date, '%Y-%m-%d').date()
     query = (
         select(Meal)
-        .options(joinedload(Meal.meal_products).joinedload(MealProducts.product))
         .where(and_(Meal.user_id == user_id, Meal.recorded_at == current_date_obj))
+        .order_by(Meal.id)
     )
 
     result = await db.execute(query)
-    meals = result.scalars().unique().all()
+    meals = result.scalars().all()
 
-    formatted_meals = [await recalculate_meal_nutrients(db, meal) for meal in meals]
+    # Итоги берутся из сохранённых приёмов пищи, как в сводке и в get_meals_range; нутриенты позиций
+    # считаются только для ответа и не перезаписывают итоги
+    meal_products, _ = await load_meals_line_items(db, meals)
+    formatted_meals = [build_meal_read(meal, meal_products[meal.id]) for meal in meals]
 
     await cache.set(cache_key, [meal.model_dump(mode="json") for meal in formatted_meals], expire=3600)
     logger.info(f"Meals for user {user_id} on {target_date} cached successfully.")
@@ -229,15 +275,55 @@ async def get_meals_last_7_days(db: AsyncSession, user_id: int):
     logger.info(f"Last 7 days meals for user {user_id} cached successfully.")
     return meals_list
 
-# Обновляет данные о блюде и его продуктах
+# Применяет к позициям приёма пищи разницу между текущим и запрошенным составом:
+# один DELETE ... IN, один UPDATE ... FROM (VALUES ...), один многострочный INSERT и одно изменение итогов
+async def apply_meal_products_diff(db: AsyncSession, db_meal: Meal, requested: dict[int, float]):
+    meal_products = MealProducts.__table__
+    same_meal = and_(meal_products.c.meal_id == db_meal.id, meal_products.c.recorded_at == db_meal.recorded_at)
+    result = await db.execute(select(meal_products.c.product_id, meal_products.c.product_weight).where(same_meal))
+    existing = dict(result.all())
+
+    removed = existing.keys() - requested.keys()
+    added = requested.keys() - existing.keys()
+    changed = {product_id for product_id in existing.keys() & requested.keys()
+               if existing[product_id] != requested[product_id]}
+
+    if added:
+        result = await db.execute(select(Product.id).where(Product.id.in_(added)))
+        missing_ids = added - set(result.scalars().all())
+        if missing_ids:
+            logger.error(f"Products with ids {sorted(missing_ids)} not found.")
+            raise ValueError(f"Product with id {min(missing_ids)} not found.")
+
+    if removed:
+        await db.execute(delete(meal_products).where(same_meal, meal_products.c.product_id.in_(removed)))
+    if changed:
+        new_weights = values(column("product_id", Integer), column("product_weight", Double), name="new_weights").data(
+            [(product_id, requested[product_id]) for product_id in changed]
+        )
+        await db.execute(
+            update(meal_products)
+            .where(same_meal, meal_products.c.product_id == new_weights.c.product_id)
+            .values(product_weight=new_weights.c.product_weight)
+        )
+    if added:
+        await db.execute(insert(meal_products).values([
+            {"meal_id": db_meal.id, "product_id": product_id, "product_weight": requested[product_id],
+             "recorded_at": db_meal.recorded_at}
+            for product_id in added
+        ]))
+
+    await apply_line_items_delta(db, db_meal.id, db_meal.recorded_at, [
+        (product_id, existing.get(product_id, 0), requested.get(product_id, 0))
+        for product_id in removed | added | changed
+    ])
+    logger.info(f"Meal {db_meal.id} products: {len(added)} added, {len(changed)} changed, {len(removed)} removed.")
+
+# Обновляет данные о блюде и его продуктах в одной транзакции
 async def update_meal(db: AsyncSession, meal_update: MealUpdate, meal_id: int, user_id: int):
     logger.info(f"Updating meal {meal_id} for user {user_id}.")
-    db_meal = await db.execute(
-        select(Meal)
-        .options(joinedload(Meal.meal_products).joinedload(MealProducts.product))
-        .where(Meal.id == meal_id, Meal.user_id == user_id)
-    )
-    db_meal = db_meal.unique().scalar_one_or_none()
+    result = await db.execute(select(Meal).where(Meal.id == meal_id, Meal.user_id == user_id))
+    db_meal = result.scalar_one_or_none()
     if not db_meal:
         logger.warning(f"Meal {meal_id} not found for user {user_id}.")
         raise HTTPException(
@@ -249,53 +335,18 @@ async def update_meal(db: AsyncSession, meal_update: MealUpdate, meal_id: int, u
         db_meal.name = meal_update.name
 
     if meal_update.products is not None:
-        existing_products = {mp.product_id: mp for mp in db_meal.meal_products}
-        update_products = {p.product_id: p for p in meal_update.products}
-        for product_id in existing_products.keys() - update_products.keys():
-            await delete_meal_product(db, meal_id, product_id)
-
-        for product_id, product_data in update_products.items():
-            if product_id in existing_products:
-                await update_meal_product(db, meal_id, product_data)
-            else:
-                db_product = await db.get(Product, product_id)
-                if not db_product:
-                    logger.error(f"Product with id {product_id} not found.")
-                    raise ValueError(f"Product with id {product_id} not found.")
-                new_meal_product = MealProducts(
-                    meal_id=meal_id,
-                    product_id=product_id,
-                    product_weight=product_data.product_weight
-                )
-                new_meal_product.product = db_product
-                db_meal.meal_products.append(new_meal_product)
-                db.add(new_meal_product)
+        requested = {product.product_id: product.product_weight for product in meal_update.products}
+        await apply_meal_products_diff(db, db_meal, requested)
 
     await db.commit()
     logger.info(f"Meal {meal_id} for user {user_id} updated successfully.")
 
-    db_meal = await db.execute(
-        select(Meal)
-        .options(joinedload(Meal.meal_products).joinedload(MealProducts.product))
-        .where(Meal.id == meal_id)
-    )
-    db_meal = db_meal.unique().scalar_one_or_none()
-    if not db_meal:
-        logger.error(f"Meal {meal_id} not found after update.")
-        raise HTTPException(status_code=500, detail="Meal not found after update")
-
-    updated_meal = await recalculate_meal_nutrients(db, db_meal)
-    await db.commit()
-
-    await asyncio.gather(
-        cache.delete(f"user_meals:{user_id}"),
-        cache.delete(f"user_meals_products:{user_id}:{db_meal.recorded_at}"),
-        cache.delete(f"user_meal:{user_id}:{db_meal.id}"),
-        cache.delete(f"user_meals:{user_id}:{db_meal.recorded_at}"),
-        cache.delete(f"personal_products:{user_id}"),
-        cache.delete(f"user_meals_history:{user_id}")
-    )
+    # Итоги приёма пищи изменены в SQL на разницу по позициям - перечитываем их
+    await db.refresh(db_meal)
+    meal_products, _ = await load_meals_line_items(db, [db_meal])
+    updated_meal = build_meal_read(db_meal, meal_products[db_meal.id])
 
+    await invalidate_meal_caches(user_id, meal_id, db_meal.recorded_at)
     logger.info(f"Meal {meal_id} for user {user_id} cache deleted.")
     return updated_meal
 
@@ -310,19 +361,306 @@ async def delete_meal(db: AsyncSession, meal_id: int, user_id: int):
             detail="Meal not found"
         )
 
-    db_meal = await db.get(Meal, meal_id)
+    result = await db.execute(select(Meal).where(Meal.id == meal_id, Meal.user_id == user_id))
+    db_meal = result.scalar_one()
 
-    await db.execute(delete(MealProducts).where(MealProducts.meal_id == meal_id))
+    await db.execute(delete(MealProducts).where(MealProducts.meal_id == meal_id,
+                                                MealProducts.recorded_at == db_meal.recorded_at))
 
     await db.delete(db_meal)
+    await apply_daily_delta(db, user_id, db_meal.recorded_at, totals_delta({}, meal_totals(db_meal)), meal_count=-1)
     await db.commit()
     logger.info(f"Meal {meal_id} for user {user_id} deleted successfully.")
-    await asyncio.gather(
-        cache.delete(f"user_meals:{user_id}"),
-        cache.delete(f"user_meals_products:{user_id}:{db_meal.recorded_at}"),
-        cache.delete(f"user_meal:{user_id}:{db_meal.id}"),
-        cache.delete(f"user_meals:{user_id}:{db_meal.recorded_at}"),
-        cache.delete(f"personal_products:{user_id}"),
-        cache.delete(f"user_meals_history:{user_id}")
-    )
+    await invalidate_meal_caches(user_id, db_meal.id, db_meal.recorded_at)
     return {"message": "Meal and its products deleted successfully"}
+
+# Первые дни периодов диапазона: каждый день или понедельник каждой недели
+def period_starts(start_date: date, end_date: date, granularity: str) -> list[date]:
+    step = 7 if granularity == "week" else 1
+    first = start_date - timedelta(days=start_date.weekday()) if granularity == "week" else start_date
+    return [first + timedelta(days=offset) for offset in range(0, (end_date - first).days + 1, step)]
+
+# Получает итоги питания за диапазон дат по дням или неделям одним GROUP BY по суточной сводке
+# и, по запросу, приёмы пищи с продуктами; результат кешируется полем хеша диапазонов пользователя
+async def get_meals_range(db: AsyncSession, user_id: int, start_date: date, end_date: date,
+                          granularity: str = "day", include_meals: bool = False) -> NutritionRange:
+    if start_date > end_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Start date must not be after end date")
+    if (end_date - start_date).days >= MEAL_RANGE_MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Date range must not exceed {MEAL_RANGE_MAX_DAYS} days"
+        )
+
+    cache_key = f"user_meals_range:{user_id}"
+    cache_field = f"{start_date}:{end_date}:{granularity}:{int(include_meals)}"
+    cached_data = await cache.get_field(cache_key, cache_field)
+    if cached_data:
+        logger.info(f"Cache hit for meals range {cache_field} of user {user_id}.")
+        return NutritionRange.model_validate(cached_data)
+
+    logger.info(f"Cache miss for meals range {cache_field} of user {user_id}. Fetching from database.")
+    if granularity == "week":
+        period_start = cast(func.date_trunc("week", cast(DailyNutrition.recorded_at, DateTime)), Date)
+    else:
+        period_start = DailyNutrition.recorded_at
+    result = await db.execute(
+        select(
+            period_start.label("start_date"),
+            *(func.sum(getattr(DailyNutrition, name)).label(name) for name in NUTRIENTS),
+            func.sum(DailyNutrition.meal_count).label("meal_count"),
+            func.count().label("days_logged")
+        )
+        .where(DailyNutrition.user_id == user_id)
+        .where(DailyNutrition.recorded_at >= start_date, DailyNutrition.recorded_at <= end_date)
+        .group_by(period_start)
+        .order_by(period_start)
+    )
+    totals = {row.start_date: row._mapping for row in result.all()}
+
+    periods = {}
+    for first in period_starts(start_date, end_date, granularity):
+        last = first + timedelta(days=6) if granularity == "week" else first
+        periods[first] = NutritionPeriod(
+            start_date=max(first, start_date),
+            end_date=min(last, end_date),
+            meals=[] if include_meals else None,
+            **{name: value for name, value in totals.get(first, {}).items() if name != "start_date"}
+        )
+
+    if include_meals:
+        result = await db.execute(
+            select(Meal)
+            .where(Meal.user_id == user_id, Meal.recorded_at >= start_date, Meal.recorded_at <= end_date)
+            .order_by(Meal.recorded_at, Meal.id)
+        )
+        meals = result.scalars().all()
+        meal_products, _ = await load_meals_line_items(db, meals)
+        for meal in meals:
+            first = meal.recorded_at - timedelta(days=meal.recorded_at.weekday()) if granularity == "week" \
+                else meal.recorded_at
+            periods[first].meals.append(build_meal_read(meal, meal_products[meal.id]))
+
+    meals_range = NutritionRange(start_date=start_date, end_date=end_date, granularity=granularity,
+                                 periods=list(periods.values()))
+    await cache.set_field(cache_key, cache_field, meals_range.model_dump(mode="json"), expire=3600)
+    logger.info(f"Meals range {cache_field} for user {user_id} cached successfully.")
+    return meals_range
+
+def check_bulk_size(size: int):
+    if size > MEAL_BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"No more than {MEAL_BULK_MAX_ITEMS} meals per request"
+        )
+
+# Добавляет несколько приёмов пищи за один запрос: все продукты проверяются и загружаются одним
+# WHERE id = ANY(...), итоги считаются пакетом nutrient_engine, приёмы пищи и позиции вставляются
+# многострочными INSERT, суточная сводка меняется одним upsert, кеши сбрасываются одной командой
+async def add_meals_bulk(db: AsyncSession, meals: list[MealBulkItem], user_id: int) -> list[MealRead]:
+    check_bulk_size(len(meals))
+    if not meals:
+        return []
+
+    for meal in meals:
+        meal_product_ids = [product.product_id for product in meal.products]
+        if len(meal_product_ids) != len(set(meal_product_ids)):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Meal {meal.name} contains the same product more than once"
+            )
+
+    product_ids = sorted({product.product_id for meal in meals for product in meal.products})
+    products = {}
+    if product_ids:
+        result = await db.execute(
+            select(Product).options(defer(Product.picture))
+            .where(Product.id == any_(bindparam("product_ids", product_ids, type_=ARRAY(Integer))))
+        )
+        products = {product.id: product for product in result.scalars().all()}
+        missing_ids = set(product_ids) - products.keys()
+        if missing_ids:
+            logger.error(f"Products with ids {sorted(missing_ids)} not found.")
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Products not found: {sorted(missing_ids)}"
+            )
+
+    line_items = [(index, product) for index, meal in enumerate(meals) for product in meal.products]
+    items, totals = compute_batch(
+        NutrientMatrix(products.values()),
+        [product.product_id for _, product in line_items],
+        [product.product_weight for _, product in line_items],
+        [index for index, _ in line_items]
+    )
+
+    today = date.today()
+    meal_rows = [
+        {"name": meal.name, "user_id": user_id, "recorded_at": meal.recorded_at or today,
+         **totals.get(index, EMPTY_TOTALS)}
+        for index, meal in enumerate(meals)
+    ]
+    result = await db.execute(insert(Meal).returning(Meal.id, sort_by_parameter_order=True), meal_rows)
+    meal_ids = result.scalars().all()
+
+    if line_items:
+        await db.execute(insert(MealProducts), [
+            {"meal_id": meal_ids[index], "product_id": product.product_id, "product_weight": product.product_weight,
+             "recorded_at": meal_rows[index]["recorded_at"]}
+            for index, product in line_items
+        ])
+
+    daily_deltas = {}
+    for row in meal_rows:
+        delta, meal_count = daily_deltas.get(row["recorded_at"], ({}, 0))
+        daily_deltas[row["recorded_at"]] = (
+            {name: delta.get(name, 0) + row[name] for name in NUTRIENTS}, meal_count + 1
+        )
+    await apply_daily_deltas(db, user_id, daily_deltas)
+    await db.commit()
+
+    meal_products = {index: [] for index in range(len(meals))}
+    for (index, product), item in zip(line_items, items.tolist()):
+        meal_products[index].append(build_product_read(products[product.product_id], product.product_weight, item))
+
+    created = [
+        MealRead(id=meal_id, user_id=user_id, products=meal_products[index],
+                 **{key: value for key, value in meal_rows[index].items() if key != "user_id"})
+        for index, meal_id in enumerate(meal_ids)
+    ]
+    await invalidate_meals_caches(user_id, [(meal.id, meal.recorded_at) for meal in created])
+    logger.info(f"{len(created)} meals with {len(line_items)} products added for user {user_id}.")
+    return created
+
+# Удаляет несколько приёмов пищи пользователя в одной транзакции; если хотя бы один не найден,
+# ничего не удаляется
+async def delete_meals_bulk(db: AsyncSession, meal_ids: list[int], user_id: int):
+    check_bulk_size(len(meal_ids))
+    ids_param = bindparam("meal_ids", sorted(set(meal_ids)), type_=ARRAY(Integer))
+    result = await db.execute(
+        select(Meal.id, Meal.recorded_at, *(getattr(Meal, name) for name in NUTRIENTS))
+        .where(Meal.user_id == user_id, Meal.id == any_(ids_param))
+    )
+    meals = result.all()
+    missing_ids = set(meal_ids) - {meal.id for meal in meals}
+    if missing_ids:
+        logger.warning(f"Meals {sorted(missing_ids)} not found for user {user_id}.")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Meals not found: {sorted(missing_ids)}")
+    if not meals:
+        return {"message": "0 meals deleted"}
+
+    recorded_dates = {meal.recorded_at for meal in meals}
+    await db.execute(delete(MealProducts).where(meals_products_filter(meal_ids, recorded_dates)))
+    await db.execute(delete(Meal).where(Meal.user_id == user_id, Meal.id == any_(ids_param),
+                                        Meal.recorded_at == any_(bindparam("recorded_dates", sorted(recorded_dates),
+                                                                           type_=ARRAY(Date)))))
+
+    daily_deltas = {}
+    for meal in meals:
+        delta, meal_count = daily_deltas.get(meal.recorded_at, ({}, 0))
+        daily_deltas[meal.recorded_at] = (
+            {name: delta.get(name, 0) - getattr(meal, name) for name in NUTRIENTS}, meal_count - 1
+        )
+    await apply_daily_deltas(db, user_id, daily_deltas)
+    await db.commit()
+
+    await invalidate_meals_caches(user_id, [(meal.id, meal.recorded_at) for meal in meals])
+    logger.info(f"{len(meals)} meals deleted for user {user_id}.")
+    return {"message": f"{len(meals)} meals deleted"}
+
+# Повторно записывает приёмы пищи пользователя (с теми же продуктами и весами) на указанную дату
+async def relog_meals(db: AsyncSession, meal_ids: list[int], user_id: int,
+                      recorded_at: Optional[date] = None) -> list[MealRead]:
+    check_bulk_size(len(meal_ids))
+    result = await db.execute(
+        select(Meal.id, Meal.name, Meal.recorded_at)
+        .where(Meal.user_id == user_id, Meal.id == any_(bindparam("meal_ids", meal_ids, type_=ARRAY(Integer))))
+    )
+    source_meals = result.all()
+    names = {meal.id: meal.name for meal in source_meals}
+    missing_ids = set(meal_ids) - names.keys()
+    if missing_ids:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Meals not found: {sorted(missing_ids)}")
+
+    result = await db.execute(
+        select(MealProducts.meal_id, MealProducts.product_id, MealProducts.product_weight)
+        .where(meals_products_filter(meal_ids, {meal.recorded_at for meal in source_meals}))
+        .order_by(MealProducts.meal_id, MealProducts.product_id)
+    )
+    meal_products = {meal_id: [] for meal_id in meal_ids}
+    for meal_id, product_id, product_weight in result.all():
+        meal_products[meal_id].append(MealProductsCreate(product_id=product_id, product_weight=product_weight))
+
+    meals = [
+        MealBulkItem(name=names[meal_id], weight=0, calories=0, proteins=0, fats=0, carbohydrates=0,
+                     products=meal_products[meal_id], recorded_at=recorded_at)
+        for meal_id in meal_ids
+    ]
+    return await add_meals_bulk(db, meals, user_id)
+
+# Копирует выбранные приёмы пищи пользователя на другую дату без чтения продуктов и пересчёта:
+# новые id берутся из последовательности одним SELECT, затем meal и meal_products клонируются
+# одним INSERT ... SELECT ... RETURNING на таблицу с сохранёнными итогами
+async def copy_meals(db: AsyncSession, user_id: int, conditions: list, target_date: date) -> list[MealRead]:
+    meal = Meal.__table__
+    meal_products = MealProducts.__table__
+    result = await db.execute(
+        select(meal.c.id, meal.c.recorded_at, func.nextval(func.pg_get_serial_sequence(meal.name, "id")))
+        .where(meal.c.user_id == user_id, *conditions)
+        .order_by(meal.c.id)
+    )
+    copies = result.all()
+    if not copies:
+        return []
+
+    new_ids = values(
+        column("source_id", Integer), column("source_date", Date), column("new_id", Integer), name="new_ids"
+    ).data([tuple(row) for row in copies])
+    copied_columns = ["weight", *NUTRIENTS]
+
+    result = await db.execute(
+        insert(meal).from_select(
+            ["id", "name", *copied_columns, "user_id", "recorded_at"],
+            select(new_ids.c.new_id, meal.c.name, *(meal.c[name] for name in copied_columns), meal.c.user_id,
+                   cast(target_date, Date))
+            .join_from(meal, new_ids, and_(meal.c.id == new_ids.c.source_id,
+                                           meal.c.recorded_at == new_ids.c.source_date))
+        ).returning(*meal.c)
+    )
+    copied_meals = sorted(result.all(), key=lambda row: row.id)
+
+    result = await db.execute(
+        insert(meal_products).from_select(
+            ["meal_id", "product_id", "product_weight", "recorded_at"],
+            select(new_ids.c.new_id, meal_products.c.product_id, meal_products.c.product_weight,
+                   cast(target_date, Date))
+            .join_from(meal_products, new_ids, and_(meal_products.c.meal_id == new_ids.c.source_id,
+                                                    meal_products.c.recorded_at == new_ids.c.source_date))
+        ).returning(meal_products.c.meal_id)
+    )
+    copied_products = len(result.all())
+
+    await apply_daily_deltas(db, user_id, {target_date: (
+        {name: sum(getattr(row, name) for row in copied_meals) for name in NUTRIENTS}, len(copied_meals)
+    )})
+    await db.commit()
+    await invalidate_meals_caches(user_id, [(row.id, row.recorded_at) for row in copied_meals])
+    logger.info(f"{len(copied_meals)} meals with {copied_products} products copied to {target_date} "
+                f"for user {user_id}.")
+
+    products, _ = await load_meals_line_items(db, copied_meals)
+    return [build_meal_read(row, products[row.id]) for row in copied_meals]
+
+# Копирует приём пищи пользователя на указанную дату (по умолчанию - сегодня)
+async def copy_meal(db: AsyncSession, meal_id: int, user_id: int, target_date: Optional[date] = None) -> MealRead:
+    copied = await copy_meals(db, user_id, [Meal.__table__.c.id == meal_id], target_date or date.today())
+    if not copied:
+        logger.warning(f"Meal {meal_id} not found for user {user_id}.")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Meal not found")
+    return copied[0]
+
+# Копирует все приёмы пищи пользователя за день на указанную дату (по умолчанию - сегодня)
+async def copy_day(db: AsyncSession, source_date: date, user_id: int,
+                   target_date: Optional[date] = None) -> list[MealRead]:
+    return await copy_meals(db, user_id, [Meal.__table__.c.recorded_at == source_date], target_date or date.today())
+
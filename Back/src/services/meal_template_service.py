@@ -0,0 +1,215 @@
+from datetime import date
+from typing import Optional
+from fastapi import HTTPException, status
+from sqlalchemy import select, insert, delete, exists, literal, func, any_, bindparam, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
+from src.cache.cache import cache
+from src.cache.local_cache import LocalCache
+from src.core.config import MEAL_TEMPLATES_MAX_COUNT, MEAL_TEMPLATES_LOCAL_TTL_SECONDS, MEAL_TEMPLATES_LOCAL_MAX_USERS
+from src.logging_config import logger
+from src.models.meal import Meal
+from src.models.meal_products import MealProducts
+from src.models.meal_template import MealTemplate, MealTemplateProduct
+from src.models.product import Product
+from src.schemas.meal import MealRead
+from src.schemas.meal_template import MealTemplateCreate, MealTemplateRead
+from src.schemas.product import ProductRead
+from src.services.daily_nutrition_service import apply_daily_delta
+from src.services.meal_products_service import invalidate_meal_caches
+from src.services.nutrient_engine import NutrientMatrix, NUTRIENTS, compute_batch
+
+# Шаблоны пользователя в памяти процесса: повторная запись приёма пищи из шаблона не читает ни Redis, ни БД
+local_templates = LocalCache(MEAL_TEMPLATES_LOCAL_TTL_SECONDS, MEAL_TEMPLATES_LOCAL_MAX_USERS)
+
+def templates_cache_key(user_id: int) -> str:
+    return f"meal_templates:{user_id}"
+
+# Сбрасывает шаблоны пользователя в памяти процесса и в Redis
+async def invalidate_meal_templates(user_id: int):
+    key = templates_cache_key(user_id)
+    local_templates.delete(key)
+    await cache.delete(key)
+
+# Получает шаблоны пользователя: сначала из памяти процесса, затем из Redis, затем двумя запросами из БД
+async def get_meal_templates(db: AsyncSession, user_id: int) -> list[MealTemplateRead]:
+    key = templates_cache_key(user_id)
+    templates = local_templates.get(key)
+    if templates is not None:
+        return templates
+
+    cached_templates = await cache.get(key)
+    if cached_templates is not None:
+        templates = [MealTemplateRead(**template) for template in cached_templates]
+        local_templates.set(key, templates)
+        return templates
+
+    result = await db.execute(select(MealTemplate).where(MealTemplate.user_id == user_id).order_by(MealTemplate.id))
+    db_templates = result.scalars().all()
+    products = {template.id: [] for template in db_templates}
+    if db_templates:
+        result = await db.execute(
+            select(MealTemplateProduct)
+            .join(MealTemplate, MealTemplate.id == MealTemplateProduct.template_id)
+            .where(MealTemplate.user_id == user_id)
+            .order_by(MealTemplateProduct.template_id, MealTemplateProduct.product_id)
+        )
+        for item in result.scalars().all():
+            products[item.template_id].append(ProductRead(
+                id=item.product_id,
+                name=item.product_name,
+                weight=item.product_weight,
+                **{name: getattr(item, name) for name in NUTRIENTS}
+            ))
+
+    templates = [
+        MealTemplateRead(
+            id=template.id,
+            name=template.name,
+            weight=template.weight,
+            products=products[template.id],
+            **{name: getattr(template, name) for name in NUTRIENTS}
+        )
+        for template in db_templates
+    ]
+    await cache.set(key, [template.model_dump() for template in templates])
+    local_templates.set(key, templates)
+    logger.info(f"Loaded {len(templates)} meal templates for user {user_id}.")
+    return templates
+
+# Сохраняет шаблон: продукты загружаются один раз, нутриенты позиций и итоги рассчитываются и сохраняются
+async def create_meal_template(db: AsyncSession, template: MealTemplateCreate, user_id: int) -> MealTemplateRead:
+    product_ids = [product.product_id for product in template.products]
+    if len(product_ids) != len(set(product_ids)):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Template contains the same product more than once"
+        )
+
+    template_count = (await db.execute(
+        select(func.count()).select_from(MealTemplate).where(MealTemplate.user_id == user_id)
+    )).scalar()
+    if template_count >= MEAL_TEMPLATES_MAX_COUNT:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"No more than {MEAL_TEMPLATES_MAX_COUNT} meal templates per user"
+        )
+
+    products = {}
+    if product_ids:
+        result = await db.execute(
+            select(Product).options(defer(Product.picture))
+            .where(Product.id == any_(bindparam("product_ids", product_ids, type_=ARRAY(Integer))))
+        )
+        products = {product.id: product for product in result.scalars().all()}
+        missing_ids = set(product_ids) - products.keys()
+        if missing_ids:
+            logger.error(f"Products with ids {sorted(missing_ids)} not found.")
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Products not found: {sorted(missing_ids)}"
+            )
+
+    items, totals = compute_batch(
+        NutrientMatrix(products.values()),
+        product_ids,
+        [product.product_weight for product in template.products],
+        [0] * len(product_ids)
+    )
+    template_totals = totals.get(0, {"weight": 0, **{name: 0 for name in NUTRIENTS}})
+
+    result = await db.execute(
+        insert(MealTemplate)
+        .values(user_id=user_id, name=template.name, **template_totals)
+        .returning(MealTemplate.id)
+    )
+    template_id = result.scalar_one()
+
+    line_items = [
+        {"product_id": product.product_id, "product_name": products[product.product_id].name,
+         "product_weight": product.product_weight, **dict(zip(NUTRIENTS, item))}
+        for product, item in zip(template.products, items.tolist())
+    ]
+    if line_items:
+        await db.execute(insert(MealTemplateProduct), [{"template_id": template_id, **item} for item in line_items])
+    await db.commit()
+
+    await invalidate_meal_templates(user_id)
+    logger.info(f"Meal template {template_id} with {len(line_items)} products saved for user {user_id}.")
+    return MealTemplateRead(
+        id=template_id,
+        name=template.name,
+        products=[
+            ProductRead(id=item["product_id"], name=item["product_name"], weight=item["product_weight"],
+                        **{name: item[name] for name in NUTRIENTS})
+            for item in line_items
+        ],
+        **template_totals
+    )
+
+# Удаляет шаблон пользователя вместе с его позициями
+async def delete_meal_template(db: AsyncSession, template_id: int, user_id: int):
+    result = await db.execute(
+        delete(MealTemplate)
+        .where(MealTemplate.id == template_id, MealTemplate.user_id == user_id)
+        .returning(MealTemplate.id)
+    )
+    if result.scalar_one_or_none() is None:
+        logger.warning(f"Meal template {template_id} not found for user {user_id}.")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Meal template not found")
+    await db.commit()
+
+    await invalidate_meal_templates(user_id)
+    logger.info(f"Meal template {template_id} deleted for user {user_id}.")
+    return {"message": "Meal template deleted successfully"}
+
+# Записывает приём пищи из шаблона: итоги и позиции берутся из сохранённого снимка без обращения
+# к продуктам и пересчёта, приём пищи, позиции и суточная сводка пишутся в одной транзакции
+async def log_meal_template(db: AsyncSession, template_id: int, user_id: int,
+                            recorded_at: Optional[date] = None) -> MealRead:
+    templates = await get_meal_templates(db, user_id)
+    template = next((template for template in templates if template.id == template_id), None)
+    if template is None:
+        logger.warning(f"Meal template {template_id} not found for user {user_id}.")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Meal template not found")
+
+    recorded_at = recorded_at or date.today()
+    nutrients = {name: getattr(template, name) for name in NUTRIENTS}
+    # Шаблон из памяти процесса мог быть удалён в другом процессе: приём пищи вставляется,
+    # только если шаблон пользователя ещё существует
+    meal_values = {"name": template.name, "user_id": user_id, "recorded_at": recorded_at, "weight": template.weight,
+                   **nutrients}
+    template_exists = exists().where(MealTemplate.id == template_id, MealTemplate.user_id == user_id)
+    result = await db.execute(
+        insert(Meal)
+        .from_select(list(meal_values), select(*(literal(value, Meal.__table__.c[name].type)
+                                                 for name, value in meal_values.items())).where(template_exists))
+        .returning(Meal.id)
+    )
+    meal_id = result.scalar_one_or_none()
+    if meal_id is None:
+        await invalidate_meal_templates(user_id)
+        logger.warning(f"Meal template {template_id} of user {user_id} was deleted, cached copy dropped.")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Meal template not found")
+
+    if template.products:
+        await db.execute(insert(MealProducts), [
+            {"meal_id": meal_id, "product_id": product.id, "product_weight": product.weight,
+             "recorded_at": recorded_at}
+            for product in template.products
+        ])
+    await apply_daily_delta(db, user_id, recorded_at, nutrients, meal_count=1)
+    await db.commit()
+
+    await invalidate_meal_caches(user_id, meal_id, recorded_at)
+    logger.info(f"Meal {meal_id} logged from template {template_id} for user {user_id}.")
+    return MealRead(
+        id=meal_id,
+        name=template.name,
+        weight=template.weight,
+        recorded_at=recorded_at,
+        user_id=user_id,
+        products=template.products,
+        **nutrients
+    )
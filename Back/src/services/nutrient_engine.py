@@ -0,0 +1,46 @@
+from typing import Iterable
+import numpy as np
+
+NUTRIENTS = ("calories", "proteins", "fats", "carbohydrates")
+
+# Матрица нутриентов на 100 г: строка - продукт, столбцы - NUTRIENTS
+class NutrientMatrix:
+    def __init__(self, products: Iterable):
+        self.index: dict[int, int] = {}
+        values = []
+        for product in products:
+            if product.id not in self.index:
+                self.index[product.id] = len(values)
+                values.append([getattr(product, name) for name in NUTRIENTS])
+        self.values = np.array(values, dtype=np.float64).reshape(len(values), len(NUTRIENTS))
+
+    # Номера строк матрицы для массива id продуктов
+    def rows(self, product_ids: Iterable[int]) -> np.ndarray:
+        return np.fromiter((self.index[product_id] for product_id in product_ids), dtype=np.intp)
+
+    # Нутриенты позиций (продукт, вес) одной операцией над массивами;
+    # каждая позиция округляется до сотых, как и при пересчёте отдельного продукта
+    def line_items(self, product_ids: Iterable[int], weights: np.ndarray) -> np.ndarray:
+        weights = np.asarray(weights, dtype=np.float64)
+        return np.round(self.values[self.rows(product_ids)] * (weights / 100)[:, None], 2)
+
+# Суммирует строки по группам (приём пищи, день, пользователь); возвращает ключи групп и матрицу итогов
+def group_totals(values: np.ndarray, groups: Iterable) -> tuple[np.ndarray, np.ndarray]:
+    values = np.asarray(values, dtype=np.float64)
+    keys, inverse = np.unique(np.asarray(list(groups)), return_inverse=True)
+    totals = np.zeros((len(keys), values.shape[1]), dtype=np.float64)
+    np.add.at(totals, inverse, values)
+    return keys, totals
+
+# Нутриенты позиций и итоги по группам за один вызов;
+# итоги - словарь {ключ группы: {"weight": ..., "calories": ..., ...}}
+def compute_batch(matrix: NutrientMatrix, product_ids: list[int], weights: Iterable[float],
+                  groups: Iterable) -> tuple[np.ndarray, dict]:
+    weights = np.asarray(list(weights), dtype=np.float64)
+    if not len(weights):
+        return np.empty((0, len(NUTRIENTS))), {}
+
+    items = matrix.line_items(product_ids, weights)
+    keys, totals = group_totals(np.column_stack([weights, items]), groups)
+    columns = ("weight", *NUTRIENTS)
+    return items, {key: dict(zip(columns, row)) for key, row in zip(keys.tolist(), totals.tolist())}
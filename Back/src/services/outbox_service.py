@@ -0,0 +1,25 @@
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.logging_config import logger
+from src.models.outbox import OutboxEvent
+
+# Добавление события в outbox; сохраняется в той же транзакции, что и изменение данных
+def add_outbox_event(db: AsyncSession, event_type: str, queue_name: str, payload: dict) -> OutboxEvent:
+    event = OutboxEvent(event_type=event_type, queue_name=queue_name, payload=payload)
+    db.add(event)
+    logger.info(f"Outbox event {event_type} for queue {queue_name} added to transaction")
+    return event
+
+# Получение пачки неотправленных событий с блокировкой (другие релеи пропускают заблокированные строки)
+async def lock_outbox_batch(db: AsyncSession, batch_size: int) -> list[OutboxEvent]:
+    result = await db.execute(
+        select(OutboxEvent)
+        .order_by(OutboxEvent.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    return list(result.scalars().all())
+
+# Удаление отправленных событий
+async def delete_outbox_events(db: AsyncSession, event_ids: list[int]) -> None:
+    await db.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(event_ids)))
@@ -8,6 +8,7 @@ from src.models.meal_products import MealProducts
 from src.models.product import Product
 from src.schemas.meal import MealRead
 from src.schemas.product import ProductCreate, ProductUpdate, ProductAdd, ProductRead
+from src.services.meal_products_service import apply_line_item_delta, invalidate_meal_owner_caches
 from src.cache.cache import cache
 
 ALLOWED_IMAGE_TYPES = {"image/jpeg", "image/png", "image/gif"}
@@ -25,8 +26,7 @@ async def recalculate_product_nutrients(db_product: Product, product_weight: flo
         fats=round(db_product.fats * factor, 2),
         carbohydrates=round(db_product.carbohydrates * factor, 2),
         description=db_product.description,
-        has_picture=db_product.has_picture,
-        picture=db_product.picture
+        has_picture=db_product.has_picture
     )
 
 # Функция для получения всех продуктов пользователя
@@ -111,46 +111,40 @@ async def change_product_info_for_weight(db: AsyncSession, product: ProductAdd,
     logger.info(f"Product {product.name} weight and nutrients updated for user {user_id}")
     return ProductRead.model_validate(changed_product)
 
-# Функция для добавления продукта в приём пищи
+# Функция для добавления продукта в приём пищи: итоги приёма пищи и суточная сводка меняются одним дельта-обновлением
 async def add_product_to_meal(db: AsyncSession, meal_id: int, product: ProductAdd, user_id: int):
-    query = select(Meal).where(Meal.id == meal_id)
+    query = select(Meal).where(Meal.id == meal_id, Meal.user_id == user_id)
     result = await db.execute(query)
     meal = result.scalar_one_or_none()
     if not meal:
         logger.error(f"Meal with ID {meal_id} not found for user {user_id}")
-        return HTTPException(
+        raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Meal not found"
         )
 
-    logger.info(f"Adding product {product.name} to meal {meal_id} for user {user_id}")
-    added_product = await change_product_info_for_weight(db, product, user_id)
-    meal.weight += added_product.weight
-    meal.calories += added_product.calories
-    meal.proteins += added_product.proteins
-    meal.fats += added_product.fats
-    meal.carbohydrates += added_product.carbohydrates
+    db_product = await get_product_by_exact_name(db, product.name, user_id)
+    if not db_product:
+        logger.error(f"Product {product.name} not found for user {user_id}")
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Product not found"
+        )
 
+    logger.info(f"Adding product {product.name} to meal {meal_id} for user {user_id}")
     meal_product = MealProducts(
         meal_id=meal_id,
-        product_id=added_product.id,
-        product_weight=added_product.weight
+        product_id=db_product.id,
+        product_weight=product.weight,
+        recorded_at=meal.recorded_at
     )
 
     db.add(meal_product)
+    meal_owner = await apply_line_item_delta(db, meal_id, meal.recorded_at, db_product.id, 0, product.weight)
     await db.commit()
     await db.refresh(meal)
-    await asyncio.gather(
-        cache.delete(f"products:{user_id}"),
-        cache.delete(f"product_exact:{user_id}:{product.name}"),
-        cache.delete(f"personal_product:{user_id}:{added_product.id}"),
-        cache.delete(f"personal_product:{user_id}:{product.name}"),
-        cache.delete(f"personal_products:{user_id}"),
-        cache.delete(f"products:{user_id}:{added_product.id}"),
-        cache.delete(f"products:{user_id}:{product.name}"),
-        cache.delete(f"product:{user_id}:{product.name}")
-    )
-    logger.info(f"Product {added_product.name} added to meal {meal_id} for user {user_id}")
+    await invalidate_meal_owner_caches(meal_owner, meal_id)
+    logger.info(f"Product {db_product.name} added to meal {meal_id} for user {user_id}")
     return MealRead.model_validate(meal)
 
 # Функция для получения доступных продуктов для пользователя
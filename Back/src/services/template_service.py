@@ -0,0 +1,65 @@
+import os
+from typing import Iterable, Optional
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+from src.core.config import TEMPLATES_PATH, TEMPLATES_CACHE_PATH, TEMPLATES_AUTO_RELOAD
+from src.logging_config import logger
+
+# Общая обёртка писем: стили, шапка и подвал
+EMAIL_LAYOUT = "layout.html"
+# Метка места, куда подставляется тело письма при разрезании обёртки
+CONTENT_MARKER = "\x00content\x00"
+LAYOUT_CACHE_LIMIT = 128
+
+if TEMPLATES_CACHE_PATH:
+    os.makedirs(TEMPLATES_CACHE_PATH, exist_ok=True)
+
+# Инициализация асинхронного шаблонизатора Jinja2 с кэшем скомпилированных шаблонов на диске
+env = Environment(
+    loader=FileSystemLoader(TEMPLATES_PATH),
+    enable_async=True,
+    bytecode_cache=FileSystemBytecodeCache(TEMPLATES_CACHE_PATH),
+    auto_reload=TEMPLATES_AUTO_RELOAD,
+)
+
+# Заранее отрисованные статические части обёртки: (шаблон, общий контекст) -> (начало, конец)
+layout_cache: dict[tuple, tuple[str, str]] = {}
+
+# Загружает и компилирует все шаблоны, чтобы первое письмо не ждало компиляции
+def preload_templates() -> int:
+    names = env.list_templates(extensions=["html"])
+    for name in names:
+        env.get_template(name)
+    logger.info(f"Preloaded {len(names)} templates")
+    return len(names)
+
+# Асинхронная отрисовка шаблона
+async def render_template(template_name: str, context: dict) -> str:
+    return await env.get_template(template_name).render_async(context)
+
+# Возвращает статические части обёртки, отрисованные один раз для общего контекста
+async def get_layout_parts(shared_context: dict, layout_name: str = EMAIL_LAYOUT) -> tuple[str, str]:
+    key = (layout_name, tuple(sorted(shared_context.items())))
+    parts = layout_cache.get(key)
+    if parts is None:
+        html = await render_template(layout_name, {**shared_context, "content": CONTENT_MARKER})
+        head, tail = html.split(CONTENT_MARKER)
+        if len(layout_cache) >= LAYOUT_CACHE_LIMIT:
+            layout_cache.clear()
+        parts = layout_cache[key] = (head, tail)
+    return parts
+
+# Отрисовка письма: тело шаблона внутри общей обёртки
+async def render_email(template_name: str, context: dict, title: str,
+                       layout_name: Optional[str] = EMAIL_LAYOUT) -> str:
+    body = await render_template(template_name, context)
+    if not layout_name:
+        return body
+    head, tail = await get_layout_parts({"title": title}, layout_name)
+    return head + body + tail
+
+# Массовая отрисовка писем одного шаблона: обёртка отрисовывается один раз, для каждого письма - только тело
+async def render_many(template_name: str, contexts: Iterable[dict], title: str,
+                      layout_name: Optional[str] = EMAIL_LAYOUT) -> list[str]:
+    template = env.get_template(template_name)
+    head, tail = await get_layout_parts({"title": title}, layout_name) if layout_name else ("", "")
+    return [head + await template.render_async(context) + tail for context in contexts]
@@ -38,6 +38,18 @@ async def find_user_by_login_and_email(db: AsyncSession, email_login: str):
         logger.error(f"Error finding user by login or email ({email_login}): {str(e)}")
         return None
 
+# Функция для получения версии профиля пользователя (None, если пользователь удалён)
+async def get_user_profile_version(db: AsyncSession, user_id: int):
+    cache_key = f"user_version:{user_id}"
+    cached_version = await cache.get(cache_key)
+    if cached_version:
+        return cached_version["version"]
+
+    result = await db.execute(select(User.profile_version).where(User.id == user_id))
+    version = result.scalar_one_or_none()
+    await cache.set(cache_key, {"version": version}, expire=3600)
+    return version
+
 # Функция для удаления пользователя
 async def delete_user(db: AsyncSession, user: User):
     cache_key = f"user:{user.login}"
@@ -46,8 +58,9 @@ async def delete_user(db: AsyncSession, user: User):
         await db.delete(user)
         await db.commit()
 
-        # Удаляем пользователя из кэша
+        # Удаляем пользователя из кэша и аннулируем выданные ему токены
         await cache.delete(cache_key)
+        await cache.set(f"user_version:{user.id}", {"version": None}, expire=3600)
         logger.info(f"User deleted from cache: {user.login}")
 
         return UserRead.model_validate(user)
@@ -105,11 +118,13 @@ async def update_user(user_update: UserUpdate, db: AsyncSession, current_user: U
         else:
             logger.warning(f"Недостаточно данных для расчета нутриентов у пользователя {user.id}")
 
+        # Версия профиля не меняется: логин и id, зашитые в выданные токены, здесь не редактируются,
+        # а смена версии заставила бы все токены пользователя проверяться по БД до их истечения
         await db.commit()
         await db.refresh(user)
 
-        # Удаляем пользователя из кэша
-        await cache.delete(cache_key)
+        # Удаляем пользователя и его аналитику (рекомендации могли измениться) из кэша
+        await cache.delete_many([cache_key, f"analytics_summary:{user.id}"])
         logger.info(f"User {current_user.login} deleted from cache")
 
         return UserRead.model_validate(user)
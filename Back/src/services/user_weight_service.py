@@ -39,6 +39,7 @@ async def save_or_update_weight(user_weight: UserWeightUpdate, db: AsyncSession,
         await db.commit()
         # Очищаем кэш для текущего веса
         await cache.delete(cache_key)
+        await cache.delete(f"analytics_summary:{user_id}")
         logger.info(f"Weight deleted from cache for user {user_id} on {current_date}")
 
         return UserWeightRead.model_validate(user_weight_db)
@@ -0,0 +1,87 @@
+from datetime import date, timedelta
+import numpy as np
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.cache.cache import cache
+from src.models.daily_nutrition import DailyNutrition
+from src.models.user import User
+from src.models.user_weight import UserWeight
+from src.schemas.meal import MealCreate
+from src.services.analytics_service import rolling_average, logging_streaks, macro_split, get_analytics_summary
+from src.services.meal_service import add_meal
+
+def test_rolling_average_skips_days_without_records():
+    calories = np.array([1000, 0, 2000, 3000, 0], dtype=np.float64)
+    logged = np.array([True, False, True, True, False])
+
+    averages = rolling_average(calories, logged, window=2)
+
+    np.testing.assert_allclose(averages, [1000, 1000, 2000, 2500, 3000])
+    assert np.isnan(rolling_average(np.zeros(2), np.array([False, False]), window=2)).all()
+
+def test_logging_streaks():
+    assert logging_streaks(np.array([True, True, False, True, True, True, False])) == (3, 3)
+    assert logging_streaks(np.array([True, True, True, False, False, True])) == (1, 3)
+    assert logging_streaks(np.array([True, False, False])) == (0, 1)
+    assert logging_streaks(np.array([False, False])) == (0, 0)
+
+def test_macro_split_uses_energy_per_gram():
+    split = macro_split([100, 100 * 4 / 9, 100])
+
+    assert split.proteins == split.fats == split.carbohydrates == pytest.approx(1 / 3, abs=1e-4)
+    assert macro_split([0, 0, 0]) is None
+
+@pytest.mark.asyncio
+async def test_get_analytics_summary(test_db: AsyncSession, test_cache):
+    user = User(login="analytics", email="analytics@example.com", hashed_password="pwd", age=30, height=180,
+                weight=80, gender="male", aim="maintain", activity_level="sedentary", recommended_calories=2000)
+    test_db.add(user)
+    await test_db.commit()
+
+    # 2024-01-07 - воскресенье; записи за 4 дня из 7, последние 3 дня подряд
+    today = date(2024, 1, 7)
+    daily = {today - timedelta(days=6): 2000, today - timedelta(days=2): 2100, today - timedelta(days=1): 1500,
+             today: 2000}
+    test_db.add_all([
+        DailyNutrition(user_id=user.id, recorded_at=day, calories=calories, proteins=100, fats=50, carbohydrates=200,
+                       meal_count=3)
+        for day, calories in daily.items()
+    ])
+    test_db.add_all([
+        UserWeight(user_id=user.id, weight=80, recorded_at=today - timedelta(days=6)),
+        UserWeight(user_id=user.id, weight=79.4, recorded_at=today),
+    ])
+    await test_db.commit()
+
+    summary = await get_analytics_summary(test_db, user.id, days=7, today=today)
+
+    assert summary.start_date == today - timedelta(days=6)
+    assert summary.days_logged == 4
+    assert summary.average_calories == 1900
+    assert summary.calories_rolling_7d[0] == 2000 and summary.calories_rolling_7d[-1] == 1900
+    assert summary.recommended_calories == 2000
+    assert summary.adherence_rate == 0.75
+    assert summary.weekday_average_calories["monday"] == 2000
+    assert summary.weekday_average_calories["tuesday"] is None
+    assert summary.current_streak == 3 and summary.longest_streak == 3
+    assert summary.macro_split.proteins == pytest.approx(400 / 1650, abs=1e-4)
+    assert summary.target_macro_split.carbohydrates == pytest.approx(0.4, abs=1e-3)
+    assert summary.weight_change == -0.6
+    assert summary.weight_trend_per_week == pytest.approx(-0.7, abs=1e-3)
+
+    assert await cache.get_field(f"analytics_summary:{user.id}", f"{today}:7") is not None
+
+@pytest.mark.asyncio
+async def test_analytics_summary_cache_is_invalidated_by_meal_writes(test_db: AsyncSession, test_cache):
+    user = User(login="analytics2", email="analytics2@example.com", hashed_password="pwd")
+    test_db.add(user)
+    await test_db.commit()
+
+    before = await get_analytics_summary(test_db, user.id, days=7)
+    assert before.days_logged == 0 and before.recommended_calories is None
+
+    await add_meal(test_db, MealCreate(name="Snack", weight=0, calories=0, proteins=0, fats=0, carbohydrates=0),
+                   user.id)
+
+    after = await get_analytics_summary(test_db, user.id, days=7)
+    assert after.days_logged == 1 and after.current_streak == 1
@@ -1,5 +1,7 @@
 import pytest
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from src.models.outbox import OutboxEvent
 from src.models.user import User
 from src.cache.cache import cache
 from src.schemas.user import UserCreate
@@ -41,3 +43,21 @@ async def test_create_user_service(test_db: AsyncSession, test_rabbitmq):
     user = await create_user(test_db, test_user)
     assert user is not None
     assert user.email == "test14@example.com"
+
+@pytest.mark.asyncio
+async def test_create_user_writes_outbox_event(test_db: AsyncSession):
+    test_user = UserCreate(
+        login="testuser15",
+        email="test15@example.com",
+        password="testpassword"
+    )
+
+    user = await create_user(test_db, test_user)
+
+    result = await test_db.execute(select(OutboxEvent))
+    events = result.scalars().all()
+    assert user is not None
+    assert len(events) == 1
+    assert events[0].event_type == "user_registered"
+    assert events[0].queue_name == "registration_queue"
+    assert events[0].payload == {"email": "test15@example.com", "login": "testuser15"}
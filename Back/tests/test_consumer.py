@@ -0,0 +1,291 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from src.core.config import RABBITMQ_DEAD_LETTER_EXCHANGE, RABBITMQ_MAX_ATTEMPTS
+from src.rabbitmq.consumer import process_message, consume_messages
+from src.cache.cache import cache
+from src.rabbitmq.idempotency import claim_message, CLAIMED, DONE, IN_PROGRESS, UNTRACKED
+from src.rabbitmq.registry import PartialFailureError
+from src.rabbitmq.retry import declare_retry_topology, retry_delay_seconds
+from src.rabbitmq.run_consumer import run_consumers
+
+@pytest.mark.asyncio
+async def test_run_consumers_starts_n_consumers_and_stops_gracefully():
+    mock_client = MagicMock()
+    mock_client.connect = AsyncMock()
+    mock_client.close = AsyncMock()
+    mock_client.open_channel = AsyncMock(side_effect=lambda: AsyncMock())
+    mock_client.connection.closed.return_value = asyncio.get_running_loop().create_future()
+
+    queue = AsyncMock()
+    mock_consume = AsyncMock(side_effect=[(queue, "ctag-1"), (queue, "ctag-2"), (queue, "ctag-3")])
+    stop_event = asyncio.Event()
+
+    with patch("src.rabbitmq.run_consumer.rabbitmq_client", mock_client), \
+            patch("src.rabbitmq.run_consumer.consume_messages", mock_consume):
+        task = asyncio.create_task(run_consumers("registration_queue", 3, stop_event))
+        await asyncio.sleep(0.05)
+        assert mock_consume.call_count == 3
+        assert not task.done()
+
+        stop_event.set()
+        await asyncio.wait_for(task, timeout=1)
+
+    assert [call.args[0] for call in queue.cancel.call_args_list] == ["ctag-1", "ctag-2", "ctag-3"]
+    mock_client.close.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_run_consumers_raises_when_connection_is_closed():
+    closed = asyncio.get_running_loop().create_future()
+    mock_client = MagicMock()
+    mock_client.connect = AsyncMock()
+    mock_client.close = AsyncMock()
+    mock_client.open_channel = AsyncMock(return_value=AsyncMock())
+    mock_client.connection.closed.return_value = closed
+
+    with patch("src.rabbitmq.run_consumer.rabbitmq_client", mock_client), \
+            patch("src.rabbitmq.run_consumer.consume_messages", AsyncMock(return_value=(AsyncMock(), "ctag"))):
+        task = asyncio.create_task(run_consumers("registration_queue", 1, asyncio.Event()))
+        await asyncio.sleep(0.05)
+        closed.set_result(True)
+
+        with pytest.raises(ConnectionError):
+            await asyncio.wait_for(task, timeout=1)
+
+    mock_client.close.assert_called_once()
+
+def make_message(body: bytes, message_type="user_registered", routing_key="registration_queue", headers=None,
+                 message_id="1"):
+    message = MagicMock()
+    message.body = body
+    message.type = message_type
+    message.routing_key = routing_key
+    message.message_id = message_id
+    message.content_type = "application/json"
+    message.headers = headers or {}
+    message.ack = AsyncMock()
+    message.reject = AsyncMock()
+    return message
+
+@pytest.mark.asyncio
+async def test_process_message_dispatches_by_type():
+    handler = AsyncMock()
+    message = make_message(b'{"email": "a@example.com"}')
+
+    with patch.dict("src.rabbitmq.consumer.MESSAGE_HANDLERS", {"user_registered": handler}):
+        await process_message(message)
+
+    handler.assert_awaited_once_with({"email": "a@example.com"})
+    message.ack.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_process_message_uses_queue_default_type_for_untyped_messages():
+    handler = AsyncMock()
+    message = make_message(b'{"email": "a@example.com"}', message_type=None)
+
+    with patch.dict("src.rabbitmq.consumer.MESSAGE_HANDLERS", {"user_registered": handler}):
+        await process_message(message)
+
+    handler.assert_awaited_once()
+    message.ack.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_process_message_dead_letters_invalid_messages():
+    mock_client = MagicMock()
+    mock_client.publish = AsyncMock()
+    messages = [make_message(b'{}', message_type="unknown"), make_message(b'not json'),
+                make_message(b'{"login": "user"}')]
+
+    with patch("src.rabbitmq.retry.rabbitmq_client", mock_client):
+        for message in messages:
+            await process_message(message)
+            message.ack.assert_awaited_once()
+            message.reject.assert_not_called()
+
+    assert mock_client.publish.call_count == 3
+    for call in mock_client.publish.call_args_list:
+        assert call.args[0] == "registration_queue"
+        assert call.kwargs["exchange_name"] == RABBITMQ_DEAD_LETTER_EXCHANGE
+
+@pytest.mark.asyncio
+async def test_process_message_schedules_delayed_retry_on_handler_error():
+    handler = AsyncMock(side_effect=OSError("smtp is down"))
+    mock_client = MagicMock()
+    mock_client.publish = AsyncMock()
+    message = make_message(b'{"email": "a@example.com"}', headers={"x-attempts": 1})
+
+    with patch.dict("src.rabbitmq.consumer.MESSAGE_HANDLERS", {"user_registered": handler}), \
+            patch("src.rabbitmq.retry.rabbitmq_client", mock_client):
+        await process_message(message)
+
+    routing_key, retried = mock_client.publish.call_args.args
+    assert routing_key == "registration_queue.retry.2"
+    assert retried.headers["x-attempts"] == 2
+    assert retried.message_id == "1" and retried.type == "user_registered"
+    message.ack.assert_awaited_once()
+    message.reject.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_process_message_retries_only_remaining_part_of_partially_processed_message():
+    handler = AsyncMock(side_effect=PartialFailureError({"recipients": [{"email": "b@example.com"}]}, OSError("smtp")))
+    mock_client = MagicMock()
+    mock_client.publish = AsyncMock()
+    message = make_message(b'{"recipients": [{"email": "a@example.com"}, {"email": "b@example.com"}]}',
+                           message_type="nutrition_digest", routing_key="digest_queue")
+
+    with patch.dict("src.rabbitmq.consumer.MESSAGE_HANDLERS", {"nutrition_digest": handler}), \
+            patch("src.rabbitmq.retry.rabbitmq_client", mock_client):
+        await process_message(message)
+
+    routing_key, retried = mock_client.publish.call_args.args
+    assert routing_key == "digest_queue.retry.1"
+    assert json.loads(retried.body) == {"recipients": [{"email": "b@example.com"}]}
+    assert retried.headers["x-attempts"] == 1
+    message.ack.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_process_message_dead_letters_after_max_attempts():
+    handler = AsyncMock(side_effect=OSError("smtp is down"))
+    mock_client = MagicMock()
+    mock_client.publish = AsyncMock()
+    message = make_message(b'{"email": "a@example.com"}', headers={"x-attempts": RABBITMQ_MAX_ATTEMPTS - 1})
+
+    with patch.dict("src.rabbitmq.consumer.MESSAGE_HANDLERS", {"user_registered": handler}), \
+            patch("src.rabbitmq.retry.rabbitmq_client", mock_client):
+        await process_message(message)
+
+    assert mock_client.publish.call_args.kwargs["exchange_name"] == RABBITMQ_DEAD_LETTER_EXCHANGE
+    assert mock_client.publish.call_args.args[1].headers["x-attempts"] == RABBITMQ_MAX_ATTEMPTS
+    message.ack.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_process_message_requeues_when_broker_rejects_retry():
+    handler = AsyncMock(side_effect=OSError("smtp is down"))
+    mock_client = MagicMock()
+    mock_client.publish = AsyncMock(side_effect=ConnectionError("broker is down"))
+    message = make_message(b'{"email": "a@example.com"}')
+
+    with patch.dict("src.rabbitmq.consumer.MESSAGE_HANDLERS", {"user_registered": handler}), \
+            patch("src.rabbitmq.retry.rabbitmq_client", mock_client):
+        await process_message(message)
+
+    message.ack.assert_not_called()
+    message.reject.assert_awaited_once_with(requeue=True)
+
+@pytest.mark.asyncio
+async def test_process_message_skips_already_processed_message():
+    handler = AsyncMock()
+    message = make_message(b'{"email": "a@example.com"}')
+
+    with patch.dict("src.rabbitmq.consumer.MESSAGE_HANDLERS", {"user_registered": handler}), \
+            patch("src.rabbitmq.consumer.claim_message", AsyncMock(return_value=DONE)):
+        await process_message(message)
+
+    handler.assert_not_called()
+    message.ack.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_process_message_marks_claimed_message_processed():
+    handler = AsyncMock()
+    complete = AsyncMock()
+    message = make_message(b'{"email": "a@example.com"}')
+
+    with patch.dict("src.rabbitmq.consumer.MESSAGE_HANDLERS", {"user_registered": handler}), \
+            patch("src.rabbitmq.consumer.claim_message", AsyncMock(return_value=CLAIMED)), \
+            patch("src.rabbitmq.consumer.complete_message", complete):
+        await process_message(message)
+
+    handler.assert_awaited_once()
+    complete.assert_awaited_once_with("1")
+
+@pytest.mark.asyncio
+async def test_claim_message_detects_redelivery():
+    mock_cache = MagicMock()
+    mock_cache.set_if_absent = AsyncMock(side_effect=[True, False, False])
+    mock_cache.get = AsyncMock(side_effect=[{"status": "done"}, {"status": "in_progress"}])
+
+    with patch("src.rabbitmq.idempotency.cache", mock_cache):
+        assert await claim_message("42") == CLAIMED
+        assert await claim_message("42") == DONE
+        assert await claim_message("42") == IN_PROGRESS
+        assert await claim_message(None) == UNTRACKED
+
+@pytest.mark.asyncio
+async def test_declare_retry_topology_uses_exponential_ttl():
+    channel = AsyncMock()
+
+    await declare_retry_topology(channel, "registration_queue", max_attempts=4)
+
+    retry_calls = channel.declare_queue.call_args_list[:3]
+    assert [call.args[0] for call in retry_calls] == ["registration_queue.retry.1", "registration_queue.retry.2",
+                                                      "registration_queue.retry.3"]
+    ttls = [call.kwargs["arguments"]["x-message-ttl"] for call in retry_calls]
+    assert ttls == [int(retry_delay_seconds(n) * 1000) for n in (1, 2, 3)]
+    assert ttls[1] == ttls[0] * 2 and ttls[2] == ttls[1] * 2
+    assert all(call.kwargs["arguments"]["x-dead-letter-routing-key"] == "registration_queue" for call in retry_calls)
+    assert channel.declare_queue.call_args_list[3].args[0] == "registration_queue.dead"
+
+@pytest.mark.asyncio
+async def test_process_message_bounds_parallelism():
+    running = 0
+    peak = 0
+
+    async def slow_handler(data):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    messages = [make_message(b'{"email": "a@example.com"}', message_id=str(i)) for i in range(10)]
+    with patch.dict("src.rabbitmq.consumer.MESSAGE_HANDLERS", {"user_registered": slow_handler}), \
+            patch("src.rabbitmq.consumer.consumer_slots", asyncio.Semaphore(3)):
+        await asyncio.gather(*(process_message(message) for message in messages))
+
+    assert peak == 3
+    assert all(message.ack.await_count == 1 for message in messages)
+
+@pytest.mark.asyncio
+async def test_consume_messages_sets_prefetch():
+    channel = AsyncMock()
+    queue = channel.declare_queue.return_value
+    queue.consume.return_value = "ctag"
+
+    with patch("src.rabbitmq.consumer.rabbitmq_client", MagicMock()):
+        result = await consume_messages("registration_queue", channel, prefetch_count=5)
+
+    channel.set_qos.assert_awaited_once_with(prefetch_count=5)
+    assert result == (queue, "ctag")
+
+@pytest.mark.asyncio
+async def test_redelivery_after_consumer_crash_waits_for_lock_without_spending_attempts(test_cache):
+    handler = AsyncMock()
+    mock_client = MagicMock()
+    mock_client.publish = AsyncMock()
+    # Потребитель захватил сообщение и упал, не сняв захват
+    await cache.set_if_absent("message_processed:crashed", {"status": IN_PROGRESS}, 300)
+    message = make_message(b'{"email": "a@example.com"}', message_id="crashed",
+                           headers={"x-attempts": RABBITMQ_MAX_ATTEMPTS - 1})
+
+    with patch.dict("src.rabbitmq.consumer.MESSAGE_HANDLERS", {"user_registered": handler}), \
+            patch("src.rabbitmq.retry.rabbitmq_client", mock_client):
+        await process_message(message)
+
+        handler.assert_not_called()
+        message.ack.assert_awaited_once()
+        routing_key, waiting = mock_client.publish.call_args.args
+        assert routing_key == "registration_queue.wait"
+        assert "exchange_name" not in mock_client.publish.call_args.kwargs
+        assert waiting.headers["x-attempts"] == RABBITMQ_MAX_ATTEMPTS - 1
+        assert 290 <= waiting.expiration <= 300
+
+        # Захват истёк - сообщение из очереди ожидания вернулось и обрабатывается
+        await cache.delete("message_processed:crashed")
+        redelivered = make_message(waiting.body, message_id="crashed", headers=waiting.headers)
+        await process_message(redelivered)
+
+    handler.assert_awaited_once_with({"email": "a@example.com"})
+    redelivered.ack.assert_awaited_once()
+    assert (await cache.get("message_processed:crashed"))["status"] == DONE
+
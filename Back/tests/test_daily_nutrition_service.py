@@ -0,0 +1,72 @@
+from datetime import date, timedelta
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.models.daily_nutrition import DailyNutrition
+from src.models.meal import Meal
+from src.models.product import Product
+from src.models.user import User
+from src.schemas.meal import MealCreate, MealUpdate
+from src.schemas.meal_products import MealProductsCreate, MealProductsUpdate
+from src.services.daily_nutrition_service import get_daily_nutrition, rebuild_daily_nutrition
+from src.services.meal_service import add_meal, update_meal, delete_meal
+
+async def create_user_with_products(test_db: AsyncSession):
+    user = User(login="rollup", email="rollup@example.com", hashed_password="pwd")
+    apple = Product(name="Apple", weight=100, calories=52, proteins=0.3, fats=0.2, carbohydrates=14, is_public=True)
+    chicken = Product(name="Chicken", weight=100, calories=165, proteins=31, fats=3.6, carbohydrates=0, is_public=True)
+    test_db.add_all([user, apple, chicken])
+    await test_db.commit()
+    await test_db.refresh(apple)
+    await test_db.refresh(chicken)
+    return user, apple, chicken
+
+def new_meal(name: str, products: list) -> MealCreate:
+    return MealCreate(name=name, weight=0, calories=0, proteins=0, fats=0, carbohydrates=0, products=products)
+
+async def read_rollup(test_db: AsyncSession, user_id: int):
+    result = await test_db.execute(select(DailyNutrition).where(DailyNutrition.user_id == user_id))
+    return {row.recorded_at: (round(row.calories, 6), row.meal_count) for row in result.scalars().all()}
+
+@pytest.mark.asyncio
+async def test_meal_changes_update_daily_nutrition(test_db: AsyncSession, test_cache):
+    user, apple, chicken = await create_user_with_products(test_db)
+    today = date.today()
+
+    breakfast = await add_meal(test_db, new_meal("Breakfast", [MealProductsCreate(product_id=apple.id, product_weight=200)]), user.id)
+    lunch = await add_meal(test_db, new_meal("Lunch", [MealProductsCreate(product_id=chicken.id, product_weight=100)]), user.id)
+    assert await read_rollup(test_db, user.id) == {today: (104 + 165, 2)}
+
+    await update_meal(test_db, MealUpdate(name="Lunch", weight=0, calories=0, proteins=0, fats=0, carbohydrates=0,
+                                          products=[MealProductsUpdate(product_id=chicken.id, product_weight=200)]),
+                      lunch.id, user.id)
+    assert await read_rollup(test_db, user.id) == {today: (104 + 330, 2)}
+
+    await delete_meal(test_db, breakfast.id, user.id)
+    assert await read_rollup(test_db, user.id) == {today: (330, 1)}
+
+    await delete_meal(test_db, lunch.id, user.id)
+    assert await read_rollup(test_db, user.id) == {}
+
+@pytest.mark.asyncio
+async def test_rebuild_daily_nutrition_matches_meals(test_db: AsyncSession):
+    user = User(login="rebuild", email="rebuild@example.com", hashed_password="pwd")
+    test_db.add(user)
+    await test_db.commit()
+    today = date.today()
+    yesterday = today - timedelta(days=1)
+    test_db.add_all([
+        Meal(name="A", weight=100, calories=100, proteins=1, fats=2, carbohydrates=3, user_id=user.id, recorded_at=today),
+        Meal(name="B", weight=100, calories=50, proteins=1, fats=2, carbohydrates=3, user_id=user.id, recorded_at=today),
+        Meal(name="C", weight=100, calories=70, proteins=1, fats=2, carbohydrates=3, user_id=user.id, recorded_at=yesterday),
+        DailyNutrition(user_id=user.id, recorded_at=today - timedelta(days=5), calories=999, proteins=0, fats=0,
+                       carbohydrates=0, meal_count=1),
+    ])
+    await test_db.commit()
+
+    assert await rebuild_daily_nutrition(test_db, batch_size=1) == 2
+    assert await read_rollup(test_db, user.id) == {today: (150, 2), yesterday: (70, 1)}
+
+    days = await get_daily_nutrition(test_db, user.id, yesterday, today)
+    assert [day.recorded_at for day in days] == [yesterday, today]
+    assert days[1].proteins == 2 and days[1].carbohydrates == 6
@@ -0,0 +1,110 @@
+from datetime import date
+from types import SimpleNamespace
+import pytest
+from unittest.mock import AsyncMock, patch
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.models.meal import Meal
+from src.models.user import User
+from src.models.user_weight import UserWeight
+from src.rabbitmq.handlers import send_nutrition_digest
+from src.rabbitmq.registry import InvalidMessageError, PartialFailureError
+from src.services.digest_service import fetch_digest_batch, build_digest_context, get_digest_period
+
+def make_row(**kwargs):
+    row = dict(id=1, login="testuser", firstname=None, email="test@example.com", recommended_calories=2000,
+               calories=14700, proteins=700, fats=490, carbohydrates=1750, days_logged=7,
+               first_weight=80.0, last_weight=79.2)
+    row.update(kwargs)
+    return SimpleNamespace(**row)
+
+def test_get_digest_period():
+    assert get_digest_period("daily", date(2024, 3, 11)) == (date(2024, 3, 10), date(2024, 3, 10))
+    assert get_digest_period("weekly", date(2024, 3, 11)) == (date(2024, 3, 4), date(2024, 3, 10))
+
+def test_build_digest_context():
+    context = build_digest_context(make_row(), "weekly", date(2024, 3, 4), date(2024, 3, 10))
+
+    assert context["user_name"] == "testuser"
+    assert context["avg_calories"] == 2100
+    assert context["calories_diff_percent"] == 5
+    assert context["avg_proteins"] == 100
+    assert context["weight_change"] == -0.8
+
+def test_build_digest_context_averages_over_logged_days():
+    row = make_row(calories=6300, proteins=300, fats=210, carbohydrates=750, days_logged=3)
+    context = build_digest_context(row, "weekly", date(2024, 3, 4), date(2024, 3, 10))
+
+    assert context["avg_calories"] == 2100
+    assert context["avg_proteins"] == 100
+    assert context["calories_diff_percent"] == 5
+
+def test_build_digest_context_skips_inactive_users():
+    row = make_row(calories=None, proteins=None, fats=None, carbohydrates=None, days_logged=None)
+    assert build_digest_context(row, "daily", date(2024, 3, 10), date(2024, 3, 10)) is None
+
+@pytest.mark.asyncio
+async def test_send_nutrition_digest_renders_and_sends_in_one_batch():
+    context = build_digest_context(make_row(), "weekly", date(2024, 3, 4), date(2024, 3, 10))
+    recipients = [context, {**context, "email": "other@example.com", "user_name": "Other"}]
+    mock_send_many = AsyncMock(return_value=[])
+
+    with patch("src.rabbitmq.handlers.send_many", mock_send_many):
+        await send_nutrition_digest({"period": "weekly", "title": "Weekly", "recipients": recipients})
+
+    emails = mock_send_many.call_args.args[0]
+    assert [email["To"] for email in emails] == ["test@example.com", "other@example.com"]
+    assert "Hello, Other!" in emails[1].get_content()
+    assert "2100 kcal" in emails[0].get_content()
+
+@pytest.mark.asyncio
+async def test_send_nutrition_digest_retries_only_failed_recipients():
+    context = build_digest_context(make_row(), "weekly", date(2024, 3, 4), date(2024, 3, 10))
+    recipients = [context, {**context, "email": "other@example.com", "user_name": "Other"}]
+
+    async def fail_second(emails):
+        return [(emails[1], OSError("mailbox unavailable"))]
+
+    with patch("src.rabbitmq.handlers.send_many", AsyncMock(side_effect=fail_second)), \
+            pytest.raises(PartialFailureError) as exc_info:
+        await send_nutrition_digest({"period": "weekly", "title": "Weekly", "recipients": recipients})
+
+    assert [recipient["email"] for recipient in exc_info.value.remaining["recipients"]] == ["other@example.com"]
+    assert exc_info.value.remaining["title"] == "Weekly"
+
+@pytest.mark.asyncio
+async def test_send_nutrition_digest_rejects_empty_message():
+    with pytest.raises(InvalidMessageError):
+        await send_nutrition_digest({"period": "daily", "title": "Daily", "recipients": []})
+
+@pytest.mark.asyncio
+async def test_fetch_digest_batch_aggregates_per_user(test_db: AsyncSession):
+    test_db.add_all([
+        User(id=1, login="digest1", email="digest1@example.com", hashed_password="pwd", recommended_calories=2000),
+        User(id=2, login="digest2", email="digest2@example.com", hashed_password="pwd"),
+        User(id=3, login="digest3", email="digest3@example.com", hashed_password="pwd"),
+    ])
+    await test_db.commit()
+    test_db.add_all([
+        Meal(name="Breakfast", weight=300, calories=600, proteins=30, fats=20, carbohydrates=70,
+             user_id=1, recorded_at=date(2024, 3, 4)),
+        Meal(name="Dinner", weight=400, calories=900, proteins=40, fats=30, carbohydrates=100,
+             user_id=1, recorded_at=date(2024, 3, 5)),
+        Meal(name="Old", weight=400, calories=900, proteins=40, fats=30, carbohydrates=100,
+             user_id=1, recorded_at=date(2024, 2, 1)),
+        UserWeight(user_id=1, weight=80, recorded_at=date(2024, 3, 1)),
+        UserWeight(user_id=1, weight=79, recorded_at=date(2024, 3, 9)),
+        Meal(name="Lunch", weight=200, calories=500, proteins=20, fats=10, carbohydrates=60,
+             user_id=3, recorded_at=date(2024, 3, 6)),
+    ])
+    await test_db.commit()
+
+    first_batch = await fetch_digest_batch(test_db, date(2024, 3, 4), date(2024, 3, 10), 0, 2)
+    second_batch = await fetch_digest_batch(test_db, date(2024, 3, 4), date(2024, 3, 10), first_batch[-1].id, 2)
+
+    assert [row.id for row in first_batch] == [1, 2]
+    assert [row.id for row in second_batch] == [3]
+    assert first_batch[0].calories == 1500
+    assert first_batch[0].days_logged == 2
+    assert (first_batch[0].first_weight, first_batch[0].last_weight) == (80, 79)
+    assert first_batch[1].days_logged is None
+    assert second_batch[0].calories == 500
@@ -0,0 +1,71 @@
+import socket
+import pytest
+from src.services.email_service import SMTPPool, build_email
+
+controller_module = pytest.importorskip("aiosmtpd.controller")
+
+class RecordingHandler:
+    def __init__(self):
+        self.received = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received.append((session.peer, envelope.rcpt_tos))
+        return "250 Message accepted for delivery"
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler()
+    controller = controller_module.Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    yield controller, handler
+    controller.stop()
+
+def make_pool(controller, **kwargs):
+    return SMTPPool(hostname=controller.hostname, port=controller.port, use_tls=False,
+                    username=None, password=None, **kwargs)
+
+def make_emails(count):
+    return [build_email(f"user{i}@example.com", "Digest", "<p>hi</p>", "noreply@example.com") for i in range(count)]
+
+@pytest.mark.asyncio
+async def test_send_many_uses_one_session(smtp_server):
+    controller, handler = smtp_server
+    pool = make_pool(controller)
+
+    failed = await pool.send_many(make_emails(5))
+    await pool.send(make_emails(1)[0])
+    await pool.close()
+
+    assert failed == []
+    assert len(handler.received) == 6
+    assert len({peer for peer, _ in handler.received}) == 1
+
+@pytest.mark.asyncio
+async def test_connection_is_rotated_after_max_messages(smtp_server):
+    controller, handler = smtp_server
+    pool = make_pool(controller, max_messages=2)
+
+    failed = await pool.send_many(make_emails(5))
+    await pool.close()
+
+    assert failed == []
+    assert len(handler.received) == 5
+    assert len({peer for peer, _ in handler.received}) == 3
+
+@pytest.mark.asyncio
+async def test_dropped_connection_is_reopened(smtp_server):
+    controller, handler = smtp_server
+    pool = make_pool(controller, keepalive_seconds=0)
+
+    await pool.send(make_emails(1)[0])
+    pool.idle[0].smtp.close()  # соединение оборвалось, пока простаивало
+    await pool.send(make_emails(1)[0])
+    await pool.close()
+
+    assert len(handler.received) == 2
+    assert len({peer for peer, _ in handler.received}) == 2
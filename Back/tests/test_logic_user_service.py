@@ -154,8 +154,10 @@ async def test_update_user():
             # Проверяем, что был вызван commit
             mock_db.commit.assert_called_once()
 
-            # Проверяем, что данные были обновлены в кэше
-            mock_cache.delete.assert_called_once_with(f"user:{current_user.login}")
+            # Проверяем, что пользователь и его аналитика удалены из кэша
+            mock_cache.delete_many.assert_called_once_with(
+                [f"user:{current_user.login}", f"analytics_summary:{current_user.id}"]
+            )
 
             # Проверяем, что функция обновления веса была вызвана
             mock_save_weight.assert_called_once_with(
@@ -0,0 +1,28 @@
+from datetime import date, timedelta
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.models.user import User
+from src.models.user_weight import UserWeight
+from src.services.maintenance_service import add_daily_weight_records
+
+@pytest.mark.asyncio
+async def test_add_daily_weight_records_copies_last_weight(test_db: AsyncSession):
+    today = date.today()
+    test_db.add_all([User(id=i, login=f"weight{i}", email=f"weight{i}@example.com", hashed_password="pwd")
+                     for i in (1, 2, 3)])
+    await test_db.commit()
+    test_db.add_all([
+        UserWeight(user_id=1, weight=80, recorded_at=today - timedelta(days=5)),
+        UserWeight(user_id=1, weight=79, recorded_at=today - timedelta(days=1)),
+        UserWeight(user_id=2, weight=60, recorded_at=today - timedelta(days=3)),
+        UserWeight(user_id=2, weight=61, recorded_at=today),
+    ])
+    await test_db.commit()
+
+    inserted = await add_daily_weight_records(test_db, today=today, batch_size=1)
+
+    assert inserted == 1
+    result = await test_db.execute(select(UserWeight.user_id, UserWeight.weight).where(UserWeight.recorded_at == today)
+                                   .order_by(UserWeight.user_id))
+    assert result.all() == [(1, 79), (2, 61)]
@@ -1,5 +1,7 @@
 import pytest
+from sqlalchemy import select, event
 from sqlalchemy.ext.asyncio import AsyncSession
+from src.models.daily_nutrition import DailyNutrition
 from src.models.meal import Meal
 from src.models.meal_products import MealProducts
 from src.models.product import Product
@@ -7,6 +9,7 @@ from src.models.user import User
 from src.schemas.meal_products import MealProductsCreate, MealProductsUpdate
 from src.services.meal_products_service import get_meal_products, add_meal_product, update_meal_product, \
     delete_meal_product
+from src.services.meal_service import load_meals_line_items
 from src.cache.cache import cache
 
 @pytest.mark.asyncio
@@ -50,7 +53,8 @@ async def test_get_meal_products(test_db: AsyncSession, test_cache):
     meal_products = MealProducts(
         product_id=product.id,
         meal_id=meal.id,
-        product_weight=50
+        product_weight=50,
+        recorded_at=meal.recorded_at
     )
 
     test_db.add(meal_products)
@@ -170,7 +174,8 @@ async def test_update_meal_product(test_db: AsyncSession, test_cache):
     meal_products_db = MealProducts(
         product_id=product.id,
         meal_id=meal.id,
-        product_weight=50
+        product_weight=50,
+        recorded_at=meal.recorded_at
     )
 
     test_db.add(meal_products_db)
@@ -229,7 +234,8 @@ async def test_delete_meal_product(test_db: AsyncSession, test_cache):
     meal_products_db = MealProducts(
         product_id=product.id,
         meal_id=meal.id,
-        product_weight=50
+        product_weight=50,
+        recorded_at=meal.recorded_at
     )
 
     test_db.add(meal_products_db)
@@ -239,3 +245,79 @@ async def test_delete_meal_product(test_db: AsyncSession, test_cache):
     result = await delete_meal_product(test_db, meal.id, product.id)
     assert result is not None
     assert result["message"] == f"Product with ID {product.id} removed from meal {meal.id}"
+
+@pytest.mark.asyncio
+async def test_meal_product_changes_adjust_meal_totals(test_db: AsyncSession, test_cache):
+    test_user = User(login="testuser15", email="test15@example.com", hashed_password="testpassword")
+    product = Product(name="Rice", weight=100, calories=130, proteins=2.7, fats=0.3, carbohydrates=28, is_public=True)
+    test_db.add_all([test_user, product])
+    await test_db.commit()
+
+    meal = Meal(name="dinner", weight=0, calories=0, proteins=0, fats=0, carbohydrates=0, user_id=test_user.id)
+    test_db.add(meal)
+    await test_db.commit()
+
+    async def stored_totals():
+        result = await test_db.execute(
+            select(Meal.weight, Meal.calories, Meal.proteins, DailyNutrition.calories)
+            .join(DailyNutrition, DailyNutrition.user_id == Meal.user_id)
+            .where(Meal.id == meal.id)
+        )
+        return tuple(round(value, 6) for value in result.one())
+
+    await add_meal_product(test_db, meal.id, MealProductsCreate(product_id=product.id, product_weight=150))
+    assert await stored_totals() == (150, 195, 4.05, 195)
+
+    await update_meal_product(test_db, meal.id, MealProductsUpdate(product_id=product.id, product_weight=50))
+    assert await stored_totals() == (50, 65, 1.35, 65)
+
+    await delete_meal_product(test_db, meal.id, product.id)
+    assert await stored_totals() == (0, 0, 0, 0)
+
+@pytest.mark.asyncio
+async def test_meal_product_delta_rounds_like_recalculation(test_db: AsyncSession, test_cache):
+    test_user = User(login="testuser16", email="test16@example.com", hashed_password="testpassword")
+    product = Product(name="Broth", weight=100, calories=12.5, proteins=0.5, fats=4.5, carbohydrates=2.5,
+                      is_public=True)
+    test_db.add_all([test_user, product])
+    await test_db.commit()
+    meal = Meal(name="dinner", weight=0, calories=0, proteins=0, fats=0, carbohydrates=0, user_id=test_user.id)
+    test_db.add(meal)
+    await test_db.commit()
+
+    await add_meal_product(test_db, meal.id, MealProductsCreate(product_id=product.id, product_weight=10))
+    # 12.5 * 0.05 = 0.625, 0.5 * 0.05 = 0.025: половины округляются к чётному, как в nutrient_engine
+    await update_meal_product(test_db, meal.id, MealProductsUpdate(product_id=product.id, product_weight=5))
+
+    result = await test_db.execute(select(Meal).where(Meal.id == meal.id))
+    stored = result.scalar_one()
+    await test_db.refresh(stored)
+    _, totals = await load_meals_line_items(test_db, [stored])
+    assert (stored.calories, stored.proteins, stored.carbohydrates) == (0.62, 0.02, 0.12)
+    assert {name: getattr(stored, name) for name in ("calories", "proteins", "fats", "carbohydrates")} == \
+           {name: totals[meal.id][name] for name in ("calories", "proteins", "fats", "carbohydrates")}
+
+
+@pytest.mark.asyncio
+async def test_meal_totals_update_is_limited_to_meal_partition(test_db: AsyncSession, test_cache):
+    test_user = User(login="testuser17", email="test17@example.com", hashed_password="testpassword")
+    product = Product(name="Oats", weight=100, calories=370, proteins=13, fats=7, carbohydrates=60, is_public=True)
+    test_db.add_all([test_user, product])
+    await test_db.commit()
+    meal = Meal(name="breakfast", weight=0, calories=0, proteins=0, fats=0, carbohydrates=0, user_id=test_user.id)
+    test_db.add(meal)
+    await test_db.commit()
+    await add_meal_product(test_db, meal.id, MealProductsCreate(product_id=product.id, product_weight=50))
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(test_db.bind.sync_engine, "before_cursor_execute", listener)
+    try:
+        await update_meal_product(test_db, meal.id, MealProductsUpdate(product_id=product.id, product_weight=80))
+    finally:
+        event.remove(test_db.bind.sync_engine, "before_cursor_execute", listener)
+
+    # Итоги обновляются в секции meal за дату приёма пищи, а не во всех секциях
+    meal_updates = [statement for statement in statements if statement.lstrip().startswith("UPDATE meal ")]
+    assert len(meal_updates) == 1
+    assert "meal.recorded_at =" in meal_updates[0]
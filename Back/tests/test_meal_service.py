@@ -1,15 +1,20 @@
 from datetime import date, timedelta
+from unittest.mock import patch
 import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession
+from src.models.daily_nutrition import DailyNutrition
 from src.models.meal import Meal
 from src.models.meal_products import MealProducts
 from src.models.product import Product
 from src.models.user import User
 from src.schemas.meal_products import MealProductsCreate, MealProductsUpdate
-from src.schemas.meal import MealCreate, MealRead, MealUpdate
+from src.schemas.meal import MealCreate, MealRead, MealUpdate, MealBulkItem
 from src.schemas.product import ProductRead
 from src.services.meal_service import add_meal, get_user_meals, get_user_meals_with_products_by_date, \
-    recalculate_meal_nutrients, get_meal_by_id, get_meals_by_date, get_meals_last_7_days, update_meal, delete_meal
+    recalculate_meal_nutrients, get_meal_by_id, get_meals_by_date, get_meals_last_7_days, update_meal, delete_meal, \
+    get_meals_range, add_meals_bulk, delete_meals_bulk, relog_meals, copy_meal, copy_day
 from src.cache.cache import cache
 
 @pytest.mark.asyncio
@@ -282,6 +287,42 @@ async def test_get_user_meals_with_products_by_date(test_db: AsyncSession, test_
     assert meals is not None
     assert len(meals) == 2
     assert meals[0].name == meal1.name
+    # Сохранённые итоги не пересчитываются по позициям при чтении
+    assert meals[0].calories == 100
+    await test_db.refresh(meal1)
+    assert meal1.calories == 100
+
+@pytest.mark.asyncio
+async def test_get_user_meals_with_products_by_date_loads_products_in_one_query(test_db: AsyncSession, test_cache):
+    test_user = User(login="testuser15", email="test15@example.com", hashed_password="testpassword")
+    products = [Product(name=f"Product {i}", weight=100, calories=100 + i, proteins=10, fats=5, carbohydrates=20,
+                        is_public=True) for i in range(3)]
+    test_db.add_all([test_user, *products])
+    await test_db.commit()
+
+    meals = [Meal(name=f"meal {i}", weight=150, calories=151.5, proteins=15, fats=7.5, carbohydrates=30,
+                  user_id=test_user.id) for i in range(4)]
+    test_db.add_all(meals)
+    await test_db.flush()
+    test_db.add_all([MealProducts(meal_id=meal.id, product_id=product.id, product_weight=50,
+                                  recorded_at=meal.recorded_at) for meal in meals for product in products])
+    await test_db.commit()
+    test_db.expunge_all()
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(test_db.bind.sync_engine, "before_cursor_execute", listener)
+    try:
+        result = await get_user_meals_with_products_by_date(test_db, test_user.id, str(date.today()))
+    finally:
+        event.remove(test_db.bind.sync_engine, "before_cursor_execute", listener)
+
+    # Один запрос за приёмами пищи и один за продуктами всех приёмов, независимо от их числа
+    assert len([statement for statement in statements if statement.lstrip().upper().startswith("SELECT")]) == 2
+    assert [meal.name for meal in result] == [meal.name for meal in meals]
+    assert all(len(meal.products) == 3 for meal in result)
+    assert result[0].calories == round(50 + 50.5 + 51, 2)
+    assert result[0].weight == 150
 
 @pytest.mark.asyncio
 async def test_get_meal_by_id(test_db: AsyncSession, test_cache):
@@ -456,13 +497,14 @@ async def test_update_meal(test_db: AsyncSession, test_cache):
     await test_db.commit()
     await test_db.refresh(test_user)
 
+    # Итоги приёма пищи без продуктов - нулевые; update_meal меняет их на разницу по позициям
     meal = Meal(
         name="breakfast",
-        weight=100,
-        calories=100,
-        proteins=100,
-        fats=100,
-        carbohydrates=100,
+        weight=0,
+        calories=0,
+        proteins=0,
+        fats=0,
+        carbohydrates=0,
         user_id=test_user.id,
     )
     test_db.add(meal)
@@ -504,6 +546,45 @@ async def test_update_meal(test_db: AsyncSession, test_cache):
     assert updated_meal.carbohydrates == 5.0
     assert updated_meal.user_id == test_user.id
 
+@pytest.mark.asyncio
+async def test_update_meal_applies_product_diff_in_one_transaction(test_db: AsyncSession, test_cache):
+    test_user = User(login="testuser16", email="test16@example.com", hashed_password="testpassword")
+    products = [Product(name=f"Item {i}", weight=100, calories=100 * (i + 1), proteins=10, fats=1, carbohydrates=5,
+                        is_public=True) for i in range(4)]
+    test_db.add_all([test_user, *products])
+    await test_db.commit()
+    for product in products:
+        await test_db.refresh(product)
+    keep, change, remove, new = products
+
+    meal = await add_meal(test_db, MealCreate(
+        name="Dinner", weight=0, calories=0, proteins=0, fats=0, carbohydrates=0,
+        products=[MealProductsCreate(product_id=product.id, product_weight=100) for product in (keep, change, remove)]
+    ), test_user.id)
+    assert meal.calories == 100 + 200 + 300
+
+    meal_update = MealUpdate(name="Late dinner", weight=0, calories=0, proteins=0, fats=0, carbohydrates=0, products=[
+        MealProductsUpdate(product_id=keep.id, product_weight=100),
+        MealProductsUpdate(product_id=change.id, product_weight=50),
+        MealProductsUpdate(product_id=new.id, product_weight=200),
+    ])
+    with patch.object(test_db, "commit", wraps=test_db.commit) as commit:
+        updated_meal = await update_meal(test_db, meal_update, meal.id, test_user.id)
+
+    commit.assert_awaited_once()
+    assert updated_meal.name == "Late dinner"
+    assert sorted((product.id, product.weight) for product in updated_meal.products) == \
+        sorted([(keep.id, 100), (change.id, 50), (new.id, 200)])
+    assert updated_meal.weight == 350
+    assert updated_meal.calories == 100 + 100 + 800
+    assert updated_meal.proteins == 35
+
+    recalculated = await recalculate_meal_nutrients(test_db, await test_db.get(Meal, (meal.id, meal.recorded_at)))
+    assert recalculated.calories == updated_meal.calories
+    daily = await test_db.get(DailyNutrition, (test_user.id, meal.recorded_at))
+    await test_db.refresh(daily)
+    assert daily.calories == 1000 and daily.meal_count == 1
+
 @pytest.mark.asyncio
 async def test_delete_meal(test_db: AsyncSession, test_cache):
     test_user = User(
@@ -530,3 +611,228 @@ async def test_delete_meal(test_db: AsyncSession, test_cache):
 
     result = await delete_meal(test_db, meal.id, test_user.id)
     assert result["message"] == "Meal and its products deleted successfully"
+
+@pytest.mark.asyncio
+async def test_get_meals_range_aggregates_days_and_weeks(test_db: AsyncSession, test_cache):
+    test_user = User(login="testuser17", email="test17@example.com", hashed_password="testpassword")
+    test_db.add(test_user)
+    await test_db.commit()
+
+    # 2024-01-01 - понедельник
+    monday = date(2024, 1, 1)
+    test_db.add_all([
+        DailyNutrition(user_id=test_user.id, recorded_at=monday, calories=1000, proteins=50, fats=30,
+                       carbohydrates=100, meal_count=2),
+        DailyNutrition(user_id=test_user.id, recorded_at=monday + timedelta(days=2), calories=500, proteins=20, fats=10,
+                       carbohydrates=60, meal_count=1),
+        DailyNutrition(user_id=test_user.id, recorded_at=monday + timedelta(days=8), calories=700, proteins=30, fats=20,
+                       carbohydrates=80, meal_count=1),
+        Meal(name="breakfast", weight=100, calories=500, proteins=25, fats=15, carbohydrates=50,
+             user_id=test_user.id, recorded_at=monday),
+    ])
+    await test_db.commit()
+
+    days = await get_meals_range(test_db, test_user.id, monday, monday + timedelta(days=2))
+    assert [period.start_date for period in days.periods] == [monday + timedelta(days=i) for i in range(3)]
+    assert [period.calories for period in days.periods] == [1000, 0, 500]
+    assert days.periods[0].meals is None
+
+    weeks = await get_meals_range(test_db, test_user.id, monday + timedelta(days=1), monday + timedelta(days=9),
+                                  granularity="week", include_meals=True)
+    assert [(period.start_date, period.end_date) for period in weeks.periods] == [
+        (monday + timedelta(days=1), monday + timedelta(days=6)),
+        (monday + timedelta(days=7), monday + timedelta(days=9)),
+    ]
+    assert weeks.periods[0].calories == 500 and weeks.periods[0].days_logged == 1
+    assert weeks.periods[1].calories == 700 and weeks.periods[1].meal_count == 1
+    assert weeks.periods[0].meals == [] and weeks.periods[1].meals == []
+
+    cached = await cache.get_field(f"user_meals_range:{test_user.id}", f"{monday}:{monday + timedelta(days=2)}:day:0")
+    assert cached["periods"][2]["calories"] == 500
+
+    full_week = await get_meals_range(test_db, test_user.id, monday, monday + timedelta(days=6), granularity="week",
+                                      include_meals=True)
+    assert [meal.name for meal in full_week.periods[0].meals] == ["breakfast"]
+
+@pytest.mark.asyncio
+async def test_get_meals_range_is_invalidated_by_meal_writes(test_db: AsyncSession, test_cache):
+    test_user = User(login="testuser18", email="test18@example.com", hashed_password="testpassword")
+    test_db.add(test_user)
+    await test_db.commit()
+    today = date.today()
+
+    before = await get_meals_range(test_db, test_user.id, today, today)
+    assert before.periods[0].meal_count == 0
+
+    await add_meal(test_db, MealCreate(name="Snack", weight=0, calories=0, proteins=0, fats=0, carbohydrates=0),
+                   test_user.id)
+
+    after = await get_meals_range(test_db, test_user.id, today, today)
+    assert after.periods[0].meal_count == 1
+
+@pytest.mark.asyncio
+async def test_get_meals_range_rejects_invalid_ranges(test_db: AsyncSession, test_cache):
+    with pytest.raises(HTTPException) as exc_info:
+        await get_meals_range(test_db, 1, date(2024, 1, 2), date(2024, 1, 1))
+    assert exc_info.value.status_code == 400
+
+    with pytest.raises(HTTPException):
+        await get_meals_range(test_db, 1, date(2020, 1, 1), date(2024, 1, 1))
+
+@pytest.mark.asyncio
+async def test_add_meals_bulk_inserts_meals_and_rollup_in_batch(test_db: AsyncSession, test_cache):
+    test_user = User(login="testuser19", email="test19@example.com", hashed_password="testpassword")
+    test_db.add(test_user)
+    await test_db.commit()
+    product1 = Product(name="Rice", weight=100, calories=130, proteins=2.7, fats=0.3, carbohydrates=28, is_public=True)
+    product2 = Product(name="Egg", weight=100, calories=155, proteins=13, fats=11, carbohydrates=1.1, is_public=True)
+    test_db.add_all([product1, product2])
+    await test_db.commit()
+
+    yesterday = date.today() - timedelta(days=1)
+    meals = [
+        MealBulkItem(name="Lunch", weight=0, calories=0, proteins=0, fats=0, carbohydrates=0, recorded_at=yesterday,
+                     products=[MealProductsCreate(product_id=product1.id, product_weight=200),
+                               MealProductsCreate(product_id=product2.id, product_weight=50)]),
+        MealBulkItem(name="Dinner", weight=0, calories=0, proteins=0, fats=0, carbohydrates=0, recorded_at=yesterday,
+                     products=[MealProductsCreate(product_id=product2.id, product_weight=100)]),
+        MealBulkItem(name="Snack", weight=0, calories=0, proteins=0, fats=0, carbohydrates=0),
+    ]
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(test_db.bind.sync_engine, "before_cursor_execute", listener)
+    try:
+        created = await add_meals_bulk(test_db, meals, test_user.id)
+    finally:
+        event.remove(test_db.bind.sync_engine, "before_cursor_execute", listener)
+
+    assert sum(statement.lstrip().upper().startswith("SELECT") for statement in statements) == 1
+    assert [meal.name for meal in created] == ["Lunch", "Dinner", "Snack"]
+    assert created[0].calories == 337.5 and created[0].weight == 250
+    assert [product.calories for product in created[0].products] == [260, 77.5]
+    assert created[2].recorded_at == date.today() and created[2].products == []
+
+    result = await test_db.execute(
+        DailyNutrition.__table__.select().where(DailyNutrition.user_id == test_user.id)
+        .order_by(DailyNutrition.recorded_at)
+    )
+    rollup = result.all()
+    assert [(row.recorded_at, row.calories, row.meal_count) for row in rollup] == [
+        (yesterday, 492.5, 2), (date.today(), 0, 1)
+    ]
+
+@pytest.mark.asyncio
+async def test_add_meals_bulk_rejects_invalid_requests(test_db: AsyncSession, test_cache):
+    test_user = User(login="testuser20", email="test20@example.com", hashed_password="testpassword")
+    test_db.add(test_user)
+    await test_db.commit()
+
+    missing = MealBulkItem(name="Lunch", weight=0, calories=0, proteins=0, fats=0, carbohydrates=0,
+                           products=[MealProductsCreate(product_id=999999, product_weight=100)])
+    with pytest.raises(HTTPException) as exc_info:
+        await add_meals_bulk(test_db, [missing], test_user.id)
+    assert exc_info.value.status_code == 404
+
+    duplicate = MealBulkItem(name="Lunch", weight=0, calories=0, proteins=0, fats=0, carbohydrates=0,
+                             products=[MealProductsCreate(product_id=1, product_weight=100)] * 2)
+    with pytest.raises(HTTPException) as exc_info:
+        await add_meals_bulk(test_db, [duplicate], test_user.id)
+    assert exc_info.value.status_code == 400
+
+    with patch("src.services.meal_service.MEAL_BULK_MAX_ITEMS", 1), pytest.raises(HTTPException) as exc_info:
+        await add_meals_bulk(test_db, [missing, missing], test_user.id)
+    assert exc_info.value.status_code == 400
+
+    assert (await get_user_meals(test_db, test_user.id)) == []
+
+@pytest.mark.asyncio
+async def test_relog_and_delete_meals_bulk(test_db: AsyncSession, test_cache):
+    test_user = User(login="testuser21", email="test21@example.com", hashed_password="testpassword")
+    test_db.add(test_user)
+    await test_db.commit()
+    product = Product(name="Oats", weight=100, calories=380, proteins=13, fats=7, carbohydrates=60, is_public=True)
+    test_db.add(product)
+    await test_db.commit()
+
+    yesterday = date.today() - timedelta(days=1)
+    source = await add_meals_bulk(test_db, [
+        MealBulkItem(name="Breakfast", weight=0, calories=0, proteins=0, fats=0, carbohydrates=0,
+                     recorded_at=yesterday, products=[MealProductsCreate(product_id=product.id, product_weight=50)]),
+    ], test_user.id)
+
+    relogged = await relog_meals(test_db, [source[0].id], test_user.id)
+    assert relogged[0].id != source[0].id
+    assert relogged[0].recorded_at == date.today()
+    assert relogged[0].calories == source[0].calories == 190
+    assert [product.weight for product in relogged[0].products] == [50]
+
+    with pytest.raises(HTTPException) as exc_info:
+        await delete_meals_bulk(test_db, [source[0].id, 999999], test_user.id)
+    assert exc_info.value.status_code == 404
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(test_db.bind.sync_engine, "before_cursor_execute", listener)
+    try:
+        await delete_meals_bulk(test_db, [source[0].id, relogged[0].id], test_user.id)
+    finally:
+        event.remove(test_db.bind.sync_engine, "before_cursor_execute", listener)
+    # Ключ секционирования в условии позволяет Postgres не просматривать все секции
+    deletes = [statement for statement in statements if statement.lstrip().startswith("DELETE FROM meal")]
+    assert len(deletes) == 2 and all("recorded_at" in statement for statement in deletes)
+    assert (await get_user_meals(test_db, test_user.id)) == []
+    result = await test_db.execute(DailyNutrition.__table__.select().where(DailyNutrition.user_id == test_user.id))
+    assert result.all() == []
+
+@pytest.mark.asyncio
+async def test_copy_meal_and_day_clone_rows_with_stored_totals(test_db: AsyncSession, test_cache):
+    test_user = User(login="testuser22", email="test22@example.com", hashed_password="testpassword")
+    test_db.add(test_user)
+    await test_db.commit()
+    product = Product(name="Bread", weight=100, calories=250, proteins=9, fats=3, carbohydrates=49, is_public=True)
+    test_db.add(product)
+    await test_db.commit()
+
+    source_date = date(2024, 3, 4)
+    target_date = date(2024, 3, 5)
+    source = await add_meals_bulk(test_db, [
+        MealBulkItem(name=name, weight=0, calories=0, proteins=0, fats=0, carbohydrates=0, recorded_at=source_date,
+                     products=[MealProductsCreate(product_id=product.id, product_weight=weight)])
+        for name, weight in (("Breakfast", 40), ("Dinner", 80))
+    ], test_user.id)
+    # Сохранённые итоги копируются как есть, даже если продукт с тех пор изменился
+    product.calories = 1000
+    await test_db.commit()
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(test_db.bind.sync_engine, "before_cursor_execute", listener)
+    try:
+        copied = await copy_day(test_db, source_date, test_user.id, target_date)
+    finally:
+        event.remove(test_db.bind.sync_engine, "before_cursor_execute", listener)
+
+    assert sum(statement.lstrip().startswith("INSERT INTO meal ") for statement in statements) == 1
+    assert sum(statement.lstrip().startswith("INSERT INTO meal_products") for statement in statements) == 1
+    assert [(meal.name, meal.calories, meal.recorded_at) for meal in copied] == [
+        ("Breakfast", 100, target_date), ("Dinner", 200, target_date)
+    ]
+    assert {meal.id for meal in copied}.isdisjoint(meal.id for meal in source)
+    assert [[product.weight for product in meal.products] for meal in copied] == [[40], [80]]
+
+    single = await copy_meal(test_db, source[1].id, test_user.id, target_date)
+    assert single.calories == 200 and single.recorded_at == target_date
+
+    result = await test_db.execute(
+        DailyNutrition.__table__.select()
+        .where(DailyNutrition.user_id == test_user.id, DailyNutrition.recorded_at == target_date)
+    )
+    rollup = result.one()
+    assert rollup.calories == 500 and rollup.meal_count == 3
+
+    with pytest.raises(HTTPException) as exc_info:
+        await copy_meal(test_db, 999999, test_user.id, target_date)
+    assert exc_info.value.status_code == 404
+    assert await copy_day(test_db, date(2024, 1, 1), test_user.id, target_date) == []
+
@@ -0,0 +1,149 @@
+from datetime import date
+from unittest.mock import patch
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event, select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.cache.cache import cache
+from src.cache.local_cache import LocalCache
+from src.models.daily_nutrition import DailyNutrition
+from src.models.meal import Meal
+from src.models.meal_products import MealProducts
+from src.models.meal_template import MealTemplate, MealTemplateProduct
+from src.models.product import Product
+from src.models.user import User
+from src.schemas.meal_products import MealProductsCreate
+from src.schemas.meal_template import MealTemplateCreate
+from src.services.meal_service import get_meal_by_id
+from src.services.user_service import delete_user
+from src.services.meal_template_service import create_meal_template, get_meal_templates, log_meal_template, \
+    delete_meal_template, local_templates
+
+@pytest.fixture(autouse=True)
+def clean_local_templates():
+    local_templates.clear()
+    yield
+    local_templates.clear()
+
+async def create_user_with_products(test_db: AsyncSession, login: str):
+    test_user = User(login=login, email=f"{login}@example.com", hashed_password="testpassword")
+    product1 = Product(name="Yogurt", weight=100, calories=60, proteins=5, fats=1.5, carbohydrates=7, is_public=True)
+    product2 = Product(name="Granola", weight=100, calories=450, proteins=10, fats=15, carbohydrates=65,
+                       is_public=True)
+    test_db.add_all([test_user, product1, product2])
+    await test_db.commit()
+    return test_user, product1, product2
+
+@pytest.mark.asyncio
+async def test_create_meal_template_stores_snapshot(test_db: AsyncSession, test_cache):
+    test_user, product1, product2 = await create_user_with_products(test_db, "templateuser1")
+
+    template = await create_meal_template(test_db, MealTemplateCreate(name="Breakfast", products=[
+        MealProductsCreate(product_id=product1.id, product_weight=200),
+        MealProductsCreate(product_id=product2.id, product_weight=50),
+    ]), test_user.id)
+    assert template.weight == 250 and template.calories == 345
+    assert [(product.name, product.calories) for product in template.products] == [("Yogurt", 120), ("Granola", 225)]
+
+    templates = await get_meal_templates(test_db, test_user.id)
+    assert templates == [template]
+    cached = await cache.get(f"meal_templates:{test_user.id}")
+    assert cached[0]["calories"] == 345 and len(cached[0]["products"]) == 2
+
+    with pytest.raises(HTTPException) as exc_info:
+        await create_meal_template(test_db, MealTemplateCreate(name="Missing", products=[
+            MealProductsCreate(product_id=999999, product_weight=100)
+        ]), test_user.id)
+    assert exc_info.value.status_code == 404
+
+    with patch("src.services.meal_template_service.MEAL_TEMPLATES_MAX_COUNT", 1), \
+            pytest.raises(HTTPException) as exc_info:
+        await create_meal_template(test_db, MealTemplateCreate(name="Extra", products=[]), test_user.id)
+    assert exc_info.value.status_code == 400
+
+@pytest.mark.asyncio
+async def test_log_meal_template_is_a_single_write(test_db: AsyncSession, test_cache):
+    test_user, product1, product2 = await create_user_with_products(test_db, "templateuser2")
+    template = await create_meal_template(test_db, MealTemplateCreate(name="Breakfast", products=[
+        MealProductsCreate(product_id=product1.id, product_weight=200),
+        MealProductsCreate(product_id=product2.id, product_weight=50),
+    ]), test_user.id)
+    await get_meal_templates(test_db, test_user.id)
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(test_db.bind.sync_engine, "before_cursor_execute", listener)
+    try:
+        meal = await log_meal_template(test_db, template.id, test_user.id, date(2024, 5, 6))
+    finally:
+        event.remove(test_db.bind.sync_engine, "before_cursor_execute", listener)
+
+    assert not any(statement.lstrip().upper().startswith("SELECT") for statement in statements)
+    assert meal.calories == 345 and meal.recorded_at == date(2024, 5, 6)
+    assert [product.weight for product in meal.products] == [200, 50]
+
+    stored = await get_meal_by_id(test_db, meal.id, test_user.id)
+    assert stored.calories == 345 and stored.weight == 250
+    result = await test_db.execute(select(MealProducts.product_id).where(MealProducts.meal_id == meal.id))
+    assert sorted(result.scalars().all()) == sorted([product1.id, product2.id])
+    rollup = await test_db.get(DailyNutrition, (test_user.id, date(2024, 5, 6)))
+    assert rollup.calories == 345 and rollup.meal_count == 1
+
+@pytest.mark.asyncio
+async def test_delete_meal_template_invalidates_caches(test_db: AsyncSession, test_cache):
+    test_user, product1, _ = await create_user_with_products(test_db, "templateuser3")
+    template = await create_meal_template(test_db, MealTemplateCreate(name="Snack", products=[
+        MealProductsCreate(product_id=product1.id, product_weight=100),
+    ]), test_user.id)
+    assert len(await get_meal_templates(test_db, test_user.id)) == 1
+
+    await delete_meal_template(test_db, template.id, test_user.id)
+    assert await get_meal_templates(test_db, test_user.id) == []
+
+    with pytest.raises(HTTPException) as exc_info:
+        await log_meal_template(test_db, template.id, test_user.id)
+    assert exc_info.value.status_code == 404
+    with pytest.raises(HTTPException):
+        await delete_meal_template(test_db, template.id, test_user.id)
+
+@pytest.mark.asyncio
+async def test_log_meal_template_rejects_template_deleted_by_another_process(test_db: AsyncSession, test_cache):
+    test_user, product1, _ = await create_user_with_products(test_db, "templateuser5")
+    template = await create_meal_template(test_db, MealTemplateCreate(name="Snack", products=[
+        MealProductsCreate(product_id=product1.id, product_weight=100),
+    ]), test_user.id)
+    assert len(await get_meal_templates(test_db, test_user.id)) == 1
+
+    # Другой процесс удалил шаблон: в памяти этого процесса осталась устаревшая копия
+    await test_db.execute(delete(MealTemplate).where(MealTemplate.id == template.id))
+    await test_db.commit()
+
+    with pytest.raises(HTTPException) as exc_info:
+        await log_meal_template(test_db, template.id, test_user.id)
+    assert exc_info.value.status_code == 404
+    assert (await test_db.execute(select(Meal))).scalars().all() == []
+    assert await get_meal_templates(test_db, test_user.id) == []
+
+@pytest.mark.asyncio
+async def test_delete_user_removes_meal_templates(test_db: AsyncSession, test_cache):
+    test_user, product1, _ = await create_user_with_products(test_db, "templateuser4")
+    await create_meal_template(test_db, MealTemplateCreate(name="Snack", products=[
+        MealProductsCreate(product_id=product1.id, product_weight=100),
+    ]), test_user.id)
+    await test_db.refresh(test_user)
+
+    await delete_user(test_db, test_user)
+
+    assert (await test_db.execute(select(MealTemplate))).scalars().all() == []
+    assert (await test_db.execute(select(MealTemplateProduct))).scalars().all() == []
+
+def test_local_cache_expires_and_evicts():
+    local_cache = LocalCache(ttl_seconds=10, max_size=2)
+    with patch("src.cache.local_cache.time.monotonic", return_value=100):
+        local_cache.set("a", 1)
+        local_cache.set("b", 2)
+        assert local_cache.get("a") == 1
+        local_cache.set("c", 3)
+        assert local_cache.get("b") is None
+    with patch("src.cache.local_cache.time.monotonic", return_value=111):
+        assert local_cache.get("a") is None and local_cache.get("c") is None
@@ -0,0 +1,39 @@
+from datetime import date
+from types import SimpleNamespace
+import numpy as np
+from src.services.nutrient_engine import NutrientMatrix, compute_batch, group_totals
+
+def product(id, calories, proteins, fats, carbohydrates):
+    return SimpleNamespace(id=id, calories=calories, proteins=proteins, fats=fats, carbohydrates=carbohydrates)
+
+APPLE = product(1, 52, 0.3, 0.2, 14)
+CHICKEN = product(2, 165, 31, 3.6, 0)
+
+def test_line_items_scale_per_100_grams():
+    matrix = NutrientMatrix([APPLE, CHICKEN, APPLE])
+
+    items = matrix.line_items([2, 1], [200, 150])
+
+    assert matrix.values.shape == (2, 4)
+    np.testing.assert_allclose(items, [[330, 62, 7.2, 0], [78, 0.45, 0.3, 21]])
+
+def test_compute_batch_totals_per_meal():
+    matrix = NutrientMatrix([APPLE, CHICKEN])
+
+    items, totals = compute_batch(matrix, [1, 2, 1], [150, 200, 100], [10, 10, 11])
+
+    assert items.shape == (3, 4)
+    assert totals[10] == {"weight": 350, "calories": 408, "proteins": 62.45, "fats": 7.5, "carbohydrates": 21}
+    assert totals[11]["calories"] == 52 and totals[11]["weight"] == 100
+
+def test_compute_batch_handles_empty_input():
+    items, totals = compute_batch(NutrientMatrix([]), [], [], [])
+
+    assert items.shape == (0, 4)
+    assert totals == {}
+
+def test_group_totals_by_day():
+    days, totals = group_totals([[1, 2], [3, 4], [5, 6]], [date(2024, 1, 2), date(2024, 1, 1), date(2024, 1, 2)])
+
+    assert days.tolist() == [date(2024, 1, 1), date(2024, 1, 2)]
+    assert totals.tolist() == [[3, 4], [6, 8]]
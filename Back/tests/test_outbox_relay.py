@@ -0,0 +1,60 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from aio_pika import DeliveryMode
+from src.models.outbox import OutboxEvent
+from src.rabbitmq.outbox_relay import relay_batch
+
+def make_session():
+    session = AsyncMock()
+    session_maker = MagicMock()
+    session_maker.return_value.__aenter__.return_value = session
+    return session_maker, session
+
+@pytest.mark.asyncio
+async def test_relay_batch_publishes_and_deletes_events():
+    events = [
+        OutboxEvent(id=1, event_type="user_registered", queue_name="registration_queue",
+                    payload={"email": "a@example.com", "login": "a"}),
+        OutboxEvent(id=2, event_type="user_registered", queue_name="registration_queue",
+                    payload={"email": "b@example.com", "login": "b"}),
+    ]
+    session_maker, session = make_session()
+    mock_client = MagicMock()
+    mock_client.publish_many = AsyncMock()
+    mock_delete = AsyncMock()
+
+    with patch("src.rabbitmq.outbox_relay.async_session_maker", session_maker), \
+            patch("src.rabbitmq.outbox_relay.rabbitmq_client", mock_client), \
+            patch("src.rabbitmq.outbox_relay.lock_outbox_batch", AsyncMock(return_value=events)), \
+            patch("src.rabbitmq.outbox_relay.delete_outbox_events", mock_delete):
+        relayed = await relay_batch(10)
+
+    assert relayed == 2
+    published = list(mock_client.publish_many.call_args.args[0])
+    assert [routing_key for routing_key, _ in published] == ["registration_queue"] * 2
+    message = published[0][1]
+    assert json.loads(message.body) == {"email": "a@example.com", "login": "a"}
+    assert message.type == "user_registered"
+    assert message.message_id == "1"
+    assert message.delivery_mode == DeliveryMode.PERSISTENT
+    mock_delete.assert_called_once_with(session, [1, 2])
+    session.commit.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_relay_batch_keeps_events_when_publish_fails():
+    events = [OutboxEvent(id=1, event_type="user_registered", queue_name="registration_queue", payload={})]
+    session_maker, session = make_session()
+    mock_client = MagicMock()
+    mock_client.publish_many = AsyncMock(side_effect=ConnectionError("broker is down"))
+    mock_delete = AsyncMock()
+
+    with patch("src.rabbitmq.outbox_relay.async_session_maker", session_maker), \
+            patch("src.rabbitmq.outbox_relay.rabbitmq_client", mock_client), \
+            patch("src.rabbitmq.outbox_relay.lock_outbox_batch", AsyncMock(return_value=events)), \
+            patch("src.rabbitmq.outbox_relay.delete_outbox_events", mock_delete):
+        with pytest.raises(ConnectionError):
+            await relay_batch(10)
+
+    mock_delete.assert_not_called()
+    session.commit.assert_not_called()
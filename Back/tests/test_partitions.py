@@ -0,0 +1,102 @@
+from datetime import date
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.database.database import Base
+from src.database.partitions import add_months, partition_name, create_partitions, drop_expired_partitions, \
+    list_partitions, convert_to_partitioned, is_partitioned
+from src.models.meal import Meal
+from src.models.product import Product
+from src.models.user import User
+from src.models.user_weight import UserWeight
+
+def test_month_arithmetic():
+    assert add_months(date(2024, 11, 1), 1) == date(2024, 12, 1)
+    assert add_months(date(2024, 12, 1), 1) == date(2025, 1, 1)
+    assert add_months(date(2024, 1, 1), -1) == date(2023, 12, 1)
+    assert partition_name("meal", date(2024, 3, 1)) == "meal_2024_03"
+
+@pytest.mark.asyncio
+async def test_create_partitions_ahead_and_drop_expired(test_db: AsyncSession):
+    created = await create_partitions(test_db, today=date(2023, 1, 20), months_ahead=2)
+
+    assert {"meal_2023_01", "meal_products_2023_03", "user_weight_2023_02"} <= set(created)
+    assert [name for name, _ in await list_partitions(test_db, "user_weight")][:3] == \
+           ["user_weight_2023_01", "user_weight_2023_02", "user_weight_2023_03"]
+
+    test_db.add(User(id=1, login="partition", email="partition@example.com", hashed_password="pwd"))
+    await test_db.commit()
+    test_db.add_all([UserWeight(user_id=1, weight=80, recorded_at=date(2023, 1, 25)),
+                     UserWeight(user_id=1, weight=79, recorded_at=date(2023, 2, 25))])
+    await test_db.commit()
+    located = await test_db.execute(text("SELECT tableoid::regclass::text FROM user_weight ORDER BY recorded_at"))
+    assert located.scalars().all() == ["user_weight_2023_01", "user_weight_2023_02"]
+
+    dropped = await drop_expired_partitions(test_db, "user_weight", 30, today=date(2023, 3, 15))
+
+    assert dropped == ["user_weight_2023_01"]
+    remaining = await test_db.execute(select(UserWeight.recorded_at))
+    assert remaining.scalars().all() == [date(2023, 2, 25)]
+
+@pytest.mark.asyncio
+async def test_create_partitions_skips_months_already_in_default(test_db: AsyncSession):
+    test_db.add(User(id=1, login="partition", email="partition@example.com", hashed_password="pwd"))
+    await test_db.commit()
+    test_db.add(UserWeight(user_id=1, weight=80, recorded_at=date(2022, 6, 10)))
+    await test_db.commit()
+
+    created = await create_partitions(test_db, today=date(2022, 6, 1), months_ahead=0)
+
+    assert "user_weight_2022_06" not in created
+    assert "meal_2022_06" in created
+
+@pytest.mark.asyncio
+async def test_convert_to_partitioned_migrates_legacy_tables(test_db: AsyncSession):
+    test_db.add_all([User(id=1, login="partition", email="partition@example.com", hashed_password="pwd"),
+                     Product(id=1, name="Bread", weight=100, calories=250, proteins=9, fats=3, carbohydrates=49,
+                             is_public=True)])
+    await test_db.commit()
+    # Таблицы прежней схемы: без секционирования и без meal_products.recorded_at
+    await test_db.execute(text("DROP TABLE meal_products, meal, user_weight"))
+    await test_db.execute(text(
+        "CREATE TABLE meal (id SERIAL PRIMARY KEY, name VARCHAR NOT NULL, weight FLOAT NOT NULL, "
+        "calories FLOAT NOT NULL, proteins FLOAT NOT NULL, fats FLOAT NOT NULL, carbohydrates FLOAT NOT NULL, "
+        "user_id INTEGER REFERENCES \"user\" (id), recorded_at DATE NOT NULL)"
+    ))
+    await test_db.execute(text("CREATE INDEX ix_meal_id ON meal (id)"))
+    await test_db.execute(text(
+        "CREATE TABLE meal_products (product_weight FLOAT NOT NULL, meal_id INTEGER REFERENCES meal (id), "
+        "product_id INTEGER REFERENCES product (id), PRIMARY KEY (meal_id, product_id))"
+    ))
+    await test_db.execute(text(
+        "CREATE TABLE user_weight (id SERIAL PRIMARY KEY, user_id INTEGER REFERENCES \"user\" (id), "
+        "weight FLOAT NOT NULL, recorded_at DATE NOT NULL)"
+    ))
+    await test_db.execute(text(
+        "INSERT INTO meal (name, weight, calories, proteins, fats, carbohydrates, user_id, recorded_at) VALUES "
+        "('Lunch', 100, 250, 9, 3, 49, 1, '2021-05-10'), ('Dinner', 50, 125, 4.5, 1.5, 24.5, 1, '2021-06-02')"
+    ))
+    await test_db.execute(text("INSERT INTO meal_products VALUES (100, 1, 1), (50, 2, 1)"))
+    await test_db.execute(text("INSERT INTO user_weight (user_id, weight, recorded_at) VALUES (1, 80, '2021-05-10')"))
+    await test_db.commit()
+
+    converted = await convert_to_partitioned(test_db, Base.metadata)
+
+    assert converted == ["meal", "meal_products", "user_weight"]
+    assert all([await is_partitioned(test_db, table_name) for table_name in converted])
+    located = await test_db.execute(text(
+        "SELECT tableoid::regclass::text, meal_id, recorded_at FROM meal_products ORDER BY meal_id"
+    ))
+    assert [tuple(row) for row in located.all()] == [
+        ("meal_products_2021_05", 1, date(2021, 5, 10)), ("meal_products_2021_06", 2, date(2021, 6, 2))
+    ]
+    assert (await test_db.execute(select(UserWeight.weight))).scalars().all() == [80]
+
+    # Новые строки продолжают последовательность id прежней таблицы
+    test_db.add(Meal(name="Snack", weight=0, calories=0, proteins=0, fats=0, carbohydrates=0, user_id=1,
+                     recorded_at=date(2021, 6, 3)))
+    await test_db.commit()
+    assert (await test_db.execute(select(Meal.id).order_by(Meal.id))).scalars().all() == [1, 2, 3]
+
+    assert await convert_to_partitioned(test_db, Base.metadata) == []
+
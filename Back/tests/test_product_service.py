@@ -1,5 +1,7 @@
 import pytest
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from src.models.daily_nutrition import DailyNutrition
 from src.models.meal import Meal
 from src.models.product import Product
 from src.models.user import User
@@ -182,6 +184,9 @@ async def test_add_product_to_meal(test_db: AsyncSession, test_cache):
     await test_db.commit()
     await test_db.refresh(meal)
     await test_db.refresh(product)
+    test_db.add(DailyNutrition(user_id=test_user.id, recorded_at=meal.recorded_at, meal_count=1,
+                               calories=0, proteins=0, fats=0, carbohydrates=0))
+    await test_db.commit()
 
     product_add = ProductAdd(name="Chicken", weight=50)
     updated_meal = await add_product_to_meal(test_db, meal.id, product_add, test_user.id)
@@ -189,6 +194,13 @@ async def test_add_product_to_meal(test_db: AsyncSession, test_cache):
     assert updated_meal.weight == 50
     assert updated_meal.calories == 82.5
 
+    # Суточная сводка меняется вместе с итогами приёма пищи
+    result = await test_db.execute(select(DailyNutrition).where(DailyNutrition.user_id == test_user.id))
+    daily = result.scalar_one()
+    assert daily.meal_count == 1
+    assert daily.calories == 82.5
+    assert daily.proteins == 15.5
+
 @pytest.mark.asyncio
 async def test_get_personal_products(test_db: AsyncSession, test_cache):
     test_user = User(
@@ -0,0 +1,47 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import MagicMock
+from aio_pika import DeliveryMode
+from src.rabbitmq.client import RabbitMQClient, build_message
+
+def test_build_message_is_persistent_json():
+    message = build_message({"email": "test@example.com"}, "user_registered", "42")
+
+    assert json.loads(message.body) == {"email": "test@example.com"}
+    assert message.delivery_mode == DeliveryMode.PERSISTENT
+    assert message.type == "user_registered"
+    assert message.message_id == "42"
+
+@pytest.mark.asyncio
+async def test_publish_many_bounds_unconfirmed_messages():
+    in_flight = 0
+    max_in_flight = 0
+    published = []
+
+    async def publish(message, routing_key):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)  # Ожидание подтверждения брокера
+        in_flight -= 1
+        published.append(routing_key)
+
+    channel = MagicMock()
+    channel.default_exchange.publish = publish
+    acquire = MagicMock()
+    acquire.return_value.__aenter__.return_value = channel
+
+    client = RabbitMQClient(channel_pool_size=1, max_in_flight=3)
+    client.channel_pool = MagicMock(acquire=acquire)
+
+    await client.publish_many((f"queue_{i}", build_message({"i": i})) for i in range(10))
+
+    assert sorted(published) == sorted(f"queue_{i}" for i in range(10))
+    assert max_in_flight == 3
+    acquire.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_publish_many_requires_connection():
+    with pytest.raises(RuntimeError):
+        await RabbitMQClient().publish_many([("queue", build_message({}))])
@@ -0,0 +1,116 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from src.core.rate_limiter import RateLimiter, RateLimitMiddleware, classify_route, RATE_LIMITS
+from src.core.security import create_access_token
+
+def make_client():
+    test_app = FastAPI()
+    test_app.add_middleware(RateLimitMiddleware, limiter=RateLimiter(), enabled=True)
+
+    @test_app.post("/auth/login")
+    async def login(request: Request):
+        form = await request.form()
+        return {"ok": True, "username": form.get("username")}
+
+    @test_app.get("/product/search")
+    async def search():
+        return {"ok": True}
+
+    return TestClient(test_app)
+
+def test_classify_route():
+    assert classify_route("POST", "/auth/login") == "login"
+    assert classify_route("GET", "/product/search") == "search"
+    assert classify_route("GET", "/product/product-picture/5") == "picture"
+    assert classify_route("GET", "/meal/all_meals") == "list"
+    assert classify_route("PUT", "/meal/5") == "default"
+
+def test_login_is_throttled_with_retry_after():
+    mock_cache = MagicMock()
+    mock_cache.pool = None  # Redis недоступен - работает локальный лимитер
+
+    with patch("src.core.rate_limiter.cache", mock_cache):
+        client = make_client()
+        capacity = RATE_LIMITS["login"]["ip"][0]
+        statuses = [client.post("/auth/login").status_code for _ in range(capacity)]
+        response = client.post("/auth/login")
+
+    assert statuses == [200] * capacity
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+def test_user_bucket_is_shared_across_ips():
+    mock_cache = MagicMock()
+    mock_cache.pool = None
+    token = create_access_token({"sub": "testuser", "uid": 7, "ver": 1})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    with patch("src.core.rate_limiter.cache", mock_cache), \
+            patch("src.core.rate_limiter.RATE_LIMIT_TRUST_PROXY", True):
+        client = make_client()
+        capacity = RATE_LIMITS["search"]["user"][0]
+        statuses = [
+            client.get("/product/search", headers={**headers, "X-Forwarded-For": f"10.0.0.{i}"}).status_code
+            for i in range(capacity)
+        ]
+        limited = client.get("/product/search", headers={**headers, "X-Forwarded-For": "10.0.1.1"})
+        anonymous = client.get("/product/search", headers={"X-Forwarded-For": "10.0.1.2"})
+
+    assert statuses == [200] * capacity
+    assert limited.status_code == 429
+    assert anonymous.status_code == 200
+
+def test_login_bucket_is_shared_across_ips():
+    mock_cache = MagicMock()
+    mock_cache.pool = None
+
+    with patch("src.core.rate_limiter.cache", mock_cache), \
+            patch("src.core.rate_limiter.RATE_LIMIT_TRUST_PROXY", True):
+        client = make_client()
+        capacity = RATE_LIMITS["login"]["user"][0]
+        responses = [
+            client.post("/auth/login", data={"username": "Victim", "password": f"guess-{i}"},
+                        headers={"X-Forwarded-For": f"10.0.0.{i}"})
+            for i in range(capacity)
+        ]
+        limited = client.post("/auth/login", data={"username": " victim ", "password": "guess"},
+                              headers={"X-Forwarded-For": "10.0.1.1"})
+        other_login = client.post("/auth/login", data={"username": "someone", "password": "guess"},
+                                  headers={"X-Forwarded-For": "10.0.1.2"})
+
+    assert [response.status_code for response in responses] == [200] * capacity
+    # Тело формы, прочитанное лимитером, доступно обработчику
+    assert responses[0].json()["username"] == "Victim"
+    assert limited.status_code == 429
+    assert other_login.status_code == 200
+
+@pytest.mark.asyncio
+async def test_hit_uses_redis_script_in_one_call():
+    script = AsyncMock(return_value=[0, 4])
+    mock_cache = MagicMock()
+    mock_cache.pool.register_script.return_value = script
+
+    with patch("src.core.rate_limiter.cache", mock_cache):
+        limiter = RateLimiter()
+        allowed, retry_after = await limiter.hit({"rate_limit:login:ip:1.2.3.4": (5, 0.25),
+                                                  "rate_limit:login:user:7": (3, 0.5)})
+
+    assert (allowed, retry_after) == (False, 4)
+    script.assert_called_once_with(keys=["rate_limit:login:ip:1.2.3.4", "rate_limit:login:user:7"],
+                                   args=[5, 0.25, 3, 0.5])
+    assert limiter.local_buckets == {}
+
+@pytest.mark.asyncio
+async def test_hit_falls_back_to_local_buckets_on_redis_error():
+    script = AsyncMock(side_effect=ConnectionError("redis is down"))
+    mock_cache = MagicMock()
+    mock_cache.pool.register_script.return_value = script
+
+    with patch("src.core.rate_limiter.cache", mock_cache):
+        limiter = RateLimiter()
+        results = [await limiter.hit({"rate_limit:login:ip:1.2.3.4": (2, 0.01)}) for _ in range(3)]
+
+    assert [allowed for allowed, _ in results] == [True, True, False]
+    assert results[-1][1] >= 1
@@ -0,0 +1,128 @@
+import asyncio
+import jwt
+import pytest
+from unittest.mock import AsyncMock, patch
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from src.core.bcrypt_calibration import calibrate_bcrypt_rounds
+from src.core.config import SECRET_AUTH, ALGORITHM
+from src.core.security import PasswordHasher, create_access_token, get_current_principal
+from src.schemas.user import CurrentPrincipal, UserRead
+
+@pytest.mark.asyncio
+async def test_password_hasher_hash_and_verify():
+    hasher = PasswordHasher(CryptContext(schemes=["bcrypt"], bcrypt__rounds=4), max_workers=2, queue_limit=2)
+
+    hashed = await hasher.hash("testpassword")
+
+    assert hashed.startswith("$2b$04$")
+    assert await hasher.verify("testpassword", hashed) is True
+    assert await hasher.verify("wrongpassword", hashed) is False
+    hasher.shutdown()
+
+@pytest.mark.asyncio
+async def test_password_hasher_rehashes_on_cost_change():
+    old_context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4)
+    hasher = PasswordHasher(CryptContext(schemes=["bcrypt"], bcrypt__rounds=5), max_workers=1, queue_limit=0)
+    old_hash = old_context.hash("testpassword")
+
+    verified, new_hash = await hasher.verify_and_update("testpassword", old_hash)
+
+    assert verified is True
+    assert new_hash.startswith("$2b$05$")
+
+    # Хэш с актуальной стоимостью не перехэшируется
+    verified, new_hash = await hasher.verify_and_update("testpassword", new_hash)
+    assert verified is True
+    assert new_hash is None
+    hasher.shutdown()
+
+@pytest.mark.asyncio
+async def test_password_hasher_fails_fast_when_saturated():
+    hasher = PasswordHasher(CryptContext(schemes=["bcrypt"], bcrypt__rounds=10), max_workers=1, queue_limit=1)
+
+    results = await asyncio.gather(*(hasher.hash("testpassword") for _ in range(4)), return_exceptions=True)
+
+    rejected = [r for r in results if isinstance(r, HTTPException)]
+    assert len(rejected) == 2
+    assert all(r.status_code == 503 and r.headers["Retry-After"] for r in rejected)
+    assert hasher.pending == 0
+    hasher.shutdown()
+
+def test_calibrate_bcrypt_rounds_respects_bounds():
+    rounds, timings = calibrate_bcrypt_rounds(target_ms=0, min_rounds=4, max_rounds=6, samples=1)
+    assert rounds == 4
+    assert list(timings) == [4]
+
+    rounds, timings = calibrate_bcrypt_rounds(target_ms=10_000, min_rounds=4, max_rounds=6, samples=1)
+    assert rounds == 6
+    assert list(timings) == [4, 5, 6]
+
+def test_create_access_token_adds_unique_jti():
+    first = jwt.decode(create_access_token({"sub": "testuser"}), SECRET_AUTH, algorithms=[ALGORITHM])
+    second = jwt.decode(create_access_token({"sub": "testuser"}), SECRET_AUTH, algorithms=[ALGORITHM])
+
+    assert first["jti"] and second["jti"]
+    assert first["jti"] != second["jti"]
+
+@pytest.mark.asyncio
+async def test_get_current_principal_without_user_lookup():
+    mock_db = AsyncMock()
+    mock_find_user = AsyncMock()
+    token = create_access_token({"sub": "testuser", "uid": 7, "ver": 3})
+
+    with patch("src.core.security.is_token_blacklisted", AsyncMock(return_value=False)), \
+            patch("src.core.security.get_user_profile_version", AsyncMock(return_value=3)), \
+            patch("src.core.security.find_user_by_login_and_email", mock_find_user):
+        principal = await get_current_principal(token, mock_db)
+
+    assert principal == CurrentPrincipal(id=7, login="testuser")
+    mock_find_user.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_get_current_principal_reloads_stale_version():
+    mock_db = AsyncMock()
+    mock_find_user = AsyncMock(return_value=UserRead(id=7, login="testuser", email="test@example.com"))
+    token = create_access_token({"sub": "testuser", "uid": 7, "ver": 3})
+
+    with patch("src.core.security.is_token_blacklisted", AsyncMock(return_value=False)), \
+            patch("src.core.security.get_user_profile_version", AsyncMock(return_value=4)), \
+            patch("src.core.security.find_user_by_login_and_email", mock_find_user):
+        principal = await get_current_principal(token, mock_db)
+
+    assert principal == CurrentPrincipal(id=7, login="testuser")
+    mock_find_user.assert_called_once_with(mock_db, "testuser")
+
+@pytest.mark.asyncio
+async def test_get_current_principal_rejects_login_of_another_account():
+    mock_find_user = AsyncMock(return_value=UserRead(id=8, login="testuser", email="other@example.com"))
+    token = create_access_token({"sub": "testuser", "uid": 7, "ver": 3})
+
+    with patch("src.core.security.is_token_blacklisted", AsyncMock(return_value=False)), \
+            patch("src.core.security.get_user_profile_version", AsyncMock(return_value=4)), \
+            patch("src.core.security.find_user_by_login_and_email", mock_find_user):
+        with pytest.raises(HTTPException) as exc_info:
+            await get_current_principal(token, AsyncMock())
+
+    assert exc_info.value.status_code == 401
+
+@pytest.mark.asyncio
+async def test_get_current_principal_rejects_deleted_user():
+    token = create_access_token({"sub": "testuser", "uid": 7, "ver": 3})
+
+    with patch("src.core.security.is_token_blacklisted", AsyncMock(return_value=False)), \
+            patch("src.core.security.get_user_profile_version", AsyncMock(return_value=None)):
+        with pytest.raises(HTTPException) as exc_info:
+            await get_current_principal(token, AsyncMock())
+
+    assert exc_info.value.status_code == 401
+
+@pytest.mark.asyncio
+async def test_get_current_principal_rejects_blacklisted_token():
+    token = create_access_token({"sub": "testuser", "uid": 7, "ver": 3})
+
+    with patch("src.core.security.is_token_blacklisted", AsyncMock(return_value=True)):
+        with pytest.raises(HTTPException) as exc_info:
+            await get_current_principal(token, AsyncMock())
+
+    assert exc_info.value.status_code == 401
@@ -0,0 +1,32 @@
+import pytest
+from unittest.mock import patch
+from src.services import template_service
+from src.services.template_service import render_email, render_many, preload_templates
+
+@pytest.mark.asyncio
+async def test_render_email_wraps_body_in_layout():
+    html = await render_email("registration_email_notification.html", {"user_name": "Ann"}, "Welcome to Food Diary!")
+
+    assert html.startswith("<!DOCTYPE html>")
+    assert "<h1>Welcome to Food Diary!</h1>" in html
+    assert "<h1>Hello, Ann!</h1>" in html
+    assert html.index("Hello, Ann!") < html.index('class="footer"')
+    assert template_service.CONTENT_MARKER not in html
+
+@pytest.mark.asyncio
+async def test_render_many_renders_layout_once():
+    contexts = [{"user_name": name} for name in ("Ann", "Bob", "Eve")]
+
+    with patch.dict(template_service.layout_cache, clear=True), \
+            patch("src.services.template_service.render_template", wraps=template_service.render_template) as render:
+        emails = await render_many("registration_email_notification.html", contexts, "Welcome to Food Diary!")
+        single = await render_email("registration_email_notification.html", contexts[1], "Welcome to Food Diary!")
+
+    layout_renders = [call for call in render.call_args_list if call.args[0] == template_service.EMAIL_LAYOUT]
+    assert len(layout_renders) == 1
+    assert len(emails) == 3
+    assert all(f"Hello, {context['user_name']}!" in html for html, context in zip(emails, contexts))
+    assert emails[1] == single
+
+def test_preload_templates_compiles_all_templates():
+    assert preload_templates() >= 2
@@ -0,0 +1,142 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from src.cache.token_blacklist import BloomFilter, TokenBlacklist, BLACKLIST_CHANNEL
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    revoked = [f"jti-{i}" for i in range(1000)]
+    for jti in revoked:
+        bloom.add(jti)
+
+    assert all(jti in bloom for jti in revoked)
+
+    # Доля ложных срабатываний остаётся близкой к заданной
+    false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+@pytest.mark.asyncio
+async def test_is_revoked_skips_redis_when_filter_says_no():
+    mock_cache = AsyncMock()
+    mock_cache.pool = MagicMock()
+    mock_cache.scan_keys.return_value = ["blacklist:revoked-jti"]
+    mock_cache.get.return_value = "revoked"
+
+    with patch("src.cache.token_blacklist.cache", mock_cache):
+        blacklist = TokenBlacklist(capacity=100, error_rate=0.001, snapshot_interval=60)
+        blacklist.subscribed = True
+        await blacklist.snapshot()
+
+        assert await blacklist.is_revoked("fresh-jti") is False
+        mock_cache.get.assert_not_called()
+
+        assert await blacklist.is_revoked("revoked-jti") is True
+        mock_cache.get.assert_called_once_with("blacklist:revoked-jti")
+
+@pytest.mark.asyncio
+async def test_is_revoked_checks_redis_until_snapshot_loaded():
+    mock_cache = AsyncMock()
+    mock_cache.get.return_value = None
+
+    with patch("src.cache.token_blacklist.cache", mock_cache):
+        blacklist = TokenBlacklist(capacity=100, error_rate=0.001, snapshot_interval=60)
+
+        assert await blacklist.is_revoked("some-jti") is False
+        mock_cache.get.assert_called_once_with("blacklist:some-jti")
+
+class FakePubSub:
+    def __init__(self, events, messages):
+        self.events = events
+        self.messages = messages
+
+    async def subscribe(self, channel):
+        self.events.append(f"subscribe:{channel}")
+
+    async def listen(self):
+        for message in self.messages:
+            if isinstance(message, Exception):
+                raise message
+            yield message
+        await asyncio.Event().wait()
+
+@pytest.mark.asyncio
+async def test_snapshot_is_taken_after_subscription_is_confirmed():
+    events = []
+    mock_cache = AsyncMock()
+    mock_cache.pool = MagicMock()
+    mock_cache.pool.pubsub.return_value = FakePubSub(events, [
+        {"type": "subscribe", "data": 1},
+        {"type": "message", "data": "revoked-during-snapshot"},
+    ])
+
+    async def scan_keys(pattern):
+        events.append(f"snapshot:ready={blacklist.ready}")
+        return ["blacklist:old-jti"]
+    mock_cache.scan_keys.side_effect = scan_keys
+
+    with patch("src.cache.token_blacklist.cache", mock_cache):
+        blacklist = TokenBlacklist(capacity=100, error_rate=0.001, snapshot_interval=60)
+        await blacklist.snapshot()
+        assert blacklist.ready is False
+
+        task = asyncio.create_task(blacklist._listen())
+        for _ in range(100):
+            if "revoked-during-snapshot" in blacklist.filter:
+                break
+            await asyncio.sleep(0)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    assert events == ["snapshot:ready=False", f"subscribe:{BLACKLIST_CHANNEL}", "snapshot:ready=False"]
+    assert blacklist.ready is True
+    assert "old-jti" in blacklist.filter
+    assert "revoked-during-snapshot" in blacklist.filter
+
+@pytest.mark.asyncio
+async def test_filter_is_not_trusted_after_subscription_is_lost():
+    mock_cache = AsyncMock()
+    mock_cache.pool = MagicMock()
+    mock_cache.pool.pubsub.return_value = FakePubSub([], [
+        {"type": "subscribe", "data": 1},
+        ConnectionError("connection lost"),
+    ])
+    mock_cache.scan_keys.return_value = []
+    sleep = AsyncMock(side_effect=asyncio.CancelledError)
+
+    with patch("src.cache.token_blacklist.cache", mock_cache), \
+            patch("src.cache.token_blacklist.asyncio.sleep", sleep):
+        blacklist = TokenBlacklist(capacity=100, error_rate=0.001, snapshot_interval=60)
+        with pytest.raises(asyncio.CancelledError):
+            await blacklist._listen()
+
+        assert blacklist.subscribed is False
+        assert blacklist.ready is False
+        # Периодический снимок не делает фильтр доверенным, пока подписка не восстановлена
+        await blacklist.snapshot()
+        assert blacklist.ready is False
+
+@pytest.mark.asyncio
+async def test_revoke_stores_jti_and_notifies_other_workers():
+    mock_cache = AsyncMock()
+
+    with patch("src.cache.token_blacklist.cache", mock_cache):
+        blacklist = TokenBlacklist(capacity=100, error_rate=0.001, snapshot_interval=60)
+        await blacklist.revoke("revoked-jti", datetime.utcnow() + timedelta(minutes=10))
+
+        key, value = mock_cache.set.call_args.args
+        assert key == "blacklist:revoked-jti"
+        assert 0 < mock_cache.set.call_args.kwargs["expire"] <= 600
+        mock_cache.publish.assert_called_once_with(BLACKLIST_CHANNEL, "revoked-jti")
+        assert "revoked-jti" in blacklist.filter
+
+@pytest.mark.asyncio
+async def test_revoke_ignores_expired_tokens():
+    mock_cache = AsyncMock()
+
+    with patch("src.cache.token_blacklist.cache", mock_cache):
+        blacklist = TokenBlacklist(capacity=100, error_rate=0.001, snapshot_interval=60)
+        await blacklist.revoke("old-jti", datetime.utcnow() - timedelta(minutes=1))
+
+        mock_cache.set.assert_not_called()
+        mock_cache.publish.assert_not_called()
@@ -1,11 +1,15 @@
 from tempfile import SpooledTemporaryFile
 import pytest
 from fastapi import UploadFile, HTTPException
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from src.models.daily_nutrition import DailyNutrition
 from src.models.user import User
+from src.schemas.meal import MealCreate
 from src.schemas.user import UserUpdate, UserCalculateNutrients
 from src.services.user_service import delete_user, update_user, find_user_by_login_and_email, \
     calculate_recommended_nutrients, upload_profile_picture, get_profile_picture
+from src.services.meal_service import add_meal
 from src.cache.cache import cache
 
 @pytest.mark.asyncio
@@ -19,11 +23,16 @@ async def test_delete_user(test_db: AsyncSession):
     test_db.add(user)
     await test_db.commit()
     await test_db.refresh(user)
+    # Приём пищи создаёт строку суточной сводки, которая ссылается на пользователя
+    await add_meal(test_db, MealCreate(name="Lunch", weight=0, calories=0, proteins=0, fats=0, carbohydrates=0),
+                   user.id)
 
     await delete_user(test_db, user)
 
     deleted_user = await test_db.get(User, user.id)
     assert deleted_user is None
+    result = await test_db.execute(select(DailyNutrition).where(DailyNutrition.user_id == user.id))
+    assert result.scalars().all() == []
 
 @pytest.mark.asyncio
 async def test_update_user(test_cache, test_db: AsyncSession):
@@ -45,10 +54,17 @@ async def test_update_user(test_cache, test_db: AsyncSession):
         weight=75,
     )
 
+    version = user.profile_version
+    await cache.set_field(f"analytics_summary:{user.id}", "cached", {"days": 7})
+
     updated_user = await update_user(user_update, test_db, user)
 
     assert updated_user.firstname == "new_test_name"
     assert updated_user.weight == 75
+    # Изменение профиля не делает выданные токены устаревшими, но сбрасывает аналитику
+    await test_db.refresh(user)
+    assert user.profile_version == version
+    assert await cache.get_field(f"analytics_summary:{user.id}", "cached") is None
 
 @pytest.mark.asyncio
 async def test_find_user_with_login_and_email(test_db: AsyncSession, test_cache):
@@ -0,0 +1,88 @@
+import asyncio
+from datetime import datetime
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from src.fone_tasks.cron import CronSchedule
+from src.fone_tasks.worker import Worker, Job
+
+def test_cron_next_after():
+    assert CronSchedule("0 3 * * *").next_after(datetime(2024, 3, 10, 3, 0)) == datetime(2024, 3, 11, 3, 0)
+    assert CronSchedule("*/15 * * * *").next_after(datetime(2024, 3, 10, 3, 7)) == datetime(2024, 3, 10, 3, 15)
+    # 2024-03-10 - воскресенье, следующий понедельник - 11 марта
+    assert CronSchedule("30 7 * * 1").next_after(datetime(2024, 3, 10, 12, 0)) == datetime(2024, 3, 11, 7, 30)
+    assert CronSchedule("0 0 1 * *").next_after(datetime(2024, 12, 15)) == datetime(2025, 1, 1, 0, 0)
+    assert CronSchedule("0 12 * * 0,6").next_after(datetime(2024, 3, 11)) == datetime(2024, 3, 16, 12, 0)
+
+def test_cron_rejects_invalid_expressions():
+    for expression in ("* * * *", "60 * * * *", "0 0 31 2 *"):
+        with pytest.raises(ValueError):
+            CronSchedule(expression).next_after(datetime(2024, 1, 1))
+
+@pytest.mark.asyncio
+async def test_run_job_retries_with_timeout_and_records_metrics():
+    calls = 0
+
+    async def flaky():
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            await asyncio.sleep(1)
+        if calls == 2:
+            raise RuntimeError("database is down")
+        return "done"
+
+    worker = Worker([], concurrency=1, timezone="UTC")
+    job = Job("flaky", flaky, "* * * * *", timeout=0.05, retries=2, retry_delay=0.01)
+    with patch("src.fone_tasks.worker.cache", MagicMock(set=AsyncMock())):
+        result = await worker.run_job(job)
+
+    assert result == "done"
+    assert calls == 3
+    assert worker.metrics["flaky"]["runs"] == 3
+    assert worker.metrics["flaky"]["failures"] == 2
+    assert worker.metrics["flaky"]["last_status"] == "success"
+
+@pytest.mark.asyncio
+async def test_dispatch_due_starts_due_jobs_once():
+    release = asyncio.Event()
+    calls = 0
+
+    async def func():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+
+    worker = Worker([Job("nightly", func, "0 3 * * *")], timezone="UTC")
+
+    with patch("src.fone_tasks.worker.cache", MagicMock(set=AsyncMock())):
+        assert worker.dispatch_due(datetime(2024, 3, 10, 2, 59)) == []
+        started = worker.dispatch_due(datetime(2024, 3, 10, 3, 0))
+        assert len(started) == 1
+        assert worker.next_runs["nightly"] == datetime(2024, 3, 11, 3, 0)
+        # Пока предыдущий запуск не завершён, повторный не стартует
+        assert worker.start_job(worker.jobs[0]) is None
+
+        release.set()
+        await asyncio.gather(*started)
+
+    assert calls == 1
+    assert worker.active == {}
+
+@pytest.mark.asyncio
+async def test_worker_limits_concurrency():
+    running = 0
+    peak = 0
+
+    async def job_func():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    jobs = [Job(f"job{i}", job_func, "* * * * *") for i in range(4)]
+    worker = Worker(jobs, concurrency=2, timezone="UTC")
+    with patch("src.fone_tasks.worker.cache", MagicMock(set=AsyncMock())):
+        await asyncio.gather(*(worker.start_job(job) for job in jobs))
+
+    assert peak == 2